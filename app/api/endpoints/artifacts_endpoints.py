@@ -0,0 +1,96 @@
+import logging
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from app.core.prisma_client import get_prisma
+from app.services.blob_store import BlobNotFoundError
+from app.services.file_metadata import find_excel_metadata, find_file_metadata
+from app.services.file_storage import stored_file_stream
+
+router = APIRouter()
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Plage demandée par l'en-tête Range (une seule plage : "bytes=debut-fin", "bytes=debut-" ou "bytes=-n").
+    None si l'en-tête n'est pas exploitable : le fichier entier est alors renvoyé.
+    """
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Plage demandée invalide",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def _artifact_response(request: Request, metadata: dict, field: str, filename: str):
+    try:
+        stream = await stored_file_stream(metadata, field, filename)
+    except ValueError as e:
+        logging.error(f"Lecture du fichier {filename} impossible : {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    etag = f'"{stream.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    # Fichier vide : aucune plage à lire (end vaudrait -1), ni dans le stockage ni en base
+    if stream.size == 0:
+        return Response(content=b"", media_type=stream.content_type, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    # If-Range : la reprise n'est valable que si le fichier n'a pas changé depuis
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = _parse_range(range_header, stream.size)
+
+    start, end = byte_range if byte_range else (0, stream.size - 1)
+    try:
+        chunks = stream.open(start, end)
+    except BlobNotFoundError as e:
+        logging.error(f"Contenu du fichier {filename} absent du stockage : {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e))
+
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{stream.size}"
+    return StreamingResponse(chunks, status_code=206 if byte_range else 200,
+                             media_type=stream.content_type, headers=headers)
+
+
+@router.get("/excel/{excel_id}")
+async def download_generated_excel(excel_id: int, request: Request):
+    """
+    Excel généré (GeneratedExcel), envoyé par blocs avec ETag et reprise par plage (Range).
+    """
+    db = await get_prisma()
+    metadata = await find_excel_metadata(db, excel_id)
+    if not metadata:
+        raise HTTPException(status_code=404, detail=f"Excel {excel_id} introuvable")
+    return await _artifact_response(request, metadata, "data", f"excel_{excel_id}.xlsx")
+
+
+@router.get("/files/{file_id}")
+async def download_generated_file(file_id: int, request: Request):
+    """
+    Fichier stocké (GeneratedFile : bulletins, templates...), envoyé par blocs avec ETag et reprise par plage (Range).
+    """
+    db = await get_prisma()
+    metadata = await find_file_metadata(db, file_id)
+    if not metadata:
+        raise HTTPException(status_code=404, detail=f"Fichier {file_id} introuvable")
+    return await _artifact_response(request, metadata, "fileData", metadata["filename"])
@@ -1,21 +1,42 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.services.database_services import create_user, get_users, get_templates
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.database import get_async_db
+from app.core.lazy import lazy_import
+
+# SQLAlchemy et les modèles ne sont chargés qu'au premier appel, pas au démarrage de l'application
+database_services = lazy_import("app.services.database_services")
 
 router = APIRouter()
 
 @router.post("/users")
-def add_user(name: str, email: str, db: Session = Depends(get_db)):
-    user = create_user(db, name, email)
+async def add_user(name: str, email: str, db=Depends(get_async_db)):
+    user = await database_services.create_user(db, name, email)
     return {"user": user}
 
 @router.get("/users")
-def list_users(db: Session = Depends(get_db)):
-    users = get_users(db)
-    return {"users": users}
+async def list_users(
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Curseur : next_cursor de la page précédente"),
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules"),
+    include: Optional[str] = Query(None, description="Relations à charger : configurations, generated_excels"),
+    include_limit: int = Query(10, ge=1, le=50, description="Lignes au plus par relation et par utilisateur"),
+    db=Depends(get_async_db),
+):
+    try:
+        users, next_cursor = await database_services.get_users(db, limit, after, fields, include, include_limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"users": users, "next_cursor": next_cursor}
 
 @router.get("/templates")
-def list_templates(db: Session = Depends(get_db)):
-    templates = get_templates(db)
-    return {"templates": templates}
+async def list_templates(
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[int] = Query(None, description="Curseur : next_cursor de la page précédente"),
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules"),
+    db=Depends(get_async_db),
+):
+    try:
+        templates, next_cursor = await database_services.get_templates(db, True, limit, after, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"templates": templates, "next_cursor": next_cursor}
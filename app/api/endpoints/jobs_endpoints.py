@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException
+from app.core.cancellation import cancel_job, list_jobs
+from app.services.prisma_service import get_class_statistics
+
+router = APIRouter()
+
+@router.get("")
+async def get_jobs():
+    return {"jobs": list_jobs()}
+
+@router.post("/{job_id}/cancel")
+async def cancel_job_endpoint(job_id: str):
+    """
+    Annule un traitement en cours sur ce processus : avec plusieurs workers ou réplicas, la demande doit
+    arriver sur celui qui exécute le traitement (voir app.core.cancellation).
+    """
+    if not cancel_job(job_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Traitement {job_id} introuvable sur cette instance ou déjà terminé",
+        )
+    return {"message": "Annulation demandée", "job_id": job_id}
+
+@router.get("/{job_id}/statistics")
+async def get_job_statistics(job_id: str):
+    statistics = await get_class_statistics(job_id)
+    if statistics is None:
+        raise HTTPException(status_code=404, detail=f"Aucune statistique de classe pour le traitement {job_id}")
+    return statistics
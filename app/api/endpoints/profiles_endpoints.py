@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.profiling import find_profile, list_profiles, valid_token
+
+router = APIRouter()
+
+
+def _check_access(token: Optional[str]) -> None:
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profilage désactivé")
+    # Même jeton que pour déclencher un profil (en-tête X-Profile), sans en déclencher : ProfilingMiddleware ignore /profiles
+    if not valid_token(token):
+        raise HTTPException(status_code=403, detail="Jeton de profilage invalide")
+
+
+@router.get("")
+async def get_profiles(x_profile: Optional[str] = Header(None)):
+    _check_access(x_profile)
+    return {"profiles": await run_blocking(list_profiles)}
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """
+    Profil enregistré : JSON speedscope (https://www.speedscope.app) ou fichier pstats
+    (`python -m pstats <fichier>`, snakeviz...).
+    """
+    _check_access(x_profile)
+    path = await run_blocking(find_profile, profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+    if path.endswith(".pstats"):
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
@@ -1,39 +1,40 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from app.core.server_timing import with_timings
 from app.services.ypareo_service import YpareoService
 
 router = APIRouter()
 
 @router.get("/periodes/2023_2024")
-async def get_periode_2023_2024():
+async def get_periode_2023_2024(request: Request):
     try:
-        return YpareoService.get_periode_2023_2024()
+        return with_timings(request, YpareoService.get_periode_2023_2024())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/apprenants/frequentes")
-async def get_frequentes():
+async def get_frequentes(request: Request):
     try:
-        return YpareoService.get_frequentes()
+        return with_timings(request, YpareoService.get_frequentes())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/apprenants")
-async def get_apprenants():
+async def get_apprenants(request: Request):
     try:
-        return YpareoService.get_apprenants()
+        return with_timings(request, YpareoService.get_apprenants())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/groupes")
-async def get_groupes():
+async def get_groupes(request: Request):
     try:
-        return YpareoService.get_groupes()
+        return with_timings(request, YpareoService.get_groupes())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/absences")
-async def get_absences():
+async def get_absences(request: Request):
     try:
-        return YpareoService.get_absences()
+        return with_timings(request, YpareoService.get_absences())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
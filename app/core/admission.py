@@ -0,0 +1,163 @@
+"""
+Contrôle d'admission des traitements lourds : files interactive / bulk, plafond par utilisateur
+et nombre global de créneaux CPU.
+"""
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+class AdmissionRejectedError(Exception):
+    """
+    Levée lorsque la file d'attente d'une voie est pleine.
+    """
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"File d'attente {lane} pleine, réessayez dans {retry_after} s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Ordonnanceur des traitements lourds.
+
+    Un traitement démarre si un créneau CPU est libre et si son utilisateur n'a pas atteint
+    son plafond. Sinon il attend dans la file de sa voie ; à chaque libération, la voie
+    interactive est servie avant la voie bulk, et dans une voie l'utilisateur ayant le moins
+    de traitements en cours passe en premier.
+    """
+
+    def __init__(self, cpu_slots: int, per_user_limit: int, queue_sizes: Dict[str, int], retry_after: int):
+        self.cpu_slots = cpu_slots
+        self.per_user_limit = per_user_limit
+        self.queue_sizes = queue_sizes
+        self.retry_after = retry_after
+        self._running = 0
+        self._running_by_user: Dict[str, int] = defaultdict(int)
+        self._queues: Dict[str, deque] = {lane: deque() for lane in LANES}
+
+    def _can_run(self, user_id: str) -> bool:
+        return self._running < self.cpu_slots and self._running_by_user[user_id] < self.per_user_limit
+
+    def _start(self, user_id: str) -> None:
+        self._running += 1
+        self._running_by_user[user_id] += 1
+
+    def _dispatch(self) -> None:
+        """
+        Réveille les traitements en attente tant que des créneaux sont disponibles.
+        """
+        while self._running < self.cpu_slots:
+            candidate = None
+            for lane in LANES:
+                eligible = [
+                    entry for entry in self._queues[lane]
+                    if not entry[1].done() and self._running_by_user[entry[0]] < self.per_user_limit
+                ]
+                if eligible:
+                    # Équité : l'utilisateur avec le moins de traitements en cours d'abord (FIFO sinon)
+                    candidate = (lane, min(eligible, key=lambda entry: self._running_by_user[entry[0]]))
+                    break
+            if candidate is None:
+                return
+            lane, (user_id, future) = candidate
+            self._queues[lane].remove((user_id, future))
+            self._start(user_id)
+            future.set_result(True)
+
+    def _retry_after_for(self, lane: str) -> int:
+        queued = len(self._queues[lane])
+        return max(1, self.retry_after * (1 + queued // max(1, self.cpu_slots)))
+
+    async def acquire(self, user_id: str, lane: str = BULK) -> None:
+        if lane not in LANES:
+            raise ValueError(f"Voie inconnue : {lane} (attendu : {', '.join(LANES)})")
+
+        if self._can_run(user_id):
+            self._start(user_id)
+            return
+
+        queue = self._queues[lane]
+        if len(queue) >= self.queue_sizes[lane]:
+            raise AdmissionRejectedError(lane, self._retry_after_for(lane))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (user_id, future)
+        queue.append(entry)
+        logging.info(f"Traitement de {user_id} mis en attente (voie {lane}, position {len(queue)})")
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Le créneau venait d'être attribué : le rendre
+                self.release(user_id)
+            elif entry in queue:
+                queue.remove(entry)
+            raise
+
+    def release(self, user_id: str) -> None:
+        self._running -= 1
+        self._running_by_user[user_id] -= 1
+        if self._running_by_user[user_id] <= 0:
+            del self._running_by_user[user_id]
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        return {
+            "cpu_slots": self.cpu_slots,
+            "running": self._running,
+            "running_by_user": dict(self._running_by_user),
+            "queued": {lane: len(queue) for lane, queue in self._queues.items()},
+        }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            cpu_slots=settings.ADMISSION_CPU_SLOTS,
+            per_user_limit=settings.ADMISSION_PER_USER_LIMIT,
+            queue_sizes={
+                INTERACTIVE: settings.ADMISSION_INTERACTIVE_QUEUE_SIZE,
+                BULK: settings.ADMISSION_BULK_QUEUE_SIZE,
+            },
+            retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        )
+    return _controller
+
+
+def admission(lane: str = BULK):
+    """
+    Dépendance FastAPI : admet la requête dans la voie `lane`, fixée par la route (le client ne
+    choisit pas sa priorité). Le paramètre `user_id` est obligatoire : il porte le plafond par
+    utilisateur. Répond 429 avec Retry-After si la file est pleine.
+    """
+    if lane not in LANES:
+        raise ValueError(f"Voie inconnue : {lane} (attendu : {', '.join(LANES)})")
+
+    async def dependency(user_id: str):
+        controller = get_admission_controller()
+        try:
+            await controller.acquire(user_id, lane)
+        except AdmissionRejectedError as e:
+            logging.warning(f"Requête de {user_id} refusée : {str(e)}")
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        try:
+            yield
+        finally:
+            controller.release(user_id)
+
+    return dependency
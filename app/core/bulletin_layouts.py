@@ -0,0 +1,133 @@
+"""
+Disposition de l'Excel mis à jour pour chaque modèle de bulletin Word :
+colonnes des notes (note1, note2, ...), regroupement des notes par UE
+et colonnes des informations de l'apprenant.
+
+Le regroupement `ues` sert à la fois aux moyennes, aux ECTS et aux états des UE (etatUE, totaletat).
+L'ancien code par modèle regroupait les états autrement que les moyennes pour ALT-S2 à S6, TP-S1,
+TP-S3, TP-S5, M1 et M2 (par exemple ALT-S3 : états 1-5, 6-7, 8, 9-13 pour des UE 1, 2-5, 6-7,
+8-12), mais ne produisait aucun bulletin pour ces modèles (moyennes d'UE calculées pour ALT-S1
+seulement). Les états suivent désormais la composition réelle des UE ; pour ALT-S1, les résultats
+sont identiques (tests/test_grade_engine.py).
+"""
+
+# Colonnes communes à tous les modèles
+IDENTITY_COLUMNS = {
+    "CodeApprenant": "A",
+    "nomApprenant": "B",
+}
+
+
+def _info_columns(first_column: str) -> dict:
+    """
+    Les informations de l'apprenant occupent huit colonnes consécutives à partir de `first_column`.
+    """
+    keys = ["dateNaissance", "campus", "groupe", "etendugroupe", "justifiee", "injustifiee", "retard", "APPRECIATIONS"]
+    start = _column_index(first_column)
+    return {key: _column_letter(start + offset) for offset, key in enumerate(keys)}
+
+
+def _column_index(column: str) -> int:
+    index = 0
+    for char in column:
+        index = index * 26 + (ord(char) - ord("A") + 1)
+    return index
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+BULLETIN_LAYOUTS = {
+    "modeleBG-ALT-S1-2024-2025.docx": {
+        "note_columns": ["D", "E", "F", "H", "I", "J", "L", "N", "O", "P", "Q", "R", "S"],
+        "ues": {"UE1": [1, 2, 3], "UE2": [4, 5, 6], "UE3": [7], "UE4": [8, 9, 10, 11, 12, 13]},
+        "info_columns": {
+            "dateNaissance": "T", "campus": "U", "groupe": "W", "etendugroupe": "X",
+            "justifiee": "Y", "injustifiee": "Z", "retard": "AA", "APPRECIATIONS": "AB",
+        },
+        "info_defaults": {"justifiee": "0h0m", "injustifiee": "0h0m", "retard": "0h0m", "APPRECIATIONS": " "},
+    },
+    "modeleBG-ALT-S2-2024-2025.docx": {
+        "note_columns": ["D", "E", "F", "G", "I", "J", "K", "M", "O", "P", "Q", "R", "S"],
+        "ues": {"UE1": [1, 2, 3, 4], "UE2": [5, 6, 7], "UE3": [8], "UE4": [9, 10, 11, 12, 13]},
+        "info_columns": _info_columns("T"),
+    },
+    "modeleBG-ALT-S3-2024-2025.docx": {
+        "note_columns": ["D", "F", "G", "H", "I", "K", "L", "N", "O", "P", "Q", "R"],
+        "ues": {"UE1": [1], "UE2": [2, 3, 4, 5], "UE3": [6, 7], "UE4": [8, 9, 10, 11, 12]},
+        "info_columns": _info_columns("S"),
+    },
+    "modeleBG-ALT-S4-2024-2025.docx": {
+        "note_columns": ["D", "E", "F", "H", "I", "J", "K", "L", "N", "P", "Q", "R", "S"],
+        "ues": {"UE1": [1, 2, 3], "UE2": [4, 5, 6, 7, 8], "UE3": [9], "UE4": [10, 11, 12, 13]},
+        "info_columns": _info_columns("T"),
+    },
+    "modeleBG-ALT-S5-2024-2025.docx": {
+        "note_columns": ["D", "E", "G", "H", "I", "J", "L", "M", "O", "P", "Q", "R", "S", "T"],
+        "ues": {"UE1": [1, 2], "UE2": [3, 4, 5, 6], "UE3": [7, 8], "UE4": [9, 10, 11, 12, 13, 14]},
+        "info_columns": _info_columns("U"),
+    },
+    "modeleBG-ALT-S6-2024-2025.docx": {
+        "note_columns": ["D", "E", "G", "H", "J", "K", "L", "M", "N", "O", "P", "Q", "R"],
+        "ues": {"UE1": [1, 2], "UE2": [3, 4], "UE3": [5, 6, 7], "UE4": [8, 9, 10, 11, 12, 13]},
+        "info_columns": _info_columns("S"),
+    },
+    "modeleBG-TP-S1-2024-2025.docx": {
+        "note_columns": ["D", "E", "F", "G", "H", "I", "J", "L", "M", "N", "O", "P", "Q", "S", "T", "V", "W", "X", "Y", "Z"],
+        "ues": {
+            "UE1": [1, 2, 3, 4, 5, 6, 7], "UE2": [8, 9, 10, 11, 12, 13],
+            "UE3": [14, 15], "UE4": [16, 17, 18, 19, 20],
+        },
+        "info_columns": _info_columns("AA"),
+    },
+    "modeleBG-TP-S2-2024-2025.docx": {
+        "note_columns": ["D", "E"],
+        "ues": {"UE1": [1, 2]},
+        "info_columns": _info_columns("F"),
+    },
+    "modeleBG-TP-S3-2024-2025.docx": {
+        "note_columns": ["D", "F", "G", "H", "I", "J", "K", "L", "M", "O", "P", "R", "S", "T", "U"],
+        "ues": {"UE1": [1], "UE2": [2, 3, 4, 5, 6, 7, 8, 9], "UE3": [10, 11], "UE4": [12, 13, 14, 15]},
+        "info_columns": _info_columns("V"),
+    },
+    "modeleBG-TP-S4-2024-2025.docx": {
+        "note_columns": ["D"],
+        "ues": {"UE1": [1]},
+        "info_columns": _info_columns("E"),
+    },
+    "modeleBG-TP-S5-2024-2025.docx": {
+        "note_columns": ["D", "E", "F", "G", "H", "J", "K", "L", "M", "N", "P", "Q", "R", "S", "T", "V", "W", "X", "Y", "Z"],
+        "ues": {
+            "UE1": [1, 2, 3, 4, 5], "UE2": [6, 7, 8, 9, 10],
+            "UE3": [11, 12, 13, 14, 15], "UE4": [16, 17, 18, 19, 20],
+        },
+        "info_columns": _info_columns("AA"),
+    },
+    "modeleBG-TP-S6-2024-2025.docx": {
+        "note_columns": ["D", "E", "F"],
+        "ues": {"UE1": [1, 2, 3]},
+        "info_columns": _info_columns("G"),
+    },
+    "modeleM1-S1.docx": {
+        "note_columns": ["D", "E", "G", "H", "J", "K", "M", "O", "P", "Q", "R", "T", "U", "V"],
+        "ues": {"UE1": [1, 2], "UE2": [3, 4], "UE3": [5, 6], "UE4": [7, 8, 9, 10, 11], "UESPE": [12, 13, 14]},
+        "info_columns": _info_columns("W"),
+    },
+    "modeleM2-S3.docx": {
+        "note_columns": ["D", "E", "G", "I", "K", "L", "M", "N", "O", "Q", "R", "S", "T"],
+        "ues": {"UE1": [1, 2], "UE2": [3], "UE3": [4], "UE4": [5, 6, 7, 8, 9], "UESPE": [10, 11, 12, 13]},
+        "info_columns": _info_columns("U"),
+    },
+}
+
+
+def get_bulletin_layout(template_name: str) -> dict:
+    layout = BULLETIN_LAYOUTS.get(template_name)
+    if not layout:
+        raise ValueError(f"Aucune disposition de bulletin définie pour le modèle : {template_name}")
+    return layout
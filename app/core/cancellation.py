@@ -0,0 +1,107 @@
+"""
+Annulation coopérative des traitements longs (récupération Yparéo, remplissage Excel, génération des bulletins).
+
+Les traitements en cours sont connus du seul processus qui les exécute. La déconnexion du client
+annule le traitement quelle que soit l'instance ; /jobs/{job_id}/cancel, lui, n'atteint le traitement
+que s'il arrive sur le même processus (un seul worker, ou répartiteur qui route par job_id).
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from typing import Dict, Optional
+
+from fastapi import Request
+
+# Code utilisé par nginx pour une requête abandonnée par le client
+CLIENT_CLOSED_REQUEST = 499
+
+
+class OperationCancelledError(Exception):
+    """
+    Levée lorsqu'un traitement est interrompu (déconnexion du client ou annulation explicite).
+    """
+
+
+class CancellationToken:
+    """
+    Jeton d'annulation partagé entre l'endpoint et les services qu'il appelle.
+    Utilisable depuis la boucle asyncio comme depuis un thread de travail.
+    """
+
+    def __init__(self, job_id: str, request: Optional[Request] = None):
+        self.job_id = job_id
+        self.reason = ""
+        self._request = request
+        self._event = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Annulation demandée") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+            logging.info(f"Traitement {self.job_id} annulé : {reason}")
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Vérification synchrone, utilisable dans les boucles sans accès à la boucle asyncio.
+        """
+        if self._event.is_set():
+            raise OperationCancelledError(f"Traitement {self.job_id} annulé : {self.reason}")
+
+    async def checkpoint(self) -> None:
+        """
+        Point de contrôle entre deux lignes : laisse la main à la boucle asyncio
+        (pour traiter une éventuelle demande d'annulation), vérifie si le client est
+        toujours connecté, puis lève OperationCancelledError si le traitement est annulé.
+        """
+        await asyncio.sleep(0)
+        if self._request is not None and not self._event.is_set():
+            if await self._request.is_disconnected():
+                self.cancel("Client déconnecté")
+        self.raise_if_cancelled()
+
+
+# Traitements en cours, indexés par job_id
+_active_jobs: Dict[str, CancellationToken] = {}
+
+
+def start_job(request: Optional[Request] = None, job_id: Optional[str] = None) -> CancellationToken:
+    """
+    Enregistre un nouveau traitement annulable et retourne son jeton.
+    """
+    job_id = job_id or uuid.uuid4().hex
+    if job_id in _active_jobs:
+        raise ValueError(f"Un traitement avec l'identifiant {job_id} est déjà en cours")
+    token = CancellationToken(job_id, request)
+    _active_jobs[job_id] = token
+    return token
+
+
+def finish_job(token: CancellationToken) -> None:
+    """
+    Libère le traitement : il ne peut plus être annulé.
+    """
+    if _active_jobs.get(token.job_id) is token:
+        del _active_jobs[token.job_id]
+
+
+def cancel_job(job_id: str, reason: str = "Annulation demandée") -> bool:
+    """
+    Demande l'annulation d'un traitement en cours. Retourne False si le traitement est inconnu.
+    """
+    token = _active_jobs.get(job_id)
+    if token is None:
+        return False
+    token.cancel(reason)
+    return True
+
+
+def list_jobs() -> list:
+    return [
+        {"job_id": job_id, "cancelled": token.is_cancelled}
+        for job_id, token in _active_jobs.items()
+    ]
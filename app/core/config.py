@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic import Field
 from pydantic_settings import BaseSettings
 import os
@@ -13,7 +14,102 @@ class Settings(BaseSettings):
     YPAERO_API_TOKEN: str
     DATABASE_URL: str
 
+    # Contrôle d'admission des traitements lourds (/process-excel, /get-word-template)
+    ADMISSION_CPU_SLOTS: int = 2
+    ADMISSION_PER_USER_LIMIT: int = 1
+    ADMISSION_INTERACTIVE_QUEUE_SIZE: int = 20
+    ADMISSION_BULK_QUEUE_SIZE: int = 10
+    ADMISSION_RETRY_AFTER_SECONDS: int = 30
+
+    # Pool de threads pour les étapes openpyxl / python-docx (0 = min(4, nombre de CPU))
+    CPU_EXECUTOR_WORKERS: int = 0
+
+    # Pool de connexions du moteur Prisma partagé (0 = valeur par défaut de Prisma : 2 * CPU + 1)
+    PRISMA_CONNECTION_LIMIT: int = 0
+    PRISMA_POOL_TIMEOUT_SECONDS: int = 10
+
+    # Pools SQLAlchemy (synchrone et asynchrone) ; pilote asynchrone : "asyncpg" ou "psycopg"
+    DB_ASYNC_DRIVER: str = "asyncpg"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Espaces de travail par traitement ("" = /dev/shm s'il a la place pour ADMISSION_CPU_SLOTS quotas, sinon TEMP_DIR/workspaces)
+    WORKSPACE_ROOT: str = ""
+    WORKSPACE_QUOTA_BYTES: int = 512 * 1024 * 1024
+    WORKSPACE_TTL_SECONDS: int = 3600
+    WORKSPACE_JANITOR_INTERVAL_SECONDS: int = 300
+
+    # Migration en tâche de fond des fichiers stockés en base64 vers le binaire brut, ou vers le stockage
+    # de fichiers s'il est partagé (S3) ; désactivée par défaut, à lancer explicitement
+    STORAGE_MIGRATION_ENABLED: bool = False
+    STORAGE_MIGRATION_BATCH_SIZE: int = 20
+
+    # Cache des templates : LRU en mémoire borné en octets + niveau disque adressé par contenu ("" = pas de disque)
+    TEMPLATE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    TEMPLATE_CACHE_DIR: str = os.path.join(os.getcwd(), "cache", "templates")
+    TEMPLATE_CACHE_PREWARM: bool = True
+
+    # Stockage des fichiers : "database" (colonnes Bytes, par défaut), "s3" (compatible S3, partagé entre
+    # réplicas) ou "local" (disque de l'instance : une seule instance de l'application)
+    BLOB_STORE_BACKEND: str = "database"
+    BLOB_STORE_DIR: str = os.path.join(os.getcwd(), "blobs")
+    # Instances de l'application : réplicas × workers par réplica (WEB_CONCURRENCY, lue aussi par
+    # uvicorn/gunicorn) ; au-delà d'une instance, le démarrage exige un stockage partagé ("database" ou "s3")
+    APP_REPLICAS: int = 1
+    WEB_CONCURRENCY: int = 1
+    BLOB_STORE_CHUNK_SIZE: int = 1024 * 1024
+    BLOB_STORE_S3_BUCKET: str = ""
+    BLOB_STORE_S3_PREFIX: str = ""
+    BLOB_STORE_S3_ENDPOINT_URL: str = ""
+    BLOB_STORE_S3_ACCESS_KEY: str = ""
+    BLOB_STORE_S3_SECRET_KEY: str = ""
+    BLOB_STORE_S3_REGION: str = ""
+
+    # Intervalle de vérification de la table ECTSTemplate pour le rechargement du catalogue (0 = désactivé)
+    ECTS_CATALOG_REFRESH_SECONDS: int = 60
+
+    # Chargement en tâche de fond, après le démarrage, des dépendances lourdes importées à la demande
+    LAZY_IMPORT_PRELOAD: bool = True
+    # Budget de démarrage (imports + lifespan), vérifié par benchmarks/startup.py
+    STARTUP_BUDGET_MS: int = 3000
+    STARTUP_IMPORT_BUDGET_MS: int = 1500
+
+    # Mémoire : budget par traitement lourd (0 = pas de budget), passage en mode économe au-delà d'une
+    # fraction du budget, refus des traitements si le processus dépasse déjà une limite (0 = pas de limite)
+    MEMORY_REQUEST_BUDGET_BYTES: int = 0
+    MEMORY_LOW_MEMORY_RATIO: float = 0.5
+    MEMORY_PROCESS_LIMIT_BYTES: int = 0
+    # Allocateurs Python relevés par étape (tracemalloc, coûteux : diagnostic uniquement)
+    MEMORY_TRACEMALLOC: bool = False
+    MEMORY_TRACEMALLOC_FRAMES: int = 1
+    MEMORY_TRACEMALLOC_TOP: int = 10
+
+    # Profilage à la demande (en-tête X-Profile: <jeton>, aussi exigé par /profiles) ; jeton obligatoire si activé
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""
+    PROFILING_SAMPLE_INTERVAL_MS: int = 5
+    PROFILE_DIR: str = os.path.join(os.getcwd(), "profiles")
+    PROFILE_MAX_FILES: int = 50
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Paramètres lus (environnement, .env) et validés au premier accès à un attribut, pas à l'import du module.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
@@ -1,15 +1,142 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from fastapi import HTTPException
 from app.core.config import settings
 
-# Créer une connexion à la base de données PostgreSQL de Prisma
-engine = create_engine(settings.DATABASE_URL, connect_args={"sslmode": "require"})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLAlchemy n'est importé qu'à la création des moteurs, pas au démarrage de l'application
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+def _pool_options() -> dict:
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+
+_session_local = None
+
+
+def get_session_local():
+    """
+    Fabrique de sessions synchrones sur la base PostgreSQL de Prisma (créée au premier appel).
+    """
+    global _session_local
+    if _session_local is None:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        engine = create_engine(settings.DATABASE_URL, connect_args={"sslmode": "require"}, **_pool_options())
+        _session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_local
 
-# Dépendance pour obtenir une session de base de données
+# Dépendance pour obtenir une session de base de données (synchrone, scripts et outils)
 def get_db():
-    db = SessionLocal()
+    db = get_session_local()()
     try:
         yield db
     finally:
         db.close()
+
+
+class PoolWaitStats:
+    """
+    Temps d'attente pour obtenir une connexion du pool asynchrone, par session ouverte.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.count += 1
+        self.total_wait += wait
+        self.last_wait = wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        pool = _async_engine.pool if _async_engine is not None else None
+        return {
+            "driver": settings.DB_ASYNC_DRIVER,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout() if pool is not None else 0,
+            "overflow": pool.overflow() if pool is not None else 0,
+            "acquisitions": self.count,
+            "timeouts": self.timeouts,
+            "last_wait_seconds": round(self.last_wait, 6),
+            "max_wait_seconds": round(self.max_wait, 6),
+            "mean_wait_seconds": round(self.total_wait / self.count, 6) if self.count else 0.0,
+        }
+
+
+pool_wait_stats = PoolWaitStats()
+
+_async_engine: Optional["AsyncEngine"] = None
+_async_sessionmaker = None
+
+
+def _async_url() -> tuple:
+    """
+    URL SQLAlchemy asynchrone (postgresql+asyncpg:// ou postgresql+psycopg://) et arguments de connexion.
+    asyncpg ne comprend pas le paramètre sslmode : il est converti en argument `ssl`.
+    """
+    parts = urlsplit(settings.DATABASE_URL)
+    query = dict(parse_qsl(parts.query))
+    scheme = f"postgresql+{settings.DB_ASYNC_DRIVER}"
+    if settings.DB_ASYNC_DRIVER == "asyncpg":
+        connect_args = {"ssl": query.pop("sslmode", "require")}
+    else:
+        query.setdefault("sslmode", "require")
+        connect_args = {}
+    # Paramètres propres au moteur Prisma, inconnus des pilotes
+    for key in ("connection_limit", "pool_timeout", "schema", "pgbouncer"):
+        query.pop(key, None)
+    return urlunsplit(parts._replace(scheme=scheme, query=urlencode(query))), connect_args
+
+
+def get_async_engine() -> "AsyncEngine":
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        url, connect_args = _async_url()
+        _async_engine = create_async_engine(url, connect_args=connect_args, **_pool_options())
+        _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+async def get_async_db() -> AsyncIterator["AsyncSession"]:
+    """
+    Dépendance FastAPI : session asynchrone avec sa connexion déjà obtenue du pool
+    (le temps d'attente est enregistré dans `pool_wait_stats`).
+    """
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    get_async_engine()
+    session = _async_sessionmaker()
+    try:
+        start = time.perf_counter()
+        try:
+            await session.connection()
+        except PoolTimeoutError:
+            pool_wait_stats.timeouts += 1
+            raise HTTPException(status_code=503, detail="Base de données saturée, réessayez plus tard")
+        pool_wait_stats.record(time.perf_counter() - start)
+        yield session
+    finally:
+        await session.close()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
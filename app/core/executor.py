@@ -0,0 +1,94 @@
+"""
+Couche d'exécution : les étapes synchrones et coûteuses (openpyxl, python-docx, appels HTTP bloquants)
+tournent dans un pool de threads dimensionné, la boucle asyncio reste dédiée aux entrées/sorties.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.core.config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = settings.CPU_EXECUTOR_WORKERS or min(4, os.cpu_count() or 1)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+        logging.info(f"Pool d'exécution démarré avec {workers} thread(s)")
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Exécute une fonction synchrone dans le pool et attend son résultat sans bloquer la boucle.
+    Le contexte (variables de contexte de la requête) est transmis au thread, comme asyncio.to_thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class EventLoopLagMonitor:
+    """
+    Mesure le retard de la boucle asyncio : une tâche se réveille toutes les `interval` secondes
+    et enregistre l'écart entre l'heure de réveil prévue et l'heure effective.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.samples = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.last_lag = lag
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > 1:
+                logging.warning(f"Boucle asyncio bloquée pendant {lag:.2f} s")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "last_lag_seconds": round(self.last_lag, 6),
+            "max_lag_seconds": round(self.max_lag, 6),
+            "mean_lag_seconds": round(self.total_lag / self.samples, 6) if self.samples else 0.0,
+        }
+
+
+event_loop_monitor = EventLoopLagMonitor()
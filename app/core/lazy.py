@@ -0,0 +1,42 @@
+"""
+Import différé des dépendances lourdes (openpyxl, python-docx, requests, NumPy, client Prisma...).
+
+`openpyxl = lazy_import("openpyxl")` ne charge rien au démarrage : le module est importé au premier
+accès à l'un de ses attributs (`openpyxl.load_workbook`), puis réutilisé. L'import passe par
+`importlib.import_module`, protégé par le verrou d'import de Python : un premier accès simultané
+depuis plusieurs threads du pool reste sûr.
+"""
+import importlib
+import logging
+import time
+import types
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attribute: str):
+        module = self.__dict__.get("_module")
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return getattr(module, attribute)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    return _LazyModule(name)
+
+
+# Dépendances importées à la demande par les services et les endpoints
+HEAVY_MODULES = ("openpyxl", "docx", "requests", "numpy", "prisma")
+
+
+def preload(modules=HEAVY_MODULES) -> float:
+    """
+    Importe les modules (appelé dans un thread après le démarrage) pour que le premier traitement
+    ne paie pas leur chargement. Retourne la durée en secondes.
+    """
+    start = time.perf_counter()
+    for name in modules:
+        importlib.import_module(name)
+    duration = time.perf_counter() - start
+    logging.info(f"Dépendances préchargées en {duration * 1000:.0f} ms : {', '.join(modules)}")
+    return duration
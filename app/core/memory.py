@@ -0,0 +1,194 @@
+"""
+Mémoire consommée par les traitements : RSS du processus par étape, principaux allocateurs Python
+(tracemalloc, si activé) et budget mémoire par requête.
+
+- chaque étape chronométrée par app.core.metrics enregistre le RSS du processus à sa fin (maximum par
+  étape) et, avec MEMORY_TRACEMALLOC, le pic du tas Python et ses principaux allocateurs ;
+- la dépendance `memory_budget()` refuse un traitement lourd (503) si le processus dépasse déjà
+  MEMORY_PROCESS_LIMIT_BYTES, puis suit la croissance du RSS depuis le début de la requête : au-delà de
+  MEMORY_LOW_MEMORY_RATIO du budget MEMORY_REQUEST_BUDGET_BYTES, `low_memory_mode()` est vrai et les
+  étapes suivantes passent en lecture économe (openpyxl en lecture seule) ; au-delà du budget, l'étape
+  suivante lève MemoryBudgetExceededError et le traitement est abandonné proprement.
+
+Le RSS est celui du processus : avec plusieurs traitements simultanés, la part attribuée à une requête
+est approximative (elle inclut la croissance due aux autres).
+"""
+import logging
+import os
+import threading
+import tracemalloc
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """
+    RSS actuel du processus en octets (0 si indisponible).
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """
+    RSS maximal atteint par le processus depuis son démarrage, en octets.
+    """
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryBudgetExceededError(Exception):
+    """
+    Levée lorsqu'un traitement dépasse son budget mémoire, ou que le processus est déjà saturé.
+    """
+
+    def __init__(self, message: str, used: int, limit: int):
+        super().__init__(message)
+        self.used = used
+        self.limit = limit
+
+
+class RequestMemory:
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.baseline = current_rss()
+        self.peak = self.baseline
+        self.low_memory = False
+
+    @property
+    def used(self) -> int:
+        return self.peak - self.baseline
+
+    def check(self, stage: str, rss: int) -> None:
+        self.peak = max(self.peak, rss)
+        if not self.budget:
+            return
+        if not self.low_memory and self.used > self.budget * settings.MEMORY_LOW_MEMORY_RATIO:
+            self.low_memory = True
+            logging.warning(f"Traitement passé en mode mémoire réduite après l'étape {stage} "
+                            f"({self.used // 2**20} Mio utilisés sur {self.budget // 2**20} Mio)")
+        if self.used > self.budget:
+            raise MemoryBudgetExceededError(
+                f"Budget mémoire dépassé après l'étape {stage} : "
+                f"{self.used // 2**20} Mio utilisés pour {self.budget // 2**20} Mio autorisés",
+                self.used, self.budget,
+            )
+
+
+_current: ContextVar[Optional[RequestMemory]] = ContextVar("request_memory", default=None)
+
+
+def low_memory_mode() -> bool:
+    """
+    Vrai si la requête en cours doit limiter sa mémoire (lecture seule, pas de copie complète).
+    """
+    request_memory = _current.get()
+    return request_memory is not None and request_memory.low_memory
+
+
+class MemoryTracker:
+    """
+    RSS maximal et, avec tracemalloc, pic du tas Python et principaux allocateurs par étape.
+    Avec des étapes simultanées, le pic tracemalloc d'une étape peut inclure les autres.
+    """
+
+    def __init__(self):
+        self.stage_rss: Dict[str, int] = {}
+        self.stage_heap_peak: Dict[str, int] = {}
+        self.stage_allocators: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def before_stage(self, name: str) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def after_stage(self, name: str) -> int:
+        rss = current_rss()
+        with self._lock:
+            self.stage_rss[name] = max(self.stage_rss.get(name, 0), rss)
+        if tracemalloc.is_tracing():
+            heap_peak = tracemalloc.get_traced_memory()[1]
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:settings.MEMORY_TRACEMALLOC_TOP]
+            with self._lock:
+                self.stage_heap_peak[name] = max(self.stage_heap_peak.get(name, 0), heap_peak)
+                self.stage_allocators[name] = [
+                    {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                    for stat in statistics
+                ]
+        return rss
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "rss_bytes": current_rss(),
+                "peak_rss_bytes": peak_rss(),
+                "tracemalloc": tracemalloc.is_tracing(),
+                "stages": {
+                    name: {
+                        "max_rss_bytes": rss,
+                        "heap_peak_bytes": self.stage_heap_peak.get(name),
+                        "top_allocators": self.stage_allocators.get(name, []),
+                    }
+                    for name, rss in self.stage_rss.items()
+                },
+            }
+
+
+memory_tracker = MemoryTracker()
+
+
+def start_tracemalloc() -> None:
+    if settings.MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACEMALLOC_FRAMES)
+        logging.info("tracemalloc activé : allocateurs relevés à la fin de chaque étape")
+
+
+def before_stage(name: str) -> None:
+    memory_tracker.before_stage(name)
+
+
+def after_stage(name: str) -> None:
+    """
+    Fin d'étape réussie : mesure la mémoire et vérifie le budget de la requête en cours.
+    """
+    rss = memory_tracker.after_stage(name)
+    request_memory = _current.get()
+    if request_memory is not None:
+        request_memory.check(name, rss)
+
+
+def memory_budget():
+    """
+    Dépendance FastAPI : refuse le traitement (503) si le processus dépasse déjà sa limite mémoire,
+    puis suit la mémoire de la requête par rapport à MEMORY_REQUEST_BUDGET_BYTES.
+    """
+    async def dependency():
+        rss = current_rss()
+        limit = settings.MEMORY_PROCESS_LIMIT_BYTES
+        if limit and rss > limit:
+            logging.warning(f"Traitement refusé : {rss // 2**20} Mio utilisés pour une limite de {limit // 2**20} Mio")
+            raise HTTPException(status_code=503, detail="Mémoire du serveur saturée, réessayez plus tard",
+                                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)})
+        request_memory = RequestMemory(settings.MEMORY_REQUEST_BUDGET_BYTES)
+        # Budget déjà entamé par le reste du processus : démarrer directement en mode économe
+        if limit and request_memory.budget and limit - rss < request_memory.budget:
+            request_memory.low_memory = True
+        _current.set(request_memory)
+        yield request_memory
+
+    return dependency
@@ -0,0 +1,199 @@
+"""
+Mesures du pipeline (durées par étape, lignes traitées, octets lus/écrits...) exposées au format
+texte Prometheus sur /metrics.
+
+- `stage("nom", template=...)` : gestionnaire de contexte qui chronomètre une étape ;
+- `timed_stage("nom", template_arg=...)` : même chose en décorateur, pour les fonctions synchrones
+  (exécutées dans le pool de threads) comme pour les coroutines ;
+- `registry.add_collector(fn)` : valeurs lues au moment de la collecte (ratios de cache, traitements
+  en cours...), `fn` retournant des lignes au format Prometheus (voir `gauge_lines`).
+"""
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core import memory
+from app.core.server_timing import record_stage
+
+# Bornes des histogrammes de durée (secondes), de la requête rapide à la génération d'une promotion
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        # Par jeu de labels : compteurs par borne (non cumulés), somme, nombre
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            snapshot = {key: ([*series[0]], series[1], series[2]) for key, series in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _number(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+def gauge_lines(name: str, documentation: str, values: Dict[Tuple[Tuple[str, str], ...], float]) -> List[str]:
+    """
+    Lignes d'une jauge calculée à la collecte ; `values` : {((label, valeur), ...): mesure}.
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for labels, value in values.items():
+        names = tuple(label for label, _ in labels)
+        label_values = tuple(label_value for _, label_value in labels)
+        lines.append(f"{name}{_labels(names, label_values)} {_number(value)}")
+    return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Histogram:
+        metric = Histogram(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "bulletins_stage_duration_seconds", "Durée des étapes du pipeline", ("stage", "template")
+)
+STAGE_ERRORS = registry.counter("bulletins_stage_errors_total", "Étapes terminées en erreur", ("stage",))
+ROWS_PROCESSED = registry.counter(
+    "bulletins_rows_processed_total", "Lignes (apprenants) traitées", ("stage", "template")
+)
+BYTES_READ = registry.counter("bulletins_bytes_read_total", "Octets lus", ("source",))
+BYTES_WRITTEN = registry.counter("bulletins_bytes_written_total", "Octets écrits", ("target",))
+
+
+@contextmanager
+def stage(name: str, template: Optional[str] = ""):
+    start = time.perf_counter()
+    memory.before_stage(name)
+    try:
+        yield
+        # Mesure de la mémoire et contrôle du budget de la requête (MemoryBudgetExceededError)
+        memory.after_stage(name)
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.observe(duration, stage=name, template=template or "")
+        record_stage(name, duration)
+
+
+def timed_stage(name: str, template_arg: Optional[str] = None):
+    """
+    Décorateur : chronomètre chaque appel comme l'étape `name`, avec le label template lu dans
+    l'argument `template_arg` s'il est indiqué.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def template_of(args, kwargs) -> str:
+            if not template_arg:
+                return ""
+            try:
+                return signature.bind_partial(*args, **kwargs).arguments.get(template_arg) or ""
+            except TypeError:
+                return ""
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name, template_of(args, kwargs)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, template_of(args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
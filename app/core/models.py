@@ -1,6 +1,6 @@
 
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, LargeBinary, Index
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.ext.declarative import declarative_base
 import datetime
 
@@ -27,33 +27,46 @@ class Configuration(Base):
     excelUrl = Column(String, nullable=False)
     wordUrl = Column(String, nullable=False)
     userId = Column(String, ForeignKey("User.id"), nullable=False)
-    generatedExcel = Column(LargeBinary, nullable=True)
-    generatedBulletins = Column(LargeBinary, nullable=True)
+    # Contenus binaires différés : chargés seulement à l'accès à l'attribut
+    generatedExcel = deferred(Column(LargeBinary, nullable=True))
+    generatedBulletins = deferred(Column(LargeBinary, nullable=True))
     createdAt = Column(DateTime, default=datetime.datetime.utcnow)
     updatedAt = Column(DateTime, onupdate=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="configurations")
 
+    __table_args__ = (Index("Configuration_excelUrl_idx", "excelUrl"),)
+
 
 class GeneratedFile(Base):
     __tablename__ = "GeneratedFile"
     id = Column(Integer, primary_key=True, autoincrement=True)
     filename = Column(String, nullable=False)
     fileType = Column(String, nullable=False)
-    fileData = Column(LargeBinary, nullable=False)
+    fileData = deferred(Column(LargeBinary, nullable=True))
+    storageFormat = Column(String, nullable=False, default="base64")
+    blobSha256 = Column(String, nullable=True)
+    blobSize = Column(Integer, nullable=True)
+    contentType = Column(String, nullable=True)
     isTemplate = Column(Boolean, default=False)
     templateType = Column(String, nullable=True)
     category = Column(String, nullable=True)
     createdAt = Column(DateTime, default=datetime.datetime.utcnow)
     updatedAt = Column(DateTime, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (Index("GeneratedFile_filename_isTemplate_idx", "filename", "isTemplate"),)
+
 
 class GeneratedExcel(Base):
     __tablename__ = "GeneratedExcel"
     id = Column(Integer, primary_key=True, autoincrement=True)
     userId = Column(String, ForeignKey("User.id"), nullable=False)
     templateId = Column(Integer, ForeignKey("GeneratedFile.id"), nullable=False)
-    data = Column(LargeBinary, nullable=False)
+    data = deferred(Column(LargeBinary, nullable=True))
+    storageFormat = Column(String, nullable=False, default="base64")
+    blobSha256 = Column(String, nullable=True)
+    blobSize = Column(Integer, nullable=True)
+    contentType = Column(String, nullable=True)
     createdAt = Column(DateTime, default=datetime.datetime.utcnow)
     updatedAt = Column(DateTime, onupdate=datetime.datetime.utcnow)
 
@@ -0,0 +1,95 @@
+"""
+Client Prisma partagé par toute l'application.
+
+Le client (et son moteur de requêtes) est connecté une seule fois au démarrage par le lifespan
+FastAPI puis réutilisé par tous les services, au lieu d'un Prisma() / connect() / disconnect()
+à chaque appel.
+"""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.core.config import settings
+
+# Le client Prisma n'est importé qu'à la connexion, pas au démarrage de l'application
+if TYPE_CHECKING:
+    from prisma import Prisma
+
+_client: Optional["Prisma"] = None
+_lock: Optional[asyncio.Lock] = None
+
+
+def _datasource_url() -> str:
+    """
+    URL de la base complétée par les paramètres de pool du moteur Prisma
+    (connection_limit, pool_timeout), sauf s'ils sont déjà présents dans DATABASE_URL.
+    """
+    parts = urlsplit(settings.DATABASE_URL)
+    query = dict(parse_qsl(parts.query))
+    if settings.PRISMA_CONNECTION_LIMIT > 0:
+        query.setdefault("connection_limit", str(settings.PRISMA_CONNECTION_LIMIT))
+    query.setdefault("pool_timeout", str(settings.PRISMA_POOL_TIMEOUT_SECONDS))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _get_lock() -> asyncio.Lock:
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+async def connect_prisma() -> "Prisma":
+    """
+    Connecte le client partagé (appelé par le lifespan, ou à la première utilisation hors application).
+    """
+    global _client
+    async with _get_lock():
+        if _client is None:
+            from prisma import Prisma
+            _client = Prisma(datasource={"url": _datasource_url()})
+        if not _client.is_connected():
+            start = time.perf_counter()
+            await _client.connect()
+            logging.info(f"Client Prisma connecté en {(time.perf_counter() - start) * 1000:.0f} ms")
+    return _client
+
+
+async def disconnect_prisma() -> None:
+    global _client
+    async with _get_lock():
+        if _client is not None and _client.is_connected():
+            await _client.disconnect()
+            logging.info("Client Prisma déconnecté")
+        _client = None
+
+
+async def get_prisma() -> "Prisma":
+    """
+    Client partagé, connecté. Sert aussi de dépendance FastAPI : `db: Prisma = Depends(get_prisma)`.
+    """
+    if _client is not None and _client.is_connected():
+        return _client
+    return await connect_prisma()
+
+
+async def check_prisma_health() -> dict:
+    """
+    Vérifie que le moteur de requêtes répond ; tente une reconnexion en cas d'échec.
+    """
+    start = time.perf_counter()
+    try:
+        db = await get_prisma()
+        await db.query_raw("SELECT 1")
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        logging.error(f"Vérification de la connexion Prisma échouée : {str(e)}")
+        try:
+            await disconnect_prisma()
+            await connect_prisma()
+            return {"status": "reconnected", "error": str(e)}
+        except Exception as reconnect_error:
+            logging.error(f"Reconnexion Prisma impossible : {str(reconnect_error)}")
+            return {"status": "down", "error": str(reconnect_error)}
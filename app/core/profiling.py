@@ -0,0 +1,248 @@
+"""
+Profilage à la demande d'une seule requête.
+
+Quand PROFILING_ENABLED est actif, une requête envoyée avec l'en-tête `X-Profile: <PROFILING_TOKEN>`
+est exécutée sous profileur (le jeton est obligatoire, vérifié au démarrage) :
+- "sampling" (par défaut) : échantillonnage des piles de tous les threads (boucle asyncio et pool
+  openpyxl / python-docx) toutes les PROFILING_SAMPLE_INTERVAL_MS, enregistré au format speedscope ;
+- "cprofile" (`X-Profile-Mode: cprofile`) : profileur déterministe du thread de la boucle asyncio,
+  enregistré au format pstats. Le profileur est global à l'interpréteur : une seule capture à la fois,
+  les demandes simultanées sont refusées (409).
+Le profil est conservé dans PROFILE_DIR (les PROFILE_MAX_FILES plus récents) et sa référence est
+renvoyée dans les en-têtes `X-Profile-Id` / `X-Profile-Url`. /profiles demande le même en-tête mais
+n'est jamais profilé : consulter un profil en enregistrerait un nouveau, et la rotation pourrait
+supprimer celui demandé. Les autres traitements en cours au même moment apparaissent aussi dans le profil.
+
+Les requêtes sans en-tête ne font que la lecture d'un en-tête, sans autre surcoût.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+
+SAMPLING = "sampling"
+CPROFILE = "cprofile"
+_EXTENSIONS = {SAMPLING: ".speedscope.json", CPROFILE: ".pstats"}
+# Un seul profileur déterministe actif dans l'interpréteur
+_cprofile_lock = threading.Lock()
+# Routes de consultation des profils, authentifiées par X-Profile mais jamais profilées
+PROFILES_PATH = "/profiles"
+
+
+class SamplingProfiler:
+    """
+    Thread qui relève la pile de chaque thread à intervalle régulier (sys._current_frames).
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._frames: List[dict] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self._samples: Dict[int, List[List[int]]] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.duration = 0.0
+
+    def _frame_id(self, code, line: int) -> int:
+        key = (code.co_name, code.co_filename, line)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = len(self._frames)
+            self._frame_index[key] = index
+            self._frames.append({"name": code.co_name, "file": code.co_filename, "line": line})
+        return index
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.setdefault(thread_id, []).append(stack)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+        self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+    def save(self, path: str, name: str) -> None:
+        profiles = []
+        for thread_id, samples in self._samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": self._thread_names.get(thread_id, str(thread_id)),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.duration, 6),
+                "samples": samples,
+                "weights": [self.interval] * len(samples),
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": name,
+                "exporter": "bulletins-api",
+                "shared": {"frames": self._frames},
+                "profiles": profiles,
+            }, f)
+
+
+class DeterministicProfiler:
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+
+    def save(self, path: str, name: str) -> None:
+        self._profile.dump_stats(path)
+
+
+def _profile_dir() -> str:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    return settings.PROFILE_DIR
+
+
+def _save(profiler, profile_id: str, mode: str, name: str) -> None:
+    directory = _profile_dir()
+    profiler.save(os.path.join(directory, profile_id + _EXTENSIONS[mode]), name)
+    # Ne garder que les profils les plus récents
+    files = sorted((entry for entry in os.scandir(directory) if entry.is_file()), key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:-settings.PROFILE_MAX_FILES or None]:
+        os.remove(entry.path)
+
+
+def list_profiles() -> List[dict]:
+    directory = _profile_dir()
+    profiles = []
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.stat().st_mtime, reverse=True):
+        profile_id, _, extension = entry.name.partition(".")
+        profiles.append({
+            "profile_id": profile_id,
+            "format": "speedscope" if extension == "speedscope.json" else "pstats",
+            "size": entry.stat().st_size,
+            "created_at": entry.stat().st_mtime,
+        })
+    return profiles
+
+
+def find_profile(profile_id: str) -> Optional[str]:
+    if not profile_id.isalnum():
+        return None
+    for extension in _EXTENSIONS.values():
+        path = os.path.join(_profile_dir(), profile_id + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def check_profiling_settings() -> None:
+    """
+    Vérifié au démarrage : sans jeton, n'importe quel client pourrait profiler le service.
+    """
+    if settings.PROFILING_ENABLED and not settings.PROFILING_TOKEN:
+        raise RuntimeError("PROFILING_ENABLED nécessite un PROFILING_TOKEN non vide")
+
+
+def valid_token(value: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN) and value is not None and hmac.compare_digest(
+        value.encode("latin-1"), settings.PROFILING_TOKEN.encode("latin-1")
+    )
+
+
+def _requested_mode(scope) -> Optional[str]:
+    path = scope.get("path", "")
+    if path == PROFILES_PATH or path.startswith(PROFILES_PATH + "/"):
+        return None
+    flag, mode = None, SAMPLING
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            flag = value.decode("latin-1")
+        elif key == b"x-profile-mode":
+            mode = value.decode("latin-1").lower()
+    if flag is None or mode not in _EXTENSIONS:
+        return None
+    if not valid_token(flag):
+        return None
+    return mode
+
+
+async def _reject_busy(send) -> None:
+    body = json.dumps({"detail": "Un profil cprofile est déjà en cours, réessayez plus tard"}).encode()
+    await send({"type": "http.response.start", "status": 409, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI : profile la requête si l'en-tête X-Profile est présent et valide.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = _requested_mode(scope) if scope["type"] == "http" and settings.PROFILING_ENABLED else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        name = f"{scope['method']} {scope['path']}"
+
+        async def send_with_profile_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"x-profile-url", f"/profiles/{profile_id}".encode()),
+                ]}
+            await send(message)
+
+        if mode == CPROFILE and not _cprofile_lock.acquire(blocking=False):
+            logging.warning(f"Profil cprofile refusé pour {name} : une capture est déjà en cours")
+            await _reject_busy(send)
+            return
+
+        profiler = SamplingProfiler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000) if mode == SAMPLING else DeterministicProfiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_headers)
+        finally:
+            profiler.stop()
+            if mode == CPROFILE:
+                _cprofile_lock.release()
+            try:
+                await run_blocking(_save, profiler, profile_id, mode, name)
+                logging.info(f"Profil {profile_id} ({mode}) enregistré pour {name}")
+            except Exception as e:
+                logging.error(f"Enregistrement du profil {profile_id} impossible : {str(e)}")
@@ -0,0 +1,117 @@
+"""
+Détail des durées d'une requête dans l'en-tête `Server-Timing` (visible dans les outils de
+développement du navigateur) et, avec `?timings=1`, dans un bloc `timings` de la réponse JSON.
+
+Les étapes chronométrées par app.core.metrics (`stage` / `timed_stage`) et les accès aux caches
+(`record_cache`) sont rattachés à la requête en cours par une variable de contexte, y compris depuis
+les threads du pool (run_blocking copie le contexte).
+"""
+import threading
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import Request
+
+
+# Gravité des résultats de cache : le plus élevé l'emporte pour une même requête
+_CACHE_RANK = {"hit": 0, "memory": 0, "disk": 1, "miss": 2}
+
+
+class RequestTimings:
+    def __init__(self):
+        # Par étape : [durée totale (s), nombre d'appels]
+        self.stages: Dict[str, list] = {}
+        self.caches: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, duration: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += duration
+            entry[1] += 1
+
+    def add_cache(self, name: str, result: str) -> None:
+        with self._lock:
+            # Plusieurs accès au même cache : on garde le moins favorable (miss > disk > memory / hit)
+            previous = self.caches.get(name)
+            if previous is None or _CACHE_RANK.get(result, 0) > _CACHE_RANK.get(previous, 0):
+                self.caches[name] = result
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"duration_ms": round(total * 1000, 1), "count": count}
+                    for name, (total, count) in self.stages.items()
+                },
+                "caches": dict(self.caches),
+            }
+
+    def header(self) -> str:
+        timings = self.as_dict()
+        entries = [
+            f'{name};dur={values["duration_ms"]};desc="{values["count"]} appel(s)"'
+            for name, values in timings["stages"].items()
+        ]
+        entries.extend(f'cache-{name};desc="{result}"' for name, result in timings["caches"].items())
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(name: str, duration: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add_stage(name, duration)
+
+
+def record_cache(name: str, result: str) -> None:
+    """
+    Résultat d'un accès cache pour la requête en cours : "hit", "miss" ou un niveau ("memory", "disk").
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.add_cache(name, result)
+
+
+def with_timings(request: Request, payload: dict) -> dict:
+    """
+    Ajoute le bloc `timings` à la réponse (objet JSON) si la requête le demande (`?timings=1`).
+    """
+    timings = _current.get()
+    if timings is not None and isinstance(payload, dict) and request.query_params.get("timings") in ("1", "true"):
+        payload = {**payload, "timings": timings.as_dict()}
+    return payload
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI : collecte les durées des requêtes dont le chemin commence par l'un des préfixes
+    et ajoute l'en-tête Server-Timing à leur réponse.
+    """
+
+    def __init__(self, app, path_prefixes: Iterable[str]):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                header = timings.header()
+                if header:
+                    headers: List = [*message.get("headers", []), (b"server-timing", header.encode("latin-1", "replace"))]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current.reset(token)
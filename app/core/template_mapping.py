@@ -1,7 +1,12 @@
 """
 Module contenant le mapping des templates et les fonctions associées
 """
-from prisma import Prisma
+from typing import TYPE_CHECKING
+
+from app.services.file_metadata import find_template_metadata
+
+if TYPE_CHECKING:
+    from prisma import Prisma
 
 TEMPLATE_MAPPING = {
     # BG-TP-S1
@@ -71,7 +76,7 @@ TEMPLATE_MAPPING = {
     "L-BG3 ALT 1 - ALT Semestre 2": "BG-ALT-S6.xlsx",
 }
 
-async def get_template_id_from_group_name(db: Prisma, group_name: str) -> int:
+async def get_template_id_from_group_name(db: "Prisma", group_name: str) -> int:
     """
     Détermine l'ID du template Excel en fonction du nom du groupe.
     """
@@ -79,15 +84,10 @@ async def get_template_id_from_group_name(db: Prisma, group_name: str) -> int:
     if not template_filename:
         raise ValueError(f"Aucun template trouvé pour le groupe : {group_name}")
         
-    # Récupérer l'ID du template depuis la base de données
-    template = await db.generatedfile.find_first(
-        where={
-            "filename": template_filename,
-            "isTemplate": True
-        }
-    )
+    # Récupérer l'ID du template depuis la base de données (métadonnées seulement, sans le contenu)
+    template = await find_template_metadata(db, template_filename)
     
     if not template:
         raise ValueError(f"Template {template_filename} non trouvé dans la base de données")
         
-    return template.id
\ No newline at end of file
+    return template["id"]
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Répertoires de travail isolés par traitement (job), à la place du dossier ./temp partagé.
+
+Chaque traitement écrit ses fichiers (template, Excel mis à jour, bulletins...) dans son propre
+répertoire, de préférence en mémoire (tmpfs /dev/shm, s'il est assez grand pour les traitements
+simultanés). Plusieurs traitements peuvent ainsi tourner
+en parallèle sans supprimer ni écraser les fichiers des autres. Les résultats (Excel mis à jour,
+bulletins) sont enregistrés en base ou dans le stockage partagé, puis le répertoire est supprimé.
+
+- `create` / `release` : création et suppression du répertoire d'un traitement ;
+- `check_quota` : taille maximale d'un répertoire (WORKSPACE_QUOTA_BYTES) ;
+- un nettoyeur périodique supprime les répertoires inactifs depuis plus de WORKSPACE_TTL_SECONDS
+  (répertoires orphelins après un arrêt brutal).
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+
+_TMPFS_DIR = "/dev/shm"
+_WORKSPACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Fichier témoin : date de la dernière utilisation et nature du traitement
+_MARKER = ".workspace"
+
+# Types d'espaces de travail et nom de l'Excel mis à jour dans l'espace de travail
+PROCESS_EXCEL_WORKSPACE = "process-excel"
+BULLETINS_WORKSPACE = "bulletins"
+UPDATED_EXCEL_FILENAME = "updated_excel.xlsx"
+
+
+class WorkspaceQuotaError(ValueError):
+    pass
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Workspace:
+    def __init__(self, workspace_id: str, path: str, kind: str, quota_bytes: int):
+        self.id = workspace_id
+        self.path = path
+        self.kind = kind
+        self.quota_bytes = quota_bytes
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def subdir(self, name: str) -> str:
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def size(self) -> int:
+        return _directory_size(self.path)
+
+    def touch(self) -> None:
+        with open(self.file(_MARKER), "w", encoding="utf-8") as f:
+            f.write(self.kind)
+
+    def check_quota(self) -> int:
+        size = self.size()
+        if self.quota_bytes > 0 and size > self.quota_bytes:
+            raise WorkspaceQuotaError(
+                f"Espace de travail {self.id} plein : {size} octets utilisés pour {self.quota_bytes} autorisés"
+            )
+        return size
+
+
+class WorkspaceManager:
+    def __init__(self, root: str, quota_bytes: int, ttl_seconds: int):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self._active: Dict[str, Workspace] = {}
+        self._janitor: Optional[asyncio.Task] = None
+        self.stats = {"created": 0, "released": 0, "expired": 0}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, workspace_id: str) -> str:
+        if not _WORKSPACE_ID_PATTERN.match(workspace_id):
+            raise ValueError(f"Identifiant d'espace de travail invalide : {workspace_id}")
+        return os.path.join(self.root, workspace_id)
+
+    def create(self, workspace_id: Optional[str] = None, kind: str = "") -> Workspace:
+        workspace_id = workspace_id or uuid.uuid4().hex
+        path = self._path(workspace_id)
+        if workspace_id in self._active or os.path.exists(path):
+            raise ValueError(f"L'espace de travail {workspace_id} existe déjà")
+        os.makedirs(path)
+        workspace = Workspace(workspace_id, path, kind, self.quota_bytes)
+        workspace.touch()
+        self._active[workspace_id] = workspace
+        self.stats["created"] += 1
+        return workspace
+
+    def release(self, workspace: Workspace) -> None:
+        self._active.pop(workspace.id, None)
+        shutil.rmtree(workspace.path, ignore_errors=True)
+        self.stats["released"] += 1
+
+    def sweep(self) -> int:
+        """
+        Supprime les répertoires inactifs depuis plus de `ttl_seconds` (hors traitements en cours).
+        """
+        removed = 0
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or entry.name in self._active:
+                continue
+            marker = os.path.join(entry.path, _MARKER)
+            last_used = os.path.getmtime(marker) if os.path.exists(marker) else entry.stat().st_mtime
+            if now - last_used > self.ttl_seconds:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            self.stats["expired"] += removed
+            logging.info(f"{removed} espace(s) de travail expiré(s) supprimé(s)")
+        return removed
+
+    async def _run_janitor(self, interval: float) -> None:
+        while True:
+            try:
+                await run_blocking(self.sweep)
+            except Exception as e:
+                logging.error(f"Nettoyage des espaces de travail impossible : {str(e)}")
+            await asyncio.sleep(interval)
+
+    def start_janitor(self, interval: float) -> None:
+        if self._janitor is None and interval > 0:
+            self._janitor = asyncio.get_running_loop().create_task(self._run_janitor(interval))
+
+    async def stop_janitor(self) -> None:
+        if self._janitor is not None:
+            self._janitor.cancel()
+            try:
+                await self._janitor
+            except asyncio.CancelledError:
+                pass
+            self._janitor = None
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "root": self.root,
+            "active": len(self._active),
+            "retained": sum(1 for entry in os.scandir(self.root) if entry.is_dir()) - len(self._active),
+            "quota_bytes": self.quota_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def _tmpfs_free_bytes() -> int:
+    if not (os.path.isdir(_TMPFS_DIR) and os.access(_TMPFS_DIR, os.W_OK)):
+        return 0
+    stats = os.statvfs(_TMPFS_DIR)
+    return stats.f_bavail * stats.f_frsize
+
+
+def _default_root() -> str:
+    """
+    En mémoire si le tmpfs peut contenir un espace plein par créneau d'admission, sinon sous TEMP_DIR
+    (le /dev/shm de Docker ne fait que 64 Mo par défaut).
+    """
+    required = settings.WORKSPACE_QUOTA_BYTES * max(1, settings.ADMISSION_CPU_SLOTS)
+    available = _tmpfs_free_bytes()
+    if available >= required:
+        return os.path.join(_TMPFS_DIR, "bulletins-workspaces")
+    if available:
+        logging.warning(
+            f"{_TMPFS_DIR} trop petit ({available} octets libres, {required} nécessaires) : "
+            f"espaces de travail sur disque"
+        )
+    return os.path.join(settings.TEMP_DIR, "workspaces")
+
+
+_manager: Optional[WorkspaceManager] = None
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    global _manager
+    if _manager is None:
+        _manager = WorkspaceManager(
+            settings.WORKSPACE_ROOT or _default_root(),
+            settings.WORKSPACE_QUOTA_BYTES,
+            settings.WORKSPACE_TTL_SECONDS,
+        )
+        logging.info(f"Espaces de travail dans {_manager.root}")
+    return _manager
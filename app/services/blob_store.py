@@ -0,0 +1,266 @@
+"""
+Stockage des fichiers hors de la base, adressé par contenu (SHA-256).
+
+Deux implémentations interchangeables :
+- LocalBlobStore : système de fichiers local, propre à l'instance (une seule instance de l'application) ;
+- S3BlobStore : tout service compatible S3 (AWS, MinIO, stand-in local...) via boto3, partagé entre
+  workers et réplicas.
+
+La base ne conserve que l'empreinte, la taille et le type de contenu. Les lectures et écritures
+se font par blocs de BLOB_STORE_CHUNK_SIZE octets ; un contenu déjà présent n'est pas réécrit.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
+
+from app.core.config import settings
+
+
+class BlobRef(NamedTuple):
+    sha256: str
+    size: int
+
+
+class BlobNotFoundError(Exception):
+    pass
+
+
+def _iter_file(file: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class BlobStore:
+    """
+    Interface commune des stockages. Les méthodes sont synchrones : les appeler via `run_blocking`
+    depuis la boucle asyncio.
+    """
+
+    # Vrai si toutes les instances de l'application lisent le même stockage
+    shared = False
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: Optional[str] = None) -> BlobRef:
+        raise NotImplementedError
+
+    def open_stream(self, sha256: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Contenu du blob par blocs, de l'octet `start` à l'octet `end` inclus (tout le blob par défaut).
+        """
+        raise NotImplementedError
+
+    def exists(self, sha256: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, sha256: str) -> None:
+        raise NotImplementedError
+
+    def put_bytes(self, data: bytes, content_type: Optional[str] = None) -> BlobRef:
+        return self.put_stream(
+            (data[offset:offset + self.chunk_size] for offset in range(0, len(data), self.chunk_size)),
+            content_type,
+        )
+
+    def put_file(self, path: str, content_type: Optional[str] = None) -> BlobRef:
+        with open(path, "rb") as f:
+            return self.put_stream(_iter_file(f, self.chunk_size), content_type)
+
+    def get_bytes(self, sha256: str) -> bytes:
+        return b"".join(self.open_stream(sha256))
+
+    def verify(self, sha256: str, size: int) -> bool:
+        """
+        Relit le blob en entier et vérifie son empreinte et sa taille.
+        """
+        digest = hashlib.sha256()
+        read = 0
+        try:
+            for chunk in self.open_stream(sha256):
+                digest.update(chunk)
+                read += len(chunk)
+        except BlobNotFoundError:
+            return False
+        return read == size and digest.hexdigest() == sha256
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs rangés sous `root/ab/cd/abcd...` ; l'écriture passe par un fichier temporaire renommé
+    atomiquement une fois l'empreinte connue.
+    """
+
+    def __init__(self, root: str, chunk_size: int):
+        super().__init__(chunk_size)
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: Optional[str] = None) -> BlobRef:
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            path = self._path(sha256)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+            return BlobRef(sha256, size)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def open_stream(self, sha256: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        path = self._path(sha256)
+        if not os.path.exists(path):
+            raise BlobNotFoundError(f"Blob {sha256} introuvable")
+
+        def reader():
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = None if end is None else end - start + 1
+                while remaining is None or remaining > 0:
+                    chunk = f.read(self.chunk_size if remaining is None else min(self.chunk_size, remaining))
+                    if not chunk:
+                        return
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+
+        return reader()
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def delete(self, sha256: str) -> None:
+        path = self._path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Stockage compatible S3. Le contenu est d'abord écrit dans un fichier temporaire pour en
+    calculer l'empreinte (qui sert de clé), puis envoyé en multipart par boto3.
+    """
+
+    shared = True
+
+    def __init__(self, bucket: str, chunk_size: int, prefix: str = "", endpoint_url: Optional[str] = None,
+                 access_key: Optional[str] = None, secret_key: Optional[str] = None, region: Optional[str] = None):
+        super().__init__(chunk_size)
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise ValueError("Le stockage S3 nécessite le paquet boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None,
+        )
+        self._transfer_config = TransferConfig(multipart_chunksize=max(chunk_size, 5 * 1024 * 1024))
+
+    def _key(self, sha256: str) -> str:
+        return f"{self.prefix}{sha256}"
+
+    def exists(self, sha256: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(sha256))
+            return True
+        except self._client.exceptions.ClientError:
+            return False
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: Optional[str] = None) -> BlobRef:
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.TemporaryFile() as spool:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+            sha256 = digest.hexdigest()
+            if not self.exists(sha256):
+                spool.seek(0)
+                extra_args = {"ContentType": content_type} if content_type else None
+                self._client.upload_fileobj(spool, self.bucket, self._key(sha256),
+                                            ExtraArgs=extra_args, Config=self._transfer_config)
+        return BlobRef(sha256, size)
+
+    def open_stream(self, sha256: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        if end is not None and end < start:
+            # Plage vide (blob de 0 octet) : "bytes=0--1" serait refusé par S3
+            return iter(())
+        params = {"Bucket": self.bucket, "Key": self._key(sha256)}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            response = self._client.get_object(**params)
+        except self._client.exceptions.NoSuchKey:
+            raise BlobNotFoundError(f"Blob {sha256} introuvable")
+        return response["Body"].iter_chunks(self.chunk_size)
+
+    def delete(self, sha256: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(sha256))
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """
+    Stockage configuré par BLOB_STORE_BACKEND ("local", "s3"), ou None pour garder les fichiers en base ("database").
+    """
+    global _store
+    if _store is None and settings.BLOB_STORE_BACKEND != "database":
+        if settings.BLOB_STORE_BACKEND == "local":
+            _store = LocalBlobStore(settings.BLOB_STORE_DIR, settings.BLOB_STORE_CHUNK_SIZE)
+        elif settings.BLOB_STORE_BACKEND == "s3":
+            _store = S3BlobStore(
+                bucket=settings.BLOB_STORE_S3_BUCKET,
+                chunk_size=settings.BLOB_STORE_CHUNK_SIZE,
+                prefix=settings.BLOB_STORE_S3_PREFIX,
+                endpoint_url=settings.BLOB_STORE_S3_ENDPOINT_URL,
+                access_key=settings.BLOB_STORE_S3_ACCESS_KEY,
+                secret_key=settings.BLOB_STORE_S3_SECRET_KEY,
+                region=settings.BLOB_STORE_S3_REGION,
+            )
+        else:
+            raise ValueError(f"Stockage de fichiers inconnu : {settings.BLOB_STORE_BACKEND}")
+        logging.info(f"Stockage des fichiers : {settings.BLOB_STORE_BACKEND}")
+    return _store
+
+
+def check_shared_storage() -> None:
+    """
+    Vérifié au démarrage : avec plusieurs instances (APP_REPLICAS × WEB_CONCURRENCY), un fichier écrit
+    sur le disque local d'une instance serait introuvable depuis les autres.
+    """
+    instances = settings.APP_REPLICAS * settings.WEB_CONCURRENCY
+    store = get_blob_store()
+    if instances > 1 and store is not None and not store.shared:
+        raise RuntimeError(
+            f"Stockage de fichiers \"{settings.BLOB_STORE_BACKEND}\" non partagé entre les {instances} instances : "
+            "utiliser BLOB_STORE_BACKEND=database ou s3"
+        )
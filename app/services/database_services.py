@@ -1,15 +1,93 @@
-from sqlalchemy.orm import Session
-from app.core.models import User, Configuration, GeneratedFile
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import LargeBinary, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.models import User, Configuration, GeneratedExcel, GeneratedFile
 
-def create_user(db: Session, name: str, email: str):
+# Relations chargeables à la demande (?include=...) : modèle lié et colonne de jointure
+USER_RELATIONS = {
+    "configurations": (Configuration, Configuration.userId),
+    "generated_excels": (GeneratedExcel, GeneratedExcel.userId),
+}
+
+
+def listable_fields(model) -> List[str]:
+    """
+    Colonnes exposables d'un modèle : toutes sauf les contenus binaires (LargeBinary).
+    """
+    return [column.name for column in model.__table__.columns if not isinstance(column.type, LargeBinary)]
+
+
+def _selected_columns(model, fields: Optional[str]) -> list:
+    allowed = listable_fields(model)
+    if not fields:
+        names = allowed
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValueError(f"Champs inconnus pour {model.__tablename__} : {', '.join(unknown)}")
+        # L'id sert de curseur et de clé pour les relations
+        if "id" not in names:
+            names.insert(0, "id")
+    return [getattr(model, name) for name in names]
+
+
+async def _keyset_page(db: AsyncSession, model, fields: Optional[str], limit: int, after, *where) -> Tuple[List[Dict], Optional[object]]:
+    """
+    Page de `limit` lignes d'id strictement supérieur à `after`, dans l'ordre des id :
+    le coût ne dépend pas de la position dans la table (pas d'OFFSET).
+    """
+    query = select(*_selected_columns(model, fields)).where(*where).order_by(model.id).limit(limit)
+    if after is not None:
+        query = query.where(model.id > after)
+    rows = [dict(row) for row in (await db.execute(query)).mappings()]
+    next_cursor = rows[-1]["id"] if len(rows) == limit else None
+    return rows, next_cursor
+
+
+async def create_user(db: AsyncSession, name: str, email: str):
     new_user = User(name=name, email=email)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
-def get_users(db: Session):
-    return db.query(User).all()
+async def get_users(db: AsyncSession, limit: int = 50, after: Optional[str] = None,
+                    fields: Optional[str] = None, include: Optional[str] = None, include_limit: int = 10):
+    """
+    Page d'utilisateurs ; chaque relation demandée est limitée à ses `include_limit` premières lignes
+    par utilisateur (`<relation>_truncated` indique qu'il en reste), pour garder des réponses de taille bornée.
+    """
+    includes = [name.strip() for name in include.split(",") if name.strip()] if include else []
+    unknown = [name for name in includes if name not in USER_RELATIONS]
+    if unknown:
+        raise ValueError(f"Relations inconnues : {', '.join(unknown)}")
+
+    users, next_cursor = await _keyset_page(db, User, fields, limit, after)
+    user_ids = [user["id"] for user in users]
+    for relation in includes:
+        # Une seule requête par relation pour toute la page, sans les colonnes binaires
+        model, foreign_key = USER_RELATIONS[relation]
+        by_user = {user_id: [] for user_id in user_ids}
+        if user_ids:
+            # Numérotation par utilisateur : une ligne de plus que la limite pour savoir s'il en reste
+            position = func.row_number().over(partition_by=foreign_key, order_by=model.id).label("position")
+            ranked = (
+                select(*_selected_columns(model, None), position).where(foreign_key.in_(user_ids)).subquery()
+            )
+            related = await db.execute(
+                select(*[column for column in ranked.c if column.name != "position"])
+                .where(ranked.c.position <= include_limit + 1)
+                .order_by(ranked.c.id)
+            )
+            for row in related.mappings():
+                by_user[row["userId"]].append(dict(row))
+        for user in users:
+            rows = by_user[user["id"]]
+            user[relation] = rows[:include_limit]
+            user[f"{relation}_truncated"] = len(rows) > include_limit
+    return users, next_cursor
 
-def get_templates(db: Session, is_template: bool = True):
-    return db.query(GeneratedFile).filter(GeneratedFile.isTemplate == is_template).all()
+async def get_templates(db: AsyncSession, is_template: bool = True, limit: int = 50,
+                        after: Optional[int] = None, fields: Optional[str] = None):
+    return await _keyset_page(db, GeneratedFile, fields, limit, after, GeneratedFile.isTemplate == is_template)
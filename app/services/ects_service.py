@@ -1,7 +1,20 @@
+import asyncio
 import logging
-import json
+import re
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Optional
+
+from app.core.bulletin_layouts import BULLETIN_LAYOUTS
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.prisma_client import get_prisma
+
+# NumPy chargé au premier calcul, pas au démarrage de l'application
+np = lazy_import("numpy")
 
 # Définition des ECTS en tant que constante
+# (données de secours utilisées tant que la table ECTSTemplate est vide ou inaccessible)
 ECTS_DATA = {
     "M1-S1": [{"ECTS1": 2, "ECTS2": 2, "ECTS3": 2, "ECTS4": 3, "ECTS5": 2, "ECTS6": 2, "ECTS7": 2, "ECTS8": 0, "ECTS9": 0, "ECTS10": 0, "ECTS11": 9, "ECTS12": 0, "ECTS13": 2, "ECTS14": 2, "ECTS15": 2}],
     "M1-S2": [{"ECTS1": 2, "ECTS2": 2, "ECTS3": 2, "ECTS4": 2, "ECTS5": 1, "ECTS6": 9, "ECTS7": 2, "ECTS8": 2, "ECTS9": 0, "ECTS10": 0, "ECTS11": 0, "ECTS12": 0, "ECTS13": 2, "ECTS14": 2, "ECTS15": 2, "ECTS16": 2}],
@@ -23,27 +36,203 @@ ECTS_DATA = {
     "BG_TP_6": [{"ECTS1": 14, "ECTS2": 4, "ECTS3": 2}]
 }
 
-async def get_ects_for_template(template_name: str):
+_ECTS_KEY = re.compile(r"ECTS(\d+)")
+
+
+def _normalize_template_name(template_name: str) -> str:
+    # Normaliser le nom du template (enlever le _S s'il existe)
+    return template_name.replace("_S", "")
+
+
+def _parse_ects_values(raw) -> tuple:
     """
-    Récupère les ECTS pour un template donné depuis les données statiques
+    Convertit la colonne Json `ects` (liste contenant un dict {"ECTS1": 2, ...}, dict seul
+    ou liste d'entiers) en tuple d'entiers ordonné ECTS1..ECTSn.
     """
-    try:
-        # Normaliser le nom du template (enlever le _S s'il existe)
-        normalized_name = template_name.replace("_S", "")
-        
-        if normalized_name not in ECTS_DATA:
+    if isinstance(raw, list) and raw and isinstance(raw[0], dict):
+        raw = raw[0]
+    if isinstance(raw, dict):
+        indexed = {}
+        for key, value in raw.items():
+            match = _ECTS_KEY.fullmatch(str(key))
+            if not match:
+                raise ValueError(f"Clé ECTS invalide : {key}")
+            indexed[int(match.group(1))] = int(value)
+        if sorted(indexed) != list(range(1, len(indexed) + 1)):
+            raise ValueError(f"ECTS non consécutifs : {sorted(indexed)}")
+        return tuple(indexed[i] for i in range(1, len(indexed) + 1))
+    if isinstance(raw, list):
+        return tuple(int(value) for value in raw)
+    raise ValueError(f"Format ECTS non reconnu : {type(raw).__name__}")
+
+
+class LayoutECTS:
+    """
+    ECTS d'un template appliqués à une disposition de bulletin : ECTS des matières,
+    partition par UE et totaux, calculés une fois au chargement du catalogue.
+    """
+
+    __slots__ = ("values", "ue_totals", "total")
+
+    def __init__(self, values: "np.ndarray", ues: dict):
+        self.values = values
+        self.ue_totals = MappingProxyType({ue: int(values[[i - 1 for i in subjects]].sum()) for ue, subjects in ues.items()})
+        self.total = int(sum(self.ue_totals.values()))
+
+
+class ECTSTemplateEntry:
+    """
+    ECTS d'un template : tableau d'entiers, variables Word (ECTS1, ECTS2... en chaînes)
+    et déclinaisons par disposition de bulletin.
+    """
+
+    __slots__ = ("name", "values", "placeholders", "layouts")
+
+    def __init__(self, name: str, values: tuple):
+        self.name = name
+        self.values = np.asarray(values, dtype=np.int64)
+        self.values.setflags(write=False)
+        self.placeholders = MappingProxyType({f"ECTS{i}": str(value) for i, value in enumerate(values, start=1)})
+
+        layouts = {}
+        for layout_name, layout in BULLETIN_LAYOUTS.items():
+            n_subjects = len(layout["note_columns"])
+            if n_subjects <= len(values):
+                layouts[layout_name] = LayoutECTS(self.values[:n_subjects], layout["ues"])
+        self.layouts = MappingProxyType(layouts)
+
+    def for_layout(self, layout_name: str) -> LayoutECTS:
+        layout_ects = self.layouts.get(layout_name)
+        if layout_ects is None:
+            n_subjects = len(BULLETIN_LAYOUTS[layout_name]["note_columns"]) if layout_name in BULLETIN_LAYOUTS else "?"
+            raise ValueError(
+                f"Missing ECTS values for {layout_name}: {n_subjects} attendus, {len(self.values)} dans {self.name}"
+            )
+        return layout_ects
+
+
+class ECTSCatalog:
+    """
+    Instantané immuable du catalogue ECTS. Un rechargement construit un nouvel instantané
+    puis remplace la référence globale : les traitements en cours gardent l'ancien.
+    """
+
+    def __init__(self, entries: Dict[str, ECTSTemplateEntry], source: str, version: Optional[tuple] = None):
+        self.entries = MappingProxyType(entries)
+        self.source = source
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+
+    def get(self, template_name: str) -> ECTSTemplateEntry:
+        normalized_name = _normalize_template_name(template_name)
+        entry = self.entries.get(normalized_name)
+        if entry is None:
             logging.error(f"Template ECTS non trouvé : {normalized_name}")
             raise ValueError(f"Template ECTS non trouvé : {normalized_name}")
-            
-        # Récupérer les données ECTS
-        ects_data = ECTS_DATA[normalized_name][0]
-        
-        # Convertir toutes les valeurs en chaînes
-        result = {k: str(v) for k, v in ects_data.items()}
-        logging.info(f"ECTS trouvés pour {normalized_name}: {result}")
-        
-        return result
-        
+        return entry
+
+    def snapshot(self) -> dict:
+        return {
+            "source": self.source,
+            "templates": len(self.entries),
+            "version": [str(part) for part in self.version] if self.version else None,
+            "loaded_at": self.loaded_at.isoformat(),
+        }
+
+
+def _static_catalog() -> ECTSCatalog:
+    return ECTSCatalog(
+        {name: ECTSTemplateEntry(name, _parse_ects_values(data)) for name, data in ECTS_DATA.items()},
+        source="static",
+    )
+
+
+# Données statiques construites au premier accès (NumPy n'est pas chargé à l'import du module)
+_catalog: Optional[ECTSCatalog] = None
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_ects_catalog() -> ECTSCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = _static_catalog()
+    return _catalog
+
+
+async def _catalog_version(db) -> tuple:
+    """
+    Signature de la table : nombre de lignes et dernière modification.
+    """
+    count = await db.ectstemplate.count()
+    latest = await db.ectstemplate.find_first(order={"updatedAt": "desc"})
+    return (count, latest.updatedAt if latest else None)
+
+
+async def reload_ects_catalog(force: bool = False) -> ECTSCatalog:
+    """
+    Recharge le catalogue depuis la table ECTSTemplate si elle a changé (ou si `force`).
+    Les lignes invalides sont ignorées ; si la table est vide, les données statiques restent en place.
+    """
+    global _catalog
+    db = await get_prisma()
+    version = await _catalog_version(db)
+    if not force and version == get_ects_catalog().version:
+        return _catalog
+
+    rows = await db.ectstemplate.find_many()
+    entries = {}
+    for row in rows:
+        try:
+            entries[_normalize_template_name(row.name)] = ECTSTemplateEntry(row.name, _parse_ects_values(row.ects))
+        except (ValueError, TypeError) as e:
+            logging.error(f"Template ECTS {row.name} ignoré : {str(e)}")
+
+    if not entries:
+        logging.warning("Table ECTSTemplate vide, conservation des ECTS statiques")
+        _catalog = ECTSCatalog(dict(_static_catalog().entries), source="static", version=version)
+    else:
+        _catalog = ECTSCatalog(entries, source="database", version=version)
+    logging.info(f"Catalogue ECTS chargé : {len(_catalog.entries)} template(s) ({_catalog.source})")
+    return _catalog
+
+
+async def _refresh_loop(interval: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload_ects_catalog()
+        except Exception as e:
+            logging.error(f"Erreur lors du rechargement du catalogue ECTS : {str(e)}")
+
+
+async def start_ects_catalog() -> None:
+    """
+    Chargement initial au démarrage puis surveillance périodique de la table.
+    """
+    global _refresh_task
+    try:
+        await reload_ects_catalog(force=True)
     except Exception as e:
-        logging.error(f"Erreur lors de la récupération des ECTS : {str(e)}")
-        raise
\ No newline at end of file
+        logging.error(f"Catalogue ECTS indisponible, utilisation des données statiques : {str(e)}")
+    if settings.ECTS_CATALOG_REFRESH_SECONDS > 0 and _refresh_task is None:
+        _refresh_task = asyncio.get_running_loop().create_task(_refresh_loop(settings.ECTS_CATALOG_REFRESH_SECONDS))
+
+
+async def stop_ects_catalog() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+async def get_ects_for_template(template_name: str):
+    """
+    Récupère les ECTS (ECTS1, ECTS2... en chaînes) d'un template depuis le catalogue chargé
+    """
+    entry = get_ects_catalog().get(template_name)
+    logging.info(f"ECTS trouvés pour {entry.name} ({len(entry.values)} matières)")
+    return entry.placeholders
@@ -1,17 +1,60 @@
-import base64
-import openpyxl
 import os
 import logging
 from io import BytesIO
-import requests
 from app.services.prisma_service import fetch_template_from_prisma, get_template_from_prisma
 from app.services.ypareo_service import YpareoService
 from app.utils.utils import convert_minutes_to_hours_and_minutes
-from prisma import Prisma
-from docx import Document
+from app.core.prisma_client import get_prisma
+from app.services.file_metadata import find_word_url
+from app.services.file_storage import stored_file_fields
 from app.core.template_mapping import get_template_id_from_group_name
+from app.core.cancellation import CancellationToken, OperationCancelledError
+from app.core.executor import run_blocking
+from app.core.workspace import UPDATED_EXCEL_FILENAME
+from app.core.lazy import lazy_import
+from app.core.memory import low_memory_mode
+from app.core.metrics import timed_stage
 
+openpyxl = lazy_import("openpyxl")
+requests = lazy_import("requests")
+docx = lazy_import("docx")
 
+
+class SheetValues:
+    """
+    Valeurs de la feuille active sans les objets Cell ni les styles d'openpyxl (mode mémoire réduite) ;
+    s'utilise comme une feuille pour la lecture : `ws["C1"].value`, `ws.max_row`.
+    """
+
+    class _Cell:
+        __slots__ = ("value",)
+
+        def __init__(self, value):
+            self.value = value
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.max_row = len(rows)
+
+    def __getitem__(self, coordinate: str):
+        column, row = openpyxl.utils.cell.coordinate_from_string(coordinate)
+        column_index = openpyxl.utils.cell.column_index_from_string(column)
+        values = self._rows[row - 1] if row <= len(self._rows) else ()
+        return self._Cell(values[column_index - 1] if column_index <= len(values) else None)
+
+
+def load_sheet_values(path) -> SheetValues:
+    """
+    Lit la feuille active en lecture seule (flux XML) et n'en garde que les valeurs.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return SheetValues([tuple(row) for row in wb.active.iter_rows(values_only=True)])
+    finally:
+        wb.close()
+
+
+@timed_stage("excel_download")
 def download_excel_from_url(url: str) -> BytesIO:
     """
     Télécharge le fichier Excel depuis une URL et le retourne en BytesIO.
@@ -25,7 +68,99 @@ def download_excel_from_url(url: str) -> BytesIO:
         logging.error(f"Erreur lors du téléchargement du fichier : {str(e)}")
         raise ValueError(f"Erreur lors du téléchargement du fichier : {str(e)}")
 
-def copy_multiple_cells(source_url: str, template_path: str, output_dir: str) -> str:
+
+# Colonnes lues dans le classeur source Yparéo (à partir de la ligne 6) et colonnes du template où elles sont copiées
+COPY_CELL_CONFIGS = {
+    "BG-TP-S1.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'U', 'X', 'AD', 'AG', 'AJ', 'AM', 'AP', 'AV', 'AY', 'BE', 'BH', 'BK', 'BN', 'BQ', 'BT', 'BW', 'BZ'],
+        "target_columns": ['B', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'L', 'M', 'N', 'O', 'P', 'R', 'S', 'U', 'V', 'W', 'X', 'Y', 'Z', 'AA', 'AB']
+    },
+    "BG-TP-S2.xlsx": {
+        "source_columns": ['B', 'F', 'I'],
+        "target_columns": ['B', 'D', 'E']
+    },
+    "BG-TP-S3.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'U', 'X', 'AA', 'AD', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB', 'BE'],
+        "target_columns": ['B', 'D', 'E', 'F', 'G', 'I', 'J', 'L', 'M', 'O', 'P', 'R', 'S', 'T', 'U']
+    },
+    "BG-TP-S4.xlsx": {
+        "source_columns": ['B', 'F', 'I'],
+        "target_columns": ['B', 'D', 'E']
+    },
+    "BG-TP-S5.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'U', 'X', 'AA', 'AD', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB', 'BE', 'BH', 'BK', 'BN', 'BQ'],
+        "target_columns": ['B', 'D', 'E', 'F', 'G', 'H', 'J', 'K', 'L', 'M', 'N', 'P', 'Q', 'R', 'T', 'U', 'V', 'W', 'X', 'Y']
+    },
+    "BG-TP-S6.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L'],
+        "target_columns": ['B', 'D', 'E', 'F']
+    },
+    
+    "BG-ALT-S1.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'R', 'U', 'AA', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB'],
+        "target_columns": ['B', 'D', 'E', 'F', 'H', 'I', 'K', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T']
+    },
+    "BG-ALT-S2.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'O', 'U', 'X', 'AA', 'AG', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB', 'BE'],
+        "target_columns": ['B', 'D', 'E', 'F', 'G', 'I', 'J', 'K', 'M', 'O', 'P', 'Q', 'R', 'S', 'T', 'U']
+    },
+    "BG-ALT-S3.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'X', 'AA', 'AG', 'AM', 'AP', 'AS', 'AV', 'AY'],
+        "target_columns": ['B', 'D', 'E', 'F', 'G', 'H', 'J', 'K', 'M', 'O', 'P', 'Q', 'R', 'S']
+    },
+    "BG-ALT-S4.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'R', 'U', 'X', 'AA', 'AG', 'AM', 'AP', 'AS', 'AV', 'AY'],
+        "target_columns": ['B', 'D', 'E', 'F', 'H', 'J', 'K', 'M', 'O', 'P', 'Q', 'R', 'S']
+    },
+    "BG-ALT-S5.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'L', 'R', 'U', 'X', 'AD', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB'],
+        "target_columns": ['B', 'D', 'E', 'F', 'H', 'I', 'J', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T']
+    },
+    "BG-ALT-S6.xlsx": {
+        "source_columns": ['B', 'F', 'I', 'O', 'R', 'X', 'AA', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV'],
+        "target_columns": ['B', 'D', 'E', 'G', 'H', 'J', 'K', 'M', 'N', 'O', 'P', 'Q', 'R']
+    },
+    
+}
+
+
+def copy_cells(source_ws, template_ws, source_columns, target_columns, cancel_token: CancellationToken = None) -> None:
+    """
+    Copie colonne par colonne les valeurs du classeur source (à partir de la ligne 6) vers le template
+    (à partir de la ligne 3), en ignorant les cellules vides et les lignes de pied de tableau.
+    """
+    source_start_row = 6
+    target_start_row = 3
+
+    for source_col, target_col in zip(source_columns, target_columns):
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        row_offset = 0
+        for row in range(source_start_row, source_ws.max_row + 1):
+            source_cell = f'{source_col}{row}'
+            target_cell = f'{target_col}{target_start_row + row_offset}'
+
+            source_value = source_ws[source_cell].value
+
+            # Vérifier et ignorer les valeurs spécifiques
+            if source_value is not None and not isinstance(source_value, str):
+                source_value = str(source_value)
+
+            if source_value is not None and (
+                "* Attention, le total des absences" in source_value or
+                "Moyenne du groupe" in source_value
+            ):
+                logging.info(f"Valeur ignorée : {source_value} (cellule {source_cell})")
+                continue
+
+            if source_value is not None:
+                template_ws[target_cell] = source_value
+                logging.info(f"Copie de {source_value} depuis {source_cell} vers {target_cell}")
+                row_offset += 1
+
+
+@timed_stage("excel_copy_cells")
+def copy_multiple_cells(source_url: str, template_path: str, output_dir: str, cancel_token: CancellationToken = None) -> str:
     """
     Copie les valeurs des cellules spécifiées dans le fichier source vers les cellules correspondantes dans le template.
     """
@@ -44,94 +179,13 @@ def copy_multiple_cells(source_url: str, template_path: str, output_dir: str) ->
         # Déterminer quel template est utilisé
         template_name = os.path.basename(template_path)
         
-        # Configuration des colonnes pour chaque template
-        template_configs = {
-            "BG-TP-S1.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'U', 'X', 'AD', 'AG', 'AJ', 'AM', 'AP', 'AV', 'AY', 'BE', 'BH', 'BK', 'BN', 'BQ', 'BT', 'BW', 'BZ'],
-                "target_columns": ['B', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'L', 'M', 'N', 'O', 'P', 'R', 'S', 'U', 'V', 'W', 'X', 'Y', 'Z', 'AA', 'AB']
-            },
-            "BG-TP-S2.xlsx": {
-                "source_columns": ['B', 'F', 'I'],
-                "target_columns": ['B', 'D', 'E']
-            },
-            "BG-TP-S3.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'U', 'X', 'AA', 'AD', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB', 'BE'],
-                "target_columns": ['B', 'D', 'E', 'F', 'G', 'I', 'J', 'L', 'M', 'O', 'P', 'R', 'S', 'T', 'U']
-            },
-            "BG-TP-S4.xlsx": {
-                "source_columns": ['B', 'F', 'I'],
-                "target_columns": ['B', 'D', 'E']
-            },
-            "BG-TP-S5.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'U', 'X', 'AA', 'AD', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB', 'BE', 'BH', 'BK', 'BN', 'BQ'],
-                "target_columns": ['B', 'D', 'E', 'F', 'G', 'H', 'J', 'K', 'L', 'M', 'N', 'P', 'Q', 'R', 'T', 'U', 'V', 'W', 'X', 'Y']
-            },
-            "BG-TP-S6.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L'],
-                "target_columns": ['B', 'D', 'E', 'F']
-            },
-            
-            "BG-ALT-S1.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'R', 'U', 'AA', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB'],
-                "target_columns": ['B', 'D', 'E', 'F', 'H', 'I', 'K', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T']
-            },
-            "BG-ALT-S2.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'O', 'U', 'X', 'AA', 'AG', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB', 'BE'],
-                "target_columns": ['B', 'D', 'E', 'F', 'G', 'I', 'J', 'K', 'M', 'O', 'P', 'Q', 'R', 'S', 'T', 'U']
-            },
-            "BG-ALT-S3.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'O', 'R', 'X', 'AA', 'AG', 'AM', 'AP', 'AS', 'AV', 'AY'],
-                "target_columns": ['B', 'D', 'E', 'F', 'G', 'H', 'J', 'K', 'M', 'O', 'P', 'Q', 'R', 'S']
-            },
-            "BG-ALT-S4.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'R', 'U', 'X', 'AA', 'AG', 'AM', 'AP', 'AS', 'AV', 'AY'],
-                "target_columns": ['B', 'D', 'E', 'F', 'H', 'J', 'K', 'M', 'O', 'P', 'Q', 'R', 'S']
-            },
-            "BG-ALT-S5.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'L', 'R', 'U', 'X', 'AD', 'AJ', 'AM', 'AP', 'AS', 'AV', 'AY', 'BB'],
-                "target_columns": ['B', 'D', 'E', 'F', 'H', 'I', 'J', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T']
-            },
-            "BG-ALT-S6.xlsx": {
-                "source_columns": ['B', 'F', 'I', 'O', 'R', 'X', 'AA', 'AG', 'AJ', 'AM', 'AP', 'AS', 'AV'],
-                "target_columns": ['B', 'D', 'E', 'G', 'H', 'J', 'K', 'M', 'N', 'O', 'P', 'Q', 'R']
-            },
-            
-        }
-
         # Obtenir la configuration pour le template actuel
-        config = template_configs.get(template_name)
+        config = COPY_CELL_CONFIGS.get(template_name)
         if not config:
             raise ValueError(f"Configuration non trouvée pour le template : {template_name}")
 
-        source_columns = config["source_columns"]
-        target_columns = config["target_columns"]
-        source_start_row = 6
-        target_start_row = 3
-
         # Copier les valeurs des cellules source vers les cellules cibles
-        for source_col, target_col in zip(source_columns, target_columns):
-            row_offset = 0
-            for row in range(source_start_row, source_ws.max_row + 1):
-                source_cell = f'{source_col}{row}'
-                target_cell = f'{target_col}{target_start_row + row_offset}'
-
-                source_value = source_ws[source_cell].value
-
-                # Vérifier et ignorer les valeurs spécifiques
-                if source_value is not None and not isinstance(source_value, str):
-                    source_value = str(source_value)
-
-                if source_value is not None and (
-                    "* Attention, le total des absences" in source_value or
-                    "Moyenne du groupe" in source_value
-                ):
-                    logging.info(f"Valeur ignorée : {source_value} (cellule {source_cell})")
-                    continue
-
-                if source_value is not None:
-                    template_ws[target_cell] = source_value
-                    logging.info(f"Copie de {source_value} depuis {source_cell} vers {target_cell}")
-                    row_offset += 1
+        copy_cells(source_ws, template_ws, config["source_columns"], config["target_columns"], cancel_token)
 
         # Sauvegarder le fichier mis à jour
         if not os.path.exists(output_dir):
@@ -143,6 +197,8 @@ def copy_multiple_cells(source_url: str, template_path: str, output_dir: str) ->
 
         return updated_template_path
 
+    except OperationCancelledError:
+        raise
     except Exception as e:
         logging.error(f"Erreur lors de la copie des cellules spécifiques : {str(e)}")
         raise ValueError(f"Erreur lors de la copie des cellules spécifiques : {str(e)}")
@@ -177,7 +233,8 @@ def compare_group_code_types(template_path: str):
     except Exception as e:
         logging.error(f"Erreur de comparaison : {str(e)}")
 
-async def process_excel_with_template(excel_url: str, output_dir: str, prisma_template: str, user_id: str):
+@timed_stage("process_excel", template_arg="prisma_template")
+async def process_excel_with_template(excel_url: str, output_dir: str, prisma_template: str, user_id: str, cancel_token: CancellationToken = None):
     """
     Processus complet : récupère le template, copie les données, et sauvegarde le fichier.
     """
@@ -186,33 +243,28 @@ async def process_excel_with_template(excel_url: str, output_dir: str, prisma_te
 
         # Get template and copy cells
         template_excel_path = await get_template_from_prisma(prisma_template, output_dir)
-        updated_template_path = copy_multiple_cells(excel_url, template_excel_path, output_dir)
+        updated_template_path = await run_blocking(copy_multiple_cells, excel_url, template_excel_path, output_dir, cancel_token)
+        if cancel_token:
+            await cancel_token.checkpoint()
         
         # Get Word URL from Prisma
-        db = Prisma()
-        await db.connect()
-        config = await db.configuration.find_first(
-            where={
-                "excelUrl": excel_url
-            }
-        )
-        word_url = config.wordUrl if config else None
+        db = await get_prisma()
+        word_url = await find_word_url(db, excel_url)
         
         if not word_url:
-            await db.disconnect()
             logging.warning("Pas d'URL Word trouvée dans la configuration")
             raise ValueError("URL du fichier Word manquante")
 
         # Fill template with Ypareo data and appreciations
-        updated_template_path = await fill_template_with_ypareo_data(excel_url, updated_template_path, output_dir, word_url)
+        updated_template_path = await fill_template_with_ypareo_data(excel_url, updated_template_path, output_dir, word_url, cancel_token)
         
         # Lire le fichier Excel source pour obtenir le nom du groupe
-        excel_response = requests.get(excel_url)
+        excel_response = await run_blocking(requests.get, excel_url)
         if excel_response.status_code != 200:
             raise ValueError("Impossible de télécharger le fichier Excel source")
             
         source_excel = BytesIO(excel_response.content)
-        wb = openpyxl.load_workbook(source_excel)
+        wb = await run_blocking(openpyxl.load_workbook, source_excel)
         ws = wb.active
         
         # Lire le nom du groupe depuis la cellule B2
@@ -227,20 +279,13 @@ async def process_excel_with_template(excel_url: str, output_dir: str, prisma_te
         # Obtenir l'ID du template correspondant au groupe
         template_id = await get_template_id_from_group_name(db, group_name)
 
-        # Sauvegarder l'Excel mis à jour dans Prisma
-        with open(updated_template_path, 'rb') as file:
-            file_content = file.read()
-            # Convertir les données binaires en Base64
-            file_content_base64 = base64.b64encode(file_content).decode('utf-8')
+        # Sauvegarder l'Excel mis à jour : fichier envoyé par blocs au stockage, métadonnées dans Prisma
+        generated_excel = await db.generatedexcel.create({
+            'userId': user_id,
+            'templateId': template_id,
+            **await stored_file_fields('data', os.path.basename(updated_template_path), path=updated_template_path)
+        })
             
-            # Créer l'enregistrement dans Prisma avec les données en Base64
-            generated_excel = await db.generatedexcel.create({
-                'data': file_content_base64,
-                'userId': user_id,
-                'templateId': template_id
-            })
-            
-        await db.disconnect()
         logging.info(f"Excel sauvegardé dans Prisma avec l'ID : {generated_excel.id}")
         
         return {
@@ -248,11 +293,79 @@ async def process_excel_with_template(excel_url: str, output_dir: str, prisma_te
             "excel_id": generated_excel.id
         }
 
+    except OperationCancelledError:
+        raise
     except Exception as e:
         logging.error(f"Erreur pendant le traitement des données : {str(e)}")
         raise ValueError(f"Erreur lors du traitement du fichier Excel avec template : {str(e)}")
     
-async def fill_template_with_ypareo_data(source_url: str, template_path: str, output_dir: str, word_url: str) -> str:
+def summarize_absences(absences: dict) -> dict:
+    """
+    Durées des absences de chaque apprenant (par code apprenant) : justifiées, non justifiées et retards.
+    """
+    absences_summary = {}
+    for code_apprenant, abs_list in absences.items():
+        absences_summary[str(code_apprenant)] = {  # Convertir en string pour la comparaison
+            'justified': [],
+            'unjustified': [],
+            'delays': []
+        }
+        
+        for absence in abs_list:
+            duree = int(absence.get('duree', 0))  # Convertir en int
+            if absence.get('isJustifie'):
+                absences_summary[str(code_apprenant)]['justified'].append(duree)
+            elif absence.get('isRetard'):
+                absences_summary[str(code_apprenant)]['delays'].append(duree)
+            else:
+                absences_summary[str(code_apprenant)]['unjustified'].append(duree)
+    return absences_summary
+
+
+def build_apprenant_mapping(frequentes, groupes, apprenants) -> dict:
+    """
+    Données Yparéo de chaque apprenant ("NOM PRÉNOM" en majuscules) avec celles de son groupe.
+    """
+    # Étape 1: Mapping des groupes par codeGroupe
+    # Créer le mapping des groupes
+    groupes_mapping = {
+        str(groupe["codeGroupe"]): {
+            "codeGroupe": str(groupe["codeGroupe"]),
+            "nomGroupe": groupe.get("nomGroupe", ""),
+            "etenduGroupe": groupe.get("etenduGroupe", "")
+        }
+        for groupe in groupes  # Supprimé .values() car groupes est déjà une liste
+        if isinstance(groupe, dict) and "codeGroupe" in groupe
+    }
+
+    # Créer le mapping des fréquentations
+    frequentation_groupe_mapping = {
+        str(frequentation.get("codeApprenant", "")): str(frequentation.get("codeGroupe", ""))
+        for frequentation in frequentes
+        if isinstance(frequentation, dict)
+    }
+    
+    # Créer le mapping complet des apprenants avec leurs données de groupe
+    apprenant_mapping = {
+        f"{a['nomApprenant'].strip().upper()} {a['prenomApprenant'].strip().upper()}": {
+            "codeApprenant": str(a.get("codeApprenant", "")),
+            "dateNaissance": str(a.get("dateNaissance", "")),
+            "site": str(a.get("inscriptions", [{}])[0].get("site", {}).get("nomSite", "")),
+            **groupes_mapping.get(
+                frequentation_groupe_mapping.get(
+                    str(a.get("codeApprenant", "")), 
+                    ""
+                ), 
+                {"codeGroupe": "", "nomGroupe": "", "etenduGroupe": ""}
+            )
+        }
+        for a in apprenants if isinstance(a, dict)
+    }
+    return apprenant_mapping
+
+
+@timed_stage("excel_fill")
+async def fill_template_with_ypareo_data(source_url: str, template_path: str, output_dir: str, word_url: str, cancel_token: CancellationToken = None) -> str:
     """
     Remplit le template Excel avec les données Yparéo, y compris nomGroupe et etenduGroupe,
     en fonction des codeGroupe des apprenants fréquents.
@@ -260,7 +373,7 @@ async def fill_template_with_ypareo_data(source_url: str, template_path: str, ou
     try:
         
         # Télécharger et traiter le fichier Word
-        word_response = requests.get(word_url)
+        word_response = await run_blocking(requests.get, word_url)
         word_response.raise_for_status()
         temp_word_path = os.path.join(output_dir, "temp.docx")
         with open(temp_word_path, 'wb') as f:
@@ -268,7 +381,7 @@ async def fill_template_with_ypareo_data(source_url: str, template_path: str, ou
 
         # Extraire les appréciations du document Word
         appreciations = {}
-        doc = Document(temp_word_path)
+        doc = await run_blocking(docx.Document, temp_word_path)
         for table in doc.tables:
             for row in table.rows:
                 if len(row.cells) >= 2:
@@ -278,72 +391,31 @@ async def fill_template_with_ypareo_data(source_url: str, template_path: str, ou
                         appreciations[nom] = appreciation
 
         # Charger les fichiers Excel
-        template_wb = openpyxl.load_workbook(template_path)
+        template_wb = await run_blocking(openpyxl.load_workbook, template_path)
         template_ws = template_wb.active
         template_name = os.path.basename(template_path)
         logging.info(f"Traitement du template : {template_name}")
 
-        # Récupérer les données Yparéo
-        frequentes = YpareoService.get_frequentes()
-        groupes = YpareoService.get_groupes()
-        apprenants = YpareoService.get_apprenants()
-        absences = YpareoService.get_absences()
+        # Récupérer les données Yparéo (avec un point de contrôle entre chaque appel)
+        ypareo_data = {}
+        for name, fetch in (("frequentes", YpareoService.get_frequentes),
+                            ("groupes", YpareoService.get_groupes),
+                            ("apprenants", YpareoService.get_apprenants),
+                            ("absences", YpareoService.get_absences)):
+            if cancel_token:
+                await cancel_token.checkpoint()
+            ypareo_data[name] = await run_blocking(fetch)
+        frequentes = ypareo_data["frequentes"]
+        groupes = ypareo_data["groupes"]
+        apprenants = ypareo_data["apprenants"]
+        absences = ypareo_data["absences"]
         
         # Traitement des absences
-        # Traitement des absences
-        absences_summary = {}
-        for code_apprenant, abs_list in absences.items():
-            absences_summary[str(code_apprenant)] = {  # Convertir en string pour la comparaison
-                'justified': [],
-                'unjustified': [],
-                'delays': []
-            }
-            
-            for absence in abs_list:
-                duree = int(absence.get('duree', 0))  # Convertir en int
-                if absence.get('isJustifie'):
-                    absences_summary[str(code_apprenant)]['justified'].append(duree)
-                elif absence.get('isRetard'):
-                    absences_summary[str(code_apprenant)]['delays'].append(duree)
-                else:
-                    absences_summary[str(code_apprenant)]['unjustified'].append(duree)
-
-        # Étape 1: Mapping des groupes par codeGroupe
-        # Créer le mapping des groupes
-        groupes_mapping = {
-            str(groupe["codeGroupe"]): {
-                "codeGroupe": str(groupe["codeGroupe"]),
-                "nomGroupe": groupe.get("nomGroupe", ""),
-                "etenduGroupe": groupe.get("etenduGroupe", "")
-            }
-            for groupe in groupes  # Supprimé .values() car groupes est déjà une liste
-            if isinstance(groupe, dict) and "codeGroupe" in groupe
-        }
+        absences_summary = summarize_absences(absences)
+
+        # Jointure apprenants / fréquentations / groupes
+        apprenant_mapping = build_apprenant_mapping(frequentes, groupes, apprenants)
 
-        # Créer le mapping des fréquentations
-        frequentation_groupe_mapping = {
-            str(frequentation.get("codeApprenant", "")): str(frequentation.get("codeGroupe", ""))
-            for frequentation in frequentes
-            if isinstance(frequentation, dict)
-        }
-        
-        # Créer le mapping complet des apprenants avec leurs données de groupe
-        apprenant_mapping = {
-            f"{a['nomApprenant'].strip().upper()} {a['prenomApprenant'].strip().upper()}": {
-                "codeApprenant": str(a.get("codeApprenant", "")),
-                "dateNaissance": str(a.get("dateNaissance", "")),
-                "site": str(a.get("inscriptions", [{}])[0].get("site", {}).get("nomSite", "")),
-                **groupes_mapping.get(
-                    frequentation_groupe_mapping.get(
-                        str(a.get("codeApprenant", "")), 
-                        ""
-                    ), 
-                    {"codeGroupe": "", "nomGroupe": "", "etenduGroupe": ""}
-                )
-            }
-            for a in apprenants if isinstance(a, dict)
-        }
-        
         # Configuration des colonnes pour chaque template
         template_configs = {
             "BG-TP-S1.xlsx": {
@@ -516,6 +588,8 @@ async def fill_template_with_ypareo_data(source_url: str, template_path: str, ou
 
         # Dans la boucle de remplissage, ajouter des logs détaillés
         for row in range(3, template_ws.max_row + 1):
+            if cancel_token:
+                await cancel_token.checkpoint()
             template_nom_prenom = template_ws[f"B{row}"].value
             if template_nom_prenom:
                 normalized_nom_prenom = template_nom_prenom.strip().upper()
@@ -555,25 +629,29 @@ async def fill_template_with_ypareo_data(source_url: str, template_path: str, ou
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        updated_template_path = os.path.join(output_dir, "updated_excel.xlsx")
-        template_wb.save(updated_template_path)
+        updated_template_path = os.path.join(output_dir, UPDATED_EXCEL_FILENAME)
+        await run_blocking(template_wb.save, updated_template_path)
         logging.info(f"Fichier template mis à jour sauvegardé à : {updated_template_path}")
         return updated_template_path
 
+    except OperationCancelledError:
+        raise
     except Exception as e:
         logging.error(f"Erreur lors du remplissage des données dans le template : {str(e)}")
         raise ValueError(f"Erreur lors du remplissage des données dans le template : {str(e)}")
 
     
-async def match_template_and_get_word(updated_excel_path):
+@timed_stage("template_match")
+async def match_template_and_get_word(updated_excel_path, output_dir: str):
     """
     Compare le fichier Excel mis à jour avec les templates et retourne le modèle Word approprié.
     """
     try:
         logging.info("Début de la comparaison des templates...")
         
-        # Charger le fichier Excel mis à jour
-        updated_wb = openpyxl.load_workbook(updated_excel_path)
+        # Charger le fichier Excel mis à jour (seule la première ligne est comparée)
+        read_only = low_memory_mode()
+        updated_wb = await run_blocking(openpyxl.load_workbook, updated_excel_path, read_only=read_only)
         updated_ws = updated_wb.active
 
         # Récupérer les valeurs des cellules à comparer pour BG-ALT-S3
@@ -588,8 +666,8 @@ async def match_template_and_get_word(updated_excel_path):
         template_s3_data = await fetch_template_from_prisma("BG-ALT-S3.xlsx")
         template_s2_data = await fetch_template_from_prisma("BG-ALT-S2.xlsx")
 
-        template_s3_wb = openpyxl.load_workbook(BytesIO(template_s3_data))
-        template_s2_wb = openpyxl.load_workbook(BytesIO(template_s2_data))
+        template_s3_wb = await run_blocking(openpyxl.load_workbook, BytesIO(template_s3_data), read_only=read_only)
+        template_s2_wb = await run_blocking(openpyxl.load_workbook, BytesIO(template_s2_data), read_only=read_only)
 
         template_s3_ws = template_s3_wb.active
         template_s2_ws = template_s2_wb.active
@@ -602,8 +680,8 @@ async def match_template_and_get_word(updated_excel_path):
         template_s2_values = [str(template_s2_ws[cell].value or '').strip() for cell in cells_to_compare_s2]
         matches_s2 = updated_values_s2 == template_s2_values
 
-        # Créer le dossier temp s'il n'existe pas
-        temp_dir = "./temp"
+        # Créer le dossier de travail s'il n'existe pas
+        temp_dir = output_dir
         if not os.path.exists(temp_dir):
             os.makedirs(temp_dir)
 
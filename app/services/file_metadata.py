@@ -0,0 +1,71 @@
+"""
+Requêtes de métadonnées (projection) sur GeneratedFile et Configuration.
+
+Prisma Client Python ne permet pas de choisir les colonnes d'un find_first / find_many : la ligne
+entière, contenu binaire compris (fileData, generatedExcel...), serait transférée pour ne lire que
+l'id ou une URL. Ces requêtes SQL ne sélectionnent que les colonnes utiles et s'appuient sur les
+index GeneratedFile(filename, isTemplate) et Configuration(excelUrl).
+"""
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from prisma import Prisma
+
+# Colonnes de GeneratedFile hors contenu (fileData)
+FILE_METADATA_COLUMNS = (
+    "id", "filename", "fileType", "storageFormat", "blobSha256", "blobSize", "contentType",
+    "isTemplate", "templateType", "category", "createdAt", "updatedAt",
+)
+_FILE_COLUMNS_SQL = ", ".join(f'"{column}"' for column in FILE_METADATA_COLUMNS)
+
+# Colonnes de GeneratedExcel hors contenu (data)
+EXCEL_METADATA_COLUMNS = (
+    "id", "userId", "templateId", "storageFormat", "blobSha256", "blobSize", "contentType", "createdAt", "updatedAt",
+)
+_EXCEL_COLUMNS_SQL = ", ".join(f'"{column}"' for column in EXCEL_METADATA_COLUMNS)
+
+_TEMPLATE_BY_FILENAME_QUERY = (
+    f'SELECT {_FILE_COLUMNS_SQL} FROM "GeneratedFile" '
+    'WHERE "filename" = $1 AND "isTemplate" = true ORDER BY "id" LIMIT 1'
+)
+_FILES_QUERY = f'SELECT {_FILE_COLUMNS_SQL} FROM "GeneratedFile" WHERE "isTemplate" = $1 ORDER BY "id"'
+# Taille du contenu stocké en base (dataSize), mesurée par PostgreSQL sans transférer les octets
+_FILE_BY_ID_QUERY = f'SELECT {_FILE_COLUMNS_SQL}, octet_length("fileData") AS "dataSize" FROM "GeneratedFile" WHERE "id" = $1'
+_EXCEL_BY_ID_QUERY = f'SELECT {_EXCEL_COLUMNS_SQL}, octet_length("data") AS "dataSize" FROM "GeneratedExcel" WHERE "id" = $1'
+_WORD_URL_QUERY = 'SELECT "wordUrl" FROM "Configuration" WHERE "excelUrl" = $1 LIMIT 1'
+
+
+async def find_template_metadata(db: "Prisma", filename: str) -> Optional[dict]:
+    """
+    Métadonnées du template `filename` (isTemplate = True), sans son contenu.
+    """
+    return await db.query_first(_TEMPLATE_BY_FILENAME_QUERY, filename)
+
+
+async def find_file_metadata(db: "Prisma", file_id: int) -> Optional[dict]:
+    """
+    Métadonnées d'un GeneratedFile par son id, sans son contenu.
+    """
+    return await db.query_first(_FILE_BY_ID_QUERY, file_id)
+
+
+async def find_excel_metadata(db: "Prisma", excel_id: int) -> Optional[dict]:
+    """
+    Métadonnées d'un GeneratedExcel par son id, sans son contenu.
+    """
+    return await db.query_first(_EXCEL_BY_ID_QUERY, excel_id)
+
+
+async def list_file_metadata(db: "Prisma", is_template: bool = True) -> List[dict]:
+    """
+    Métadonnées de tous les fichiers (templates par défaut), sans leur contenu.
+    """
+    return await db.query_raw(_FILES_QUERY, is_template)
+
+
+async def find_word_url(db: "Prisma", excel_url: str) -> Optional[str]:
+    """
+    URL du Word associée à un Excel dans Configuration, sans lire les fichiers générés stockés sur la ligne.
+    """
+    row = await db.query_first(_WORD_URL_QUERY, excel_url)
+    return row["wordUrl"] if row else None
@@ -0,0 +1,295 @@
+"""
+Encodage du contenu des fichiers stockés (GeneratedFile.fileData, GeneratedExcel.data).
+
+Trois formats coexistent, indiqués par la colonne storageFormat :
+- "base64" : anciennes lignes, la colonne Bytes contient le texte base64 du fichier ;
+- "raw" : la colonne Bytes contient directement les octets du fichier ;
+- "blob" : le fichier est dans le stockage de fichiers (app.services.blob_store), la ligne ne
+  garde que blobSha256, blobSize et contentType.
+La lecture accepte les trois formats le temps que `migrate_legacy_files` convertisse l'existant.
+
+Configuration.generatedExcel / generatedBulletins ne sont pas concernés : ces colonnes sont écrites et
+lues par l'application web, jamais par ce service ; les sortir de la base la priverait de leur contenu.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import mimetypes
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, NamedTuple, Optional, Union
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import BYTES_READ, BYTES_WRITTEN
+from app.core.prisma_client import get_prisma
+from app.services.blob_store import get_blob_store
+
+# prisma.fields charge le client Prisma : importé à la première lecture ou écriture, pas au démarrage
+if TYPE_CHECKING:
+    from prisma.fields import Base64
+
+RAW = "raw"
+BASE64 = "base64"
+BLOB = "blob"
+
+# Signature ZIP : tous les fichiers .xlsx / .docx commencent par ces octets
+_ZIP_SIGNATURE = b"PK\x03\x04"
+
+
+def encode_file_data(file_bytes: bytes) -> "Base64":
+    """
+    Valeur à écrire dans une colonne Bytes pour stocker les octets du fichier tels quels.
+    """
+    from prisma.fields import Base64
+    return Base64.encode(file_bytes)
+
+
+def _unwrap_legacy(payload: bytes) -> bytes:
+    """
+    Contenu d'une ligne au format historique : le texte base64 du fichier. Les lignes dont le
+    contenu est déjà un fichier ZIP (écrites directement en binaire) sont rendues telles quelles.
+    """
+    if payload.startswith(_ZIP_SIGNATURE):
+        return payload
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return payload
+
+
+def decode_file_data(data, storage_format: str = BASE64) -> bytes:
+    """
+    Octets du fichier à partir de la valeur lue dans une colonne Bytes et de son marqueur de format.
+    """
+    from prisma.fields import Base64
+    if data is None:
+        return b""
+    payload = data.decode() if isinstance(data, Base64) else bytes(data)
+    if storage_format == RAW:
+        return payload
+    return _unwrap_legacy(payload)
+
+
+async def stored_file_fields(field: str, filename: str, file_bytes: Optional[bytes] = None,
+                             path: Optional[str] = None) -> dict:
+    """
+    Champs Prisma à écrire pour stocker un fichier (contenu en mémoire ou chemin sur disque) :
+    dans le stockage de fichiers s'il est configuré (la ligne ne garde que l'empreinte, la taille
+    et le type), sinon en binaire brut dans la colonne `field`.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    store = get_blob_store()
+    if store is not None:
+        if path is not None:
+            ref = await run_blocking(store.put_file, path, content_type)
+        else:
+            ref = await run_blocking(store.put_bytes, file_bytes, content_type)
+        BYTES_WRITTEN.inc(ref.size, target=BLOB)
+        return {"storageFormat": BLOB, "blobSha256": ref.sha256, "blobSize": ref.size, "contentType": content_type}
+
+    if path is not None:
+        file_bytes = await run_blocking(_read_path, path)
+    return _database_fields(field, file_bytes, content_type)
+
+
+def _database_fields(field: str, file_bytes: bytes, content_type: str) -> dict:
+    BYTES_WRITTEN.inc(len(file_bytes), target="database")
+    return {
+        field: encode_file_data(file_bytes),
+        "storageFormat": RAW,
+        # Empreinte et taille servent d'ETag au téléchargement sans relire la colonne
+        "blobSha256": hashlib.sha256(file_bytes).hexdigest(),
+        "blobSize": len(file_bytes),
+        "contentType": content_type,
+    }
+
+
+def _read_path(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def read_stored_file(record, field: str) -> bytes:
+    """
+    Octets d'un fichier stocké, quel que soit son format (blob, binaire brut ou ancien base64).
+    """
+    storage_format = getattr(record, "storageFormat", BASE64)
+    if storage_format == BLOB:
+        store = get_blob_store()
+        if store is None:
+            raise ValueError(f"Fichier {record.blobSha256} dans le stockage de fichiers, mais aucun stockage configuré")
+        data = await run_blocking(store.get_bytes, record.blobSha256)
+        BYTES_READ.inc(len(data), source=BLOB)
+        return data
+    data = decode_file_data(getattr(record, field), storage_format)
+    BYTES_READ.inc(len(data), source="database")
+    return data
+
+
+async def read_generated_file(record) -> bytes:
+    return await read_stored_file(record, "fileData")
+
+
+async def read_generated_excel(record) -> bytes:
+    return await read_stored_file(record, "data")
+
+
+class StoredFileStream(NamedTuple):
+    sha256: str
+    size: int
+    content_type: str
+    # open(start, end) : contenu par blocs de l'octet start à l'octet end inclus
+    open: Callable[[int, int], Union[Iterator[bytes], AsyncIterator[bytes]]]
+
+
+# Table de chaque colonne binaire lue par blocs
+_COLUMN_TABLES = {"fileData": "GeneratedFile", "data": "GeneratedExcel"}
+
+
+def _iter_bytes(data: bytes, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+    view = memoryview(data)
+    for offset in range(start, end + 1, chunk_size):
+        yield bytes(view[offset:min(offset + chunk_size, end + 1)])
+
+
+async def _iter_column(field: str, row_id: int, start: int, end: int, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Contenu d'une colonne binaire lu par blocs avec substring : seul le bloc demandé quitte la base.
+    Le bloc transite en base64 (encode), le seul format d'échange binaire des requêtes brutes Prisma.
+    """
+    db = await get_prisma()
+    query = (f'SELECT encode(substring("{field}" from $1 for $2), \'base64\') AS "chunk" '
+             f'FROM "{_COLUMN_TABLES[field]}" WHERE "id" = $3')
+    for offset in range(start, end + 1, chunk_size):
+        length = min(chunk_size, end + 1 - offset)
+        # substring compte les octets à partir de 1
+        row = await db.query_first(query, offset + 1, length, row_id)
+        chunk = base64.b64decode((row or {}).get("chunk") or "")
+        BYTES_READ.inc(len(chunk), source="database")
+        yield chunk
+
+
+async def _column_sha256(field: str, row_id: int) -> str:
+    """
+    Empreinte d'une colonne binaire calculée par PostgreSQL, pour les lignes écrites avant blobSha256.
+    """
+    db = await get_prisma()
+    row = await db.query_first(
+        f'SELECT encode(sha256("{field}"), \'hex\') AS "sha256" FROM "{_COLUMN_TABLES[field]}" WHERE "id" = $1',
+        row_id,
+    )
+    return (row or {}).get("sha256") or hashlib.sha256(b"").hexdigest()
+
+
+async def stored_file_stream(metadata: dict, field: str, filename: str) -> StoredFileStream:
+    """
+    Accès par blocs (et par plage d'octets) au fichier stocké, pour le téléchargement en streaming,
+    à partir de ses métadonnées (app.services.file_metadata, sans la colonne binaire).
+    Un blob ou une ligne en binaire brut n'est jamais chargé entièrement : la colonne est lue par
+    blocs en SQL. Seules les anciennes lignes base64, à décoder en entier, sont lues d'un coup.
+    """
+    storage_format = metadata.get("storageFormat") or BASE64
+    content_type = (metadata.get("contentType")
+                    or mimetypes.guess_type(filename)[0] or "application/octet-stream")
+    row_id = metadata["id"]
+    chunk_size = settings.BLOB_STORE_CHUNK_SIZE
+    if storage_format == BLOB:
+        store = get_blob_store()
+        sha256 = metadata["blobSha256"]
+        if store is None:
+            raise ValueError(f"Fichier {sha256} dans le stockage de fichiers, mais aucun stockage configuré")
+        return StoredFileStream(
+            sha256, metadata["blobSize"], content_type,
+            lambda start, end: store.open_stream(sha256, start, end),
+        )
+
+    if storage_format == RAW:
+        size = metadata.get("blobSize")
+        if size is None:
+            size = metadata.get("dataSize") or 0
+        sha256 = metadata.get("blobSha256") or await _column_sha256(field, row_id)
+        return StoredFileStream(
+            sha256, size, content_type,
+            lambda start, end: _iter_column(field, row_id, start, end, chunk_size),
+        )
+
+    db = await get_prisma()
+    record = await getattr(db, _COLUMN_TABLES[field].lower()).find_unique(where={"id": row_id})
+    data = decode_file_data(getattr(record, field), storage_format)
+    BYTES_READ.inc(len(data), source="database")
+    sha256 = await run_blocking(lambda: hashlib.sha256(data).hexdigest())
+    return StoredFileStream(
+        sha256, len(data), content_type,
+        lambda start, end: _iter_bytes(data, start, end, chunk_size),
+    )
+
+
+async def _offload_to_blob(store, field: str, file_bytes: bytes, content_type: str) -> Optional[dict]:
+    """
+    Copie le contenu dans le stockage partagé et ne vide la colonne qu'une fois le blob relu et vérifié.
+    """
+    ref = await run_blocking(store.put_bytes, file_bytes, content_type)
+    if not await run_blocking(store.verify, ref.sha256, ref.size):
+        return None
+    BYTES_WRITTEN.inc(ref.size, target=BLOB)
+    return {field: None, "storageFormat": BLOB, "blobSha256": ref.sha256, "blobSize": ref.size,
+            "contentType": content_type}
+
+
+async def _migrate_table(model, field: str, filename_of, batch_size: int, pause: float) -> int:
+    # Les fichiers ne quittent la base que vers un stockage partagé par toutes les instances (S3) :
+    # sur un disque local, les autres réplicas ne les retrouveraient pas
+    store = get_blob_store()
+    offload = store is not None and store.shared
+    source_formats = [BASE64, RAW] if offload else [BASE64]
+    migrated = 0
+    last_id = 0
+    while True:
+        rows = await model.find_many(
+            where={"storageFormat": {"in": source_formats}, "id": {"gt": last_id}},
+            take=batch_size, order={"id": "asc"},
+        )
+        if not rows:
+            return migrated
+        for row in rows:
+            last_id = row.id
+            file_bytes = decode_file_data(getattr(row, field), row.storageFormat)
+            content_type = mimetypes.guess_type(filename_of(row))[0] or "application/octet-stream"
+            data = None
+            if offload:
+                data = await _offload_to_blob(store, field, file_bytes, content_type)
+                if data is None:
+                    logging.error(f"Blob illisible après copie, ligne {row.id} laissée en base")
+            if data is None and row.storageFormat == BASE64:
+                data = _database_fields(field, file_bytes, content_type)
+            if data is None:
+                continue
+            await model.update(where={"id": row.id}, data=data)
+            migrated += 1
+        # Laisser respirer la base et la boucle entre deux lots
+        await asyncio.sleep(pause)
+
+
+async def migrate_legacy_files(batch_size: int = 20, pause: float = 0.5) -> dict:
+    """
+    Convertit par lots les lignes encore au format base64 vers le binaire brut, ou les sort de la
+    base vers le stockage de fichiers s'il est partagé (S3).
+    Peut être interrompue et relancée : seules les lignes pas encore converties sont traitées.
+    """
+    db = await get_prisma()
+    result = {}
+    try:
+        result["GeneratedFile"] = await _migrate_table(
+            db.generatedfile, "fileData", lambda row: row.filename, batch_size, pause
+        )
+        result["GeneratedExcel"] = await _migrate_table(
+            db.generatedexcel, "data", lambda row: f"excel_{row.id}.xlsx", batch_size, pause
+        )
+        logging.info(f"Migration du stockage binaire terminée : {result}")
+    except asyncio.CancelledError:
+        logging.info(f"Migration du stockage binaire interrompue : {result}")
+        raise
+    except Exception as e:
+        logging.error(f"Erreur pendant la migration du stockage binaire : {str(e)}")
+    return result
@@ -0,0 +1,284 @@
+"""
+Moteur de calcul des notes d'une classe entière.
+
+Les notes de la classe sont chargées dans une matrice NumPy (étudiants × matières) et toutes les
+moyennes d'UE, états (VA / C / R / NV), ECTS ajustés et résultats globaux sont calculés en une
+seule passe. Les règles et l'ordre des opérations reproduisent exactement la version scalaire
+conservée dans benchmarks/scalar_grades.py (`calculate_ects_weighted_average`, `get_etat`,
+`get_etat_ue`, `adjust_ects` et `get_total_etat`).
+
+Les statistiques de la classe (moyenne, min, max, médiane, écart-type et rang) sont calculées
+dans la même passe à partir des mêmes matrices. Leurs variables Word ne sont ajoutées au bulletin
+que si le modèle en contient (`uses_statistics`).
+"""
+import re
+from typing import Optional
+
+from app.core.lazy import lazy_import
+
+# NumPy chargé au premier calcul, pas au démarrage de l'application
+np = lazy_import("numpy")
+
+
+VA = "VA"
+COMPENSABLE = "C"
+RATTRAPAGE = "R"
+NON_VALIDE = "NV"
+
+
+STATISTICS = ("mean", "min", "max", "median", "std")
+
+# Préfixes des variables Word pour chaque statistique : moyClasse1, minClasseUE2, ecartTypeClasse...
+STATISTICS_PLACEHOLDERS = {
+    "mean": "moyClasse",
+    "min": "minClasse",
+    "max": "maxClasse",
+    "median": "medianeClasse",
+    "std": "ecartTypeClasse",
+}
+
+# Une variable de statistique de classe dans le texte d'un modèle : {{moyClasse1}}, {{rangUE2}}, {{effectif}}...
+_STATISTICS_VARIABLE = re.compile(
+    r"\{\{(?:" + "|".join([*STATISTICS_PLACEHOLDERS.values(), "rang", "effectif"]) + r")"
+)
+
+
+def uses_statistics(template_text: str) -> bool:
+    """
+    Le modèle contient-il au moins une variable de statistique de classe ?
+    """
+    return _STATISTICS_VARIABLE.search(template_text) is not None
+
+
+def _format_note(value: float) -> str:
+    return "" if np.isnan(value) else f"{value:.2f}"
+
+
+def _json_number(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _column_statistics(matrix: "np.ndarray") -> dict:
+    """
+    Statistiques de chaque colonne en ignorant les valeurs absentes (NaN), et rang de chaque
+    étudiant dans chaque colonne (1 = meilleure valeur, ex-aequo au même rang, 0 sans valeur).
+    """
+    n_rows, n_columns = matrix.shape
+    present = ~np.isnan(matrix)
+    counts = present.sum(axis=0)
+    stats = {name: np.full(n_columns, np.nan) for name in STATISTICS}
+    ranks = np.zeros((n_rows, n_columns), dtype=np.int64)
+
+    valid = counts > 0
+    if valid.any():
+        values = matrix[:, valid]
+        stats["mean"][valid] = np.nanmean(values, axis=0)
+        stats["min"][valid] = np.nanmin(values, axis=0)
+        stats["max"][valid] = np.nanmax(values, axis=0)
+        stats["median"][valid] = np.nanmedian(values, axis=0)
+        stats["std"][valid] = np.nanstd(values, axis=0)
+
+    for column in np.flatnonzero(valid):
+        column_present = present[:, column]
+        ordered = np.sort(matrix[column_present, column])
+        better = len(ordered) - np.searchsorted(ordered, matrix[column_present, column], side="right")
+        ranks[column_present, column] = better + 1
+
+    stats["count"] = counts
+    stats["ranks"] = ranks
+    return stats
+
+
+class ClassGrades:
+    """
+    Résultats de la classe pour un modèle de bulletin donné.
+    Chaque attribut est un tableau indexé par étudiant (lignes) puis par matière ou UE (colonnes).
+    """
+
+    def __init__(self, ue_names, notes, note_strings, note_states, adjusted_ects, ue_averages,
+                 ue_states, ue_ects, averages, total_ects, total_states):
+        self.ue_names = ue_names
+        self.notes = notes
+        self.note_strings = note_strings
+        self.note_states = note_states
+        self.adjusted_ects = adjusted_ects
+        self.ue_averages = ue_averages
+        self.ue_states = ue_states
+        self.ue_ects = ue_ects
+        self.averages = averages
+        self.total_ects = total_ects
+        self.total_states = total_states
+
+        # Statistiques de la classe par matière, par UE et sur la moyenne générale
+        self.subject_statistics = _column_statistics(notes)
+        self.ue_statistics = _column_statistics(ue_averages)
+        self.overall_statistics = _column_statistics(averages.reshape(-1, 1))
+
+    def __len__(self) -> int:
+        return len(self.note_strings)
+
+    def placeholders(self, index: int, statistics: bool = False) -> dict:
+        """
+        Variables du bulletin Word calculées pour l'étudiant `index`, avec les statistiques de la
+        classe si `statistics` (une centaine de variables de plus, à réserver aux modèles qui les utilisent).
+        """
+        data = {}
+        for subject, note in enumerate(self.note_strings[index], start=1):
+            data[f"note{subject}"] = note
+            data[f"etat{subject}"] = self.note_states[index, subject - 1]
+            data[f"ECTS{subject}"] = str(self.adjusted_ects[index, subject - 1])
+        for position, ue in enumerate(self.ue_names):
+            data[f"moy{ue}"] = _format_note(self.ue_averages[index, position])
+            data[f"etat{ue}"] = self.ue_states[index, position]
+            data[f"ECTS{ue}"] = str(self.ue_ects[index, position])
+        data["moyenne"] = _format_note(self.averages[index])
+        data["moyenneECTS"] = str(self.total_ects[index])
+        data["totaletat"] = self.total_states[index]
+        if statistics:
+            data.update(self.statistics_placeholders(index))
+        return data
+
+    def statistics_placeholders(self, index: int) -> dict:
+        """
+        Variables de contexte de classe : moyClasse{n}, rang{n}, moyClasseUE{n}, rangUE{n}, moyClasse, rang...
+        """
+        data = {"effectif": str(len(self))}
+        groups = [
+            ([str(subject) for subject in range(1, self.notes.shape[1] + 1)], self.subject_statistics),
+            (self.ue_names, self.ue_statistics),
+            ([""], self.overall_statistics),
+        ]
+        for suffixes, stats in groups:
+            for position, suffix in enumerate(suffixes):
+                for name, prefix in STATISTICS_PLACEHOLDERS.items():
+                    data[f"{prefix}{suffix}"] = _format_note(stats[name][position])
+                rank = stats["ranks"][index, position]
+                data[f"rang{suffix}"] = str(rank) if rank else ""
+        return data
+
+    def statistics(self, student_ids: list) -> dict:
+        """
+        Statistiques de la classe au format JSON, avec les rangs de chaque étudiant.
+        """
+        def summary(stats, position):
+            return {
+                "count": int(stats["count"][position]),
+                **{name: _json_number(stats[name][position]) for name in STATISTICS},
+            }
+
+        subject_names = [f"note{subject}" for subject in range(1, self.notes.shape[1] + 1)]
+        return {
+            "students_count": len(self),
+            "subjects": {name: summary(self.subject_statistics, position) for position, name in enumerate(subject_names)},
+            "ues": {ue: summary(self.ue_statistics, position) for position, ue in enumerate(self.ue_names)},
+            "overall": summary(self.overall_statistics, 0),
+            "students": [
+                {
+                    **student_id,
+                    "ranks": {
+                        **{name: int(self.subject_statistics["ranks"][index, position]) or None
+                           for position, name in enumerate(subject_names)},
+                        **{ue: int(self.ue_statistics["ranks"][index, position]) or None
+                           for position, ue in enumerate(self.ue_names)},
+                        "moyenne": int(self.overall_statistics["ranks"][index, 0]) or None,
+                    },
+                }
+                for index, student_id in enumerate(student_ids)
+            ],
+        }
+
+
+def compute_class_grades(note_strings: list, ues: dict, ects_values, ue_totals: Optional[dict] = None) -> ClassGrades:
+    """
+    Calcule en une passe les résultats de toute la classe.
+
+    Args:
+        note_strings: une liste par étudiant des notes de chaque matière, telles qu'affichées
+            sur le bulletin ("12.50" ou "" si pas de note)
+        ues: nom de l'UE -> numéros (à partir de 1) des matières qui la composent
+        ects_values: ECTS de chaque matière
+        ue_totals: total des ECTS de chaque UE, s'il est déjà connu (catalogue ECTS)
+    """
+    ue_names = list(ues)
+    n_subjects = len(ects_values)
+    n_students = len(note_strings)
+
+    notes = np.array(
+        [[float(note) if note else np.nan for note in student] for student in note_strings],
+        dtype=float,
+    ).reshape(n_students, n_subjects)
+    ects = np.asarray(ects_values, dtype=np.int64)
+    present = ~np.isnan(notes)
+
+    # États par matière (get_etat) : VA >= 10, R < 8, C entre les deux, vide sans note
+    note_states = np.full(notes.shape, "", dtype=object)
+    note_states[present & (notes >= 10)] = VA
+    note_states[present & (notes < 8)] = RATTRAPAGE
+    note_states[present & (notes >= 8) & (notes < 10)] = COMPENSABLE
+    is_r = note_states == RATTRAPAGE
+
+    # ECTS ajustés (adjust_ects) : 0 si la note est absente ou < 8
+    adjusted_ects = np.where(present & (notes >= 8), ects, 0)
+
+    # Moyennes d'UE pondérées par les ECTS (calculate_ects_weighted_average) : seules les notes > 0
+    # comptent, avec un coefficient d'au moins 1. L'accumulation se fait matière par matière,
+    # dans le même ordre que la version scalaire, pour obtenir des arrondis identiques.
+    counted = present & (notes > 0)
+    weighted = np.where(counted, notes * np.maximum(ects, 1), 0.0)
+    coefficients = np.where(counted, np.maximum(ects, 1), 0)
+
+    n_ues = len(ue_names)
+    ue_averages = np.full((n_students, n_ues), np.nan)
+    ue_rounded = np.zeros((n_students, n_ues))
+    ue_states = np.full((n_students, n_ues), NON_VALIDE, dtype=object)
+    ue_ects = np.zeros((n_students, n_ues), dtype=np.int64)
+    ue_original_ects = np.zeros(n_ues, dtype=np.int64)
+
+    for position, ue in enumerate(ue_names):
+        members = [subject - 1 for subject in ues[ue]]
+        total = np.zeros(n_students)
+        total_coefficients = np.zeros(n_students, dtype=np.int64)
+        for subject in members:
+            total = total + weighted[:, subject]
+            total_coefficients = total_coefficients + coefficients[:, subject]
+        has_average = total_coefficients > 0
+        ue_averages[has_average, position] = total[has_average] / total_coefficients[has_average]
+        # La suite du calcul utilise la moyenne arrondie, comme la version scalaire qui relit la chaîne affichée
+        ue_rounded[:, position] = [
+            float(f"{value:.2f}") if not np.isnan(value) else 0.0 for value in ue_averages[:, position]
+        ]
+        ue_averages[has_average, position] = ue_rounded[has_average, position]
+
+        # État de l'UE (get_etat_ue) : VA si aucune note en R et moyenne >= 10
+        has_r = is_r[:, members].any(axis=1) if members else np.zeros(n_students, dtype=bool)
+        ue_states[~has_r & (ue_rounded[:, position] >= 10), position] = VA
+
+        ue_ects[:, position] = adjusted_ects[:, members].sum(axis=1)
+        ue_original_ects[position] = ue_totals[ue] if ue_totals is not None else ects[members].sum()
+
+    # Moyenne générale pondérée par les ECTS d'origine des UE
+    total_original_ects = int(ue_original_ects.sum())
+    averages = np.full(n_students, np.nan)
+    if total_original_ects > 0:
+        weighted_total = np.zeros(n_students)
+        for position in range(n_ues):
+            weighted_total = weighted_total + ue_rounded[:, position] * ue_original_ects[position]
+        averages = weighted_total / total_original_ects
+
+    # Résultat global (get_total_etat) : VA si toutes les UE sont VA
+    total_states = np.where((ue_states == VA).all(axis=1), VA, NON_VALIDE).astype(object)
+
+    return ClassGrades(
+        ue_names=ue_names,
+        notes=notes,
+        note_strings=[list(student) for student in note_strings],
+        note_states=note_states,
+        adjusted_ects=adjusted_ects,
+        ue_averages=ue_averages,
+        ue_states=ue_states,
+        ue_ects=ue_ects,
+        averages=averages,
+        total_ects=ue_ects.sum(axis=1),
+        total_states=total_states,
+    )
+
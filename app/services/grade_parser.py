@@ -0,0 +1,123 @@
+"""
+Analyse des cellules de notes de l'Excel Yparéo.
+
+Formats acceptés :
+- "17" ou "17 - 16 - 17" : notes simples, coefficient 1
+- "10 (0,25) - 15 (0,25) - 10,5 (0,5)" : notes avec coefficients
+- "Absent au devoir" : devoir ignoré dans la moyenne
+
+Les nombres suivent la syntaxe acceptée par float() (virgule ou point décimal, signe "+", exposant
+"1e3") ; "inf", "nan" et les séparateurs "_" sont refusés, ainsi que les parenthèses en trop
+("10 (0,5))"), que l'ancien découpage à base de split() tolérait.
+
+Chaque cellule est découpée une seule fois par une grammaire précompilée ; les résultats sont
+mémorisés sur le texte brut, une même chaîne revenant très souvent dans une classe.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+GRADE_CACHE_SIZE = 4096
+
+ABSENT_MARKER = "Absent au devoir"
+
+_NUMBER = r"\+?(?:\d+(?:[.,]\d*)?|[.,]\d+)(?:[eE]\+?\d+)?"
+_SIMPLE_NOTE = re.compile(rf"\s*(?P<note>{_NUMBER})\s*")
+_WEIGHTED_NOTE = re.compile(rf"\s*(?P<note>{_NUMBER})\s*\(\s*(?P<coef>{_NUMBER})\s*\)\s*")
+
+
+class GradeToken(NamedTuple):
+    note: Optional[float]
+    coef: Optional[float]
+    absent: bool
+
+
+def _to_float(number: str) -> float:
+    return float(number.replace(",", "."))
+
+
+@lru_cache(maxsize=GRADE_CACHE_SIZE)
+def parse_grade_string(raw: str) -> Optional[Tuple[GradeToken, ...]]:
+    """
+    Découpe une cellule de notes en tuples (note, coef, absent).
+
+    Dès qu'une parenthèse apparaît dans la cellule, seules les notes avec coefficient comptent
+    (les autres parties sont ignorées) ; sinon chaque note a un coefficient de 1.
+    Retourne None si la cellule est mal formée.
+    """
+    text = raw.strip()
+    if not text:
+        return ()
+
+    weighted = "(" in text
+    tokens = []
+    for part in text.split("-"):
+        if ABSENT_MARKER in part:
+            tokens.append(GradeToken(None, None, True))
+            continue
+
+        if weighted:
+            if "(" not in part or ")" not in part:
+                continue
+            match = _WEIGHTED_NOTE.fullmatch(part)
+            if not match:
+                return None
+            tokens.append(GradeToken(_to_float(match["note"]), _to_float(match["coef"]), False))
+        else:
+            if not part.strip():
+                continue
+            match = _SIMPLE_NOTE.fullmatch(part)
+            if not match:
+                return None
+            tokens.append(GradeToken(_to_float(match["note"]), 1.0, False))
+
+    return tuple(tokens)
+
+
+def tokens_average(tokens: Iterable[GradeToken]) -> Optional[float]:
+    """
+    Moyenne pondérée des notes présentes, ou None si aucun coefficient n'est renseigné.
+    """
+    total_weighted_sum = 0
+    total_coefficients = 0
+    for token in tokens:
+        if token.absent:
+            continue
+        total_weighted_sum += token.note * token.coef
+        total_coefficients += token.coef
+
+    if total_coefficients > 0:
+        return total_weighted_sum / total_coefficients
+    return None
+
+
+def note_average(value) -> str:
+    """
+    Moyenne d'une cellule de notes formatée pour le bulletin ("12.50"), ou "" si la cellule
+    est vide, ne contient que des absences ou est mal formée.
+    """
+    if not value:
+        return ""
+
+    tokens = parse_grade_string(str(value))
+    if tokens is None:
+        logging.error(f"Erreur lors du calcul de la note : format non reconnu '{value}'")
+        return ""
+
+    average = tokens_average(tokens)
+    return f"{average:.2f}" if average is not None else ""
+
+
+def note_averages(values: Iterable) -> List[str]:
+    """
+    Version par lot de `note_average` pour une colonne entière : chaque valeur distincte
+    n'est calculée qu'une fois.
+    """
+    results = {}
+    averages = []
+    for value in values:
+        if value not in results:
+            results[value] = note_average(value)
+        averages.append(results[value])
+    return averages
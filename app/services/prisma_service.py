@@ -1,63 +1,45 @@
-import base64
+import json
 import logging
 import os
-from prisma import Prisma
+from typing import Optional
+from app.core.prisma_client import get_prisma
+from app.services.file_storage import read_generated_excel, read_generated_file, stored_file_fields
+from app.services.template_cache import get_template_cache
+from app.core.metrics import timed_stage
 
+@timed_stage("template_fetch", template_arg="template_name")
 async def fetch_template_from_prisma(template_name: str) -> bytes:
     """
-    Récupère le fichier Excel depuis Prisma et retourne directement les données en Bytes.
+    Récupère un template depuis Prisma et retourne directement les données en Bytes.
+    Passe par le cache des templates : seule une requête de métadonnées est faite si le template n'a pas changé.
     """
     try:
-        logging.info(f"Connexion à Prisma pour récupérer le fichier {template_name}...")
-        db = Prisma()
-        await db.connect()
-
-        file_record = await db.generatedfile.find_first(where={"filename": template_name, "isTemplate": True})
-        
-        if file_record and file_record.fileData:
-            logging.info(f"Type de fileData récupéré: {type(file_record.fileData)}")
-            
-            try:
-                # Convertir directement l'objet Base64 en string
-                decoded_data = base64.b64decode(str(file_record.fileData))
-                logging.info(f"Décodage base64 réussi, taille: {len(decoded_data)} bytes")
-                return decoded_data
-            except Exception as decode_error:
-                logging.error(f"Erreur lors du décodage base64: {str(decode_error)}")
-                raise ValueError(f"Erreur lors du décodage base64: {str(decode_error)}")
-        else:
-            raise ValueError(f"Template {template_name} introuvable dans Prisma.")
+        return await get_template_cache().get(template_name)
     except Exception as e:
         logging.error(f"Erreur lors de la récupération du template: {str(e)}")
         raise
-    finally:
-        await db.disconnect()
 
-async def save_file_to_prisma(filename: str, file_data: bytes, is_template: bool = False) -> None:
+async def save_file_to_prisma(filename: str, file_data: Optional[bytes] = None, is_template: bool = False,
+                              path: Optional[str] = None) -> int:
     """
-    Sauvegarde un fichier dans Prisma en le convertissant en base64.
+    Sauvegarde un fichier (contenu en mémoire ou chemin sur disque) : contenu dans le stockage de
+    fichiers (ou en binaire brut en base), métadonnées dans Prisma. Retourne l'ID du GeneratedFile créé.
     """
     try:
-        db = Prisma()
-        await db.connect()
+        db = await get_prisma()
 
-        # Convertir les bytes en base64
-        base64_data = base64.b64encode(file_data).decode('utf-8')
-        logging.info(f"Conversion en base64 réussie, taille: {len(base64_data)}")
-
-        await db.generatedfile.create({
+        generated_file = await db.generatedfile.create({
             'filename': filename,
             'fileType': filename.split('.')[-1],
-            'fileData': base64_data,
-            'isTemplate': is_template
+            'isTemplate': is_template,
+            **await stored_file_fields('fileData', filename, file_bytes=file_data, path=path)
         })
 
         logging.info(f"Fichier {filename} sauvegardé avec succès dans Prisma")
+        return generated_file.id
     except Exception as e:
         logging.error(f"Erreur lors de la sauvegarde du fichier dans Prisma: {str(e)}")
         raise
-    finally:
-        await db.disconnect()
 
 async def get_word_template(template_name: str = "modeleBGALT3.docx") -> str:
     """
@@ -120,50 +102,42 @@ async def get_template_from_prisma(template_name: str, output_dir: str) -> str:
         logging.error(f"Erreur lors de la sauvegarde du fichier depuis Prisma : {str(e)}")
         raise ValueError(f"Erreur lors de la récupération du fichier depuis Prisma : {e}")
     
+@timed_stage("excel_save")
 async def save_excel_to_prisma(file_path: str, user_id: str) -> int:
     """
-    Sauvegarde un fichier Excel dans Prisma en l'encodant en base64.
+    Sauvegarde un fichier Excel : contenu envoyé par blocs au stockage de fichiers, métadonnées dans Prisma.
     """
     try:
-        # Lire le fichier en binaire et encoder en base64
-        with open(file_path, 'rb') as file:
-            file_content = file.read()
-            encoded_content = base64.b64encode(file_content)
-            
-        # Connexion à Prisma et sauvegarde
-        db = Prisma()
-        await db.connect()
+        # Sauvegarde via le client Prisma partagé
+        db = await get_prisma()
         
         # Créer l'enregistrement GeneratedExcel
         generated_excel = await db.generatedexcel.create({
             'userId': user_id,
             'templateId': 2,  # ID du template Excel dans GeneratedFile
-            'data': encoded_content,
+            **await stored_file_fields('data', os.path.basename(file_path), path=file_path),
         })
         
-        await db.disconnect()
         return generated_excel.id
 
     except Exception as e:
         logging.error(f"Erreur lors de la sauvegarde de l'Excel dans Prisma : {str(e)}")
         raise ValueError(f"Erreur lors de la sauvegarde de l'Excel dans Prisma : {str(e)}")
 
+@timed_stage("excel_load")
 async def get_excel_from_prisma(excel_id: int) -> bytes:
     """
     Récupère un fichier Excel depuis Prisma par son ID.
     """
     try:
-        db = Prisma()
-        await db.connect()
+        db = await get_prisma()
         
         excel_record = await db.generatedexcel.find_unique(
             where={'id': excel_id}
         )
         
-        await db.disconnect()
-        
-        if excel_record and excel_record.data:
-            return excel_record.data
+        if excel_record:
+            return await read_generated_excel(excel_record)
         else:
             raise ValueError(f"Excel {excel_id} non trouvé dans Prisma")
             
@@ -171,3 +145,45 @@ async def get_excel_from_prisma(excel_id: int) -> bytes:
         logging.error(f"Erreur lors de la récupération de l'Excel depuis Prisma : {str(e)}")
         raise
 
+
+def _statistics_filename(job_id: str) -> str:
+    return f"statistiques_{job_id}.json"
+
+
+async def save_class_statistics(job_id: str, statistics: dict) -> int:
+    """
+    Enregistre les statistiques de classe d'un traitement (GeneratedFile JSON nommé d'après le job_id),
+    consultables depuis n'importe quelle instance.
+    """
+    data = json.dumps(statistics, ensure_ascii=False).encode("utf-8")
+    return await save_file_to_prisma(_statistics_filename(job_id), data)
+
+
+async def get_class_statistics(job_id: str) -> Optional[dict]:
+    """
+    Statistiques de classe enregistrées pour un traitement, ou None.
+    """
+    try:
+        db = await get_prisma()
+        record = await db.generatedfile.find_first(
+            where={"filename": _statistics_filename(job_id), "isTemplate": False}, order={"id": "desc"}
+        )
+        if record is None:
+            return None
+        return json.loads(await read_generated_file(record))
+    except Exception as e:
+        logging.error(f"Erreur lors de la récupération des statistiques du traitement {job_id} : {str(e)}")
+        raise
+
+
+async def delete_generated_files(file_ids: list) -> None:
+    """
+    Supprime des GeneratedFile (ex. bulletins d'un traitement interrompu).
+    """
+    if not file_ids:
+        return
+    try:
+        db = await get_prisma()
+        await db.generatedfile.delete_many(where={"id": {"in": file_ids}})
+    except Exception as e:
+        logging.error(f"Erreur lors de la suppression des fichiers {file_ids} : {str(e)}")
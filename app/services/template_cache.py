@@ -0,0 +1,201 @@
+"""
+Cache des templates (GeneratedFile avec isTemplate = True) à deux niveaux :
+- en mémoire : LRU borné par le nombre total d'octets ;
+- sur disque : fichiers adressés par leur SHA-256, avec un index nom -> (updatedAt, empreinte).
+
+Chaque lecture vérifie la fraîcheur par une seule requête de métadonnées (app.services.file_metadata),
+sans transférer le contenu du fichier.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.prisma_client import get_prisma
+from app.core.server_timing import record_cache
+from app.services.file_metadata import find_template_metadata, list_file_metadata
+from app.services.file_storage import read_generated_file
+
+
+
+class TemplateCache:
+    def __init__(self, max_bytes: int, disk_dir: Optional[str]):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._memory: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: Dict[str, dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Écritures disque faites dans les threads du pool : l'index est modifié et enregistré sous ce verrou
+        self._index_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "stale": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_index = self._read_index()
+
+    # --- Niveau disque -------------------------------------------------------------------
+
+    def _index_path(self) -> str:
+        return os.path.join(self.disk_dir, "index.json")
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        """
+        Écrit dans un fichier temporaire unique puis le renomme : plusieurs threads ou workers
+        partageant le répertoire ne se gênent pas.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=".write-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _write_index(self) -> None:
+        # Entrées ajoutées par les autres workers qui partagent le répertoire : conservées
+        index = {**self._read_index(), **self._disk_index}
+        self._disk_index = index
+        self._write_atomic(self._index_path(), json.dumps(index).encode("utf-8"))
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.disk_dir, digest), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # Fichier corrompu ou tronqué : ignoré
+        return data if hashlib.sha256(data).hexdigest() == digest else None
+
+    def _write_blob(self, filename: str, version: str, data: bytes) -> None:
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = os.path.join(self.disk_dir, digest)
+        if not os.path.exists(blob_path):
+            self._write_atomic(blob_path, data)
+        with self._index_lock:
+            self._disk_index = {**self._disk_index, filename: {"updatedAt": version, "sha256": digest, "size": len(data)}}
+            self._write_index()
+
+    # --- Niveau mémoire ------------------------------------------------------------------
+
+    def _remember(self, filename: str, version: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        previous = self._memory.pop(filename, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous[1])
+        self._memory[filename] = (version, data)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    # --- Lecture -------------------------------------------------------------------------
+
+    async def _current_version(self, db, filename: str) -> str:
+        row = await find_template_metadata(db, filename)
+        if not row:
+            raise ValueError(f"Template {filename} introuvable dans Prisma.")
+        return str(row["updatedAt"])
+
+    async def get(self, filename: str) -> bytes:
+        db = await get_prisma()
+        version = await self._current_version(db, filename)
+
+        cached = self._memory.get(filename)
+        if cached is not None and cached[0] == version:
+            self._memory.move_to_end(filename)
+            self.stats["memory_hits"] += 1
+            record_cache("template", "memory")
+            return cached[1]
+
+        lock = self._locks.setdefault(filename, asyncio.Lock())
+        async with lock:
+            # Un autre traitement a pu charger le template pendant l'attente du verrou
+            cached = self._memory.get(filename)
+            if cached is not None and cached[0] == version:
+                self.stats["memory_hits"] += 1
+                record_cache("template", "memory")
+                return cached[1]
+
+            entry = self._disk_index.get(filename) if self.disk_dir else None
+            if entry is not None and entry["updatedAt"] == version:
+                data = await run_blocking(self._read_blob, entry["sha256"])
+                if data is not None:
+                    self.stats["disk_hits"] += 1
+                    record_cache("template", "disk")
+                    self._remember(filename, version, data)
+                    return data
+
+            if cached is not None or entry is not None:
+                self.stats["stale"] += 1
+            self.stats["misses"] += 1
+            record_cache("template", "miss")
+            record = await db.generatedfile.find_first(
+                where={"filename": filename, "isTemplate": True}, order={"id": "asc"}
+            )
+            if not record:
+                raise ValueError(f"Template {filename} introuvable dans Prisma.")
+            data = await read_generated_file(record)
+            self._remember(filename, version, data)
+            if self.disk_dir:
+                try:
+                    await run_blocking(self._write_blob, filename, version, data)
+                except Exception as e:
+                    # Le template est déjà chargé : seule la copie disque est perdue
+                    logging.warning(f"Écriture du template {filename} dans le cache disque impossible : {str(e)}")
+            logging.info(f"Template {filename} chargé depuis la base ({len(data)} octets)")
+            return data
+
+    async def prewarm(self) -> int:
+        """
+        Charge tous les templates (isTemplate = True) dans le cache.
+        """
+        db = await get_prisma()
+        rows = await list_file_metadata(db)
+        loaded = 0
+        for filename in sorted({row["filename"] for row in rows}):
+            try:
+                await self.get(filename)
+                loaded += 1
+            except Exception as e:
+                logging.error(f"Préchargement du template {filename} impossible : {str(e)}")
+        logging.info(f"{loaded} template(s) préchargé(s) dans le cache")
+        return loaded
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round((self.stats["memory_hits"] + self.stats["disk_hits"]) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_max_bytes": self.max_bytes,
+            "disk_entries": len(self._disk_index),
+        }
+
+
+_cache: Optional[TemplateCache] = None
+
+
+def get_template_cache() -> TemplateCache:
+    global _cache
+    if _cache is None:
+        _cache = TemplateCache(settings.TEMPLATE_CACHE_MAX_BYTES, settings.TEMPLATE_CACHE_DIR or None)
+    return _cache
@@ -1,22 +1,25 @@
-import base64
 import os
 import logging
 import zipfile
-from docx import Document
 from zipfile import ZipFile
-import openpyxl
 from io import BytesIO
 from app.services.ects_service import get_ects_for_template
-from prisma import Prisma
+from app.core.prisma_client import get_prisma
+from app.services.file_storage import read_generated_excel, read_generated_file
 from app.services.prisma_service import get_excel_from_prisma, get_template_from_prisma
+from app.core.lazy import lazy_import
+from app.core.metrics import timed_stage
 
+openpyxl = lazy_import("openpyxl")
+docx = lazy_import("docx")
+
+@timed_stage("template_fetch", template_arg="template_name")
 async def save_word_template(template_name: str, output_dir: str) -> str:
     """
     Sauvegarde le template Word depuis Prisma vers le dossier temporaire.
     """
     try:
-        db = Prisma()
-        await db.connect()
+        db = await get_prisma()
         
         word_template = await db.generatedfile.find_first(
             where={
@@ -35,21 +38,20 @@ async def save_word_template(template_name: str, output_dir: str) -> str:
         # Sauvegarder le template Word
         template_path = os.path.join(output_dir, template_name)
         with open(template_path, "wb") as f:
-            f.write(word_template.fileData)
+            f.write(await read_generated_file(word_template))
             
-        await db.disconnect()
         return template_path
         
     except Exception as e:
         logging.error(f"Erreur lors de la sauvegarde du template Word : {str(e)}")
         raise
 
+@timed_stage("word_generate")
 async def generate_bulletins_from_excel(excel_id: int, output_dir: str):
     try:
         logging.info(f"Début de la génération des bulletins pour l'Excel ID: {excel_id}")
         
-        db = Prisma()
-        await db.connect()
+        db = await get_prisma()
         
         # Récupérer l'Excel généré
         generated_excel = await db.generatedexcel.find_unique(
@@ -61,7 +63,7 @@ async def generate_bulletins_from_excel(excel_id: int, output_dir: str):
             raise ValueError(f"Excel généré non trouvé avec l'ID : {excel_id}")
 
         # Charger l'Excel
-        excel_bytes = base64.b64decode(str(generated_excel.data))
+        excel_bytes = await read_generated_excel(generated_excel)
         excel_wb = openpyxl.load_workbook(BytesIO(excel_bytes))
         excel_ws = excel_wb.active
 
@@ -93,7 +95,7 @@ async def generate_bulletins_from_excel(excel_id: int, output_dir: str):
 
         # Sauvegarder temporairement le template Word
         temp_word_path = os.path.join(output_dir, template_name)
-        word_bytes = base64.b64decode(str(word_template.fileData))
+        word_bytes = await read_generated_file(word_template)
         with open(temp_word_path, 'wb') as f:
             f.write(word_bytes)
 
@@ -129,7 +131,7 @@ async def generate_bulletins_from_excel(excel_id: int, output_dir: str):
                 continue
 
             try:
-                doc = Document(temp_word_path)
+                doc = docx.Document(temp_word_path)
                 
                 # Préparer les données de l'étudiant selon la configuration
                 student_data = {
@@ -174,7 +176,6 @@ async def generate_bulletins_from_excel(excel_id: int, output_dir: str):
         if os.path.exists(temp_word_path):
             os.remove(temp_word_path)
 
-        await db.disconnect()
         return bulletins_dir
 
     except Exception as e:
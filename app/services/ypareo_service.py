@@ -1,8 +1,11 @@
 import logging
 import os
-import requests
 from dotenv import load_dotenv
 from datetime import datetime
+from app.core.lazy import lazy_import
+from app.core.metrics import timed_stage
+
+requests = lazy_import("requests")
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -12,6 +15,7 @@ class YpareoService:
     API_TOKEN = os.getenv("YPAERO_API_TOKEN")
 
     @staticmethod
+    @timed_stage("ypareo_fetch")
     def fetch_json(endpoint: str):
         if not YpareoService.BASE_URL or not YpareoService.API_TOKEN:
             raise ValueError("Environment variables for Ypareo are not set.")
@@ -0,0 +1,226 @@
+"""
+Jeux de données synthétiques pour les tests de charge et les benchmarks, pour chaque template de
+TEMPLATE_MAPPING :
+- classeur source Yparéo : nom du groupe en B2, en-têtes des matières en ligne 5, un apprenant par
+  ligne à partir de la ligne 6 dans les colonnes lues par copy_multiple_cells (COPY_CELL_CONFIGS),
+  notes avec coefficients ("12,5 (0,5) - 14 (0,5)"), notes simples et "Absent au devoir", puis les
+  lignes de pied ("Moyenne du groupe", avertissement sur les absences) ignorées par la copie ;
+- document Word des appréciations (tableau nom / appréciation lu par fill_template_with_ypareo_data) ;
+- réponses de l'API Yparéo (apprenants, groupes, fréquentations, absences) cohérentes avec les classeurs.
+
+Tout est dérivé de `seed` : mêmes paramètres, mêmes données (hors métadonnées de date des fichiers Office).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.cohorts --students 200 --seed 42 --output-dir datasets
+    python -m benchmarks.cohorts --students 10000 --templates BG-ALT-S3.xlsx --output-dir datasets
+"""
+import argparse
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from app.core.lazy import lazy_import
+from app.core.template_mapping import TEMPLATE_MAPPING
+from app.services.excel_service import COPY_CELL_CONFIGS
+from app.services.grade_parser import ABSENT_MARKER
+
+openpyxl = lazy_import("openpyxl")
+docx = lazy_import("docx")
+
+MIN_STUDENTS, MAX_STUDENTS = 30, 10000
+
+_NOMS = ("MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY", "MOREAU",
+         "SIMON", "LAURENT", "LEFEBVRE", "MICHEL", "GARCIA", "DAVID", "BERTRAND", "ROUX", "VINCENT", "FOURNIER")
+_PRENOMS = ("Camille", "Léa", "Manon", "Chloé", "Inès", "Jade", "Louise", "Lucas", "Hugo", "Louis",
+            "Gabriel", "Arthur", "Jules", "Adam", "Nathan", "Sarah", "Emma", "Yanis", "Nina", "Théo")
+_SITES = ("Paris", "Lyon", "Marseille", "Bordeaux", "Nantes", "Lille")
+_APPRECIATIONS = ("Bon semestre.", "Des efforts à poursuivre.", "Travail sérieux et régulier.",
+                  "Résultats insuffisants, il faut se ressaisir.", "Très bon semestre, félicitations.")
+# Coefficients des devoirs d'une matière (leur somme vaut 1)
+_COEFFICIENTS = ((1,), (0.5, 0.5), (0.25, 0.25, 0.5), (0.25, 0.25, 0.25, 0.25))
+
+
+@dataclass
+class Cohort:
+    group_name: str
+    template: str
+    code_groupe: int
+    excel_bytes: bytes
+    word_bytes: bytes
+    students: List[dict] = field(default_factory=list)
+
+
+def _french(number: float) -> str:
+    return f"{number:g}".replace(".", ",")
+
+
+def _grade(rng: random.Random, level: float) -> str:
+    """
+    Cellule de notes d'une matière pour un apprenant de niveau moyen `level` (sur 20).
+    """
+    coefficients = rng.choice(_COEFFICIENTS)
+    weighted = len(coefficients) > 1 and rng.random() < 0.8
+    notes = []
+    for coefficient in coefficients:
+        if rng.random() < 0.04:
+            notes.append(ABSENT_MARKER)
+            continue
+        note = _french(min(20, max(0, round(rng.gauss(level, 3) * 2) / 2)))
+        notes.append(f"{note} ({_french(coefficient)})" if weighted else note)
+    return " - ".join(notes)
+
+
+def _source_workbook(group_name: str, template: str, students: List[dict], rng: random.Random) -> bytes:
+    """
+    Classeur en écriture seule (flux) : quelques secondes pour 10 000 apprenants.
+    """
+    column_index = openpyxl.utils.cell.column_index_from_string
+    name_column, *grade_columns = (column_index(column) for column in COPY_CELL_CONFIGS[template]["source_columns"])
+    width = max(name_column, *grade_columns)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    # Lignes 1 à 5 : nom du groupe en B2, en-têtes des matières en ligne 5 ; apprenants à partir de la ligne 6
+    ws.append([])
+    ws.append([None, group_name])
+    ws.append([])
+    ws.append([])
+    header = [None] * width
+    header[name_column - 1] = "Apprenant"
+    for index, column in enumerate(grade_columns, start=1):
+        header[column - 1] = f"Matière {index}"
+    ws.append(header)
+    for student in students:
+        row = [None] * width
+        row[name_column - 1] = f"{student['nomApprenant']} {student['prenomApprenant']}"
+        for column in grade_columns:
+            row[column - 1] = _grade(rng, student["niveau"])
+        ws.append(row)
+    footer = [None] * width
+    footer[name_column - 1] = "Moyenne du groupe"
+    ws.append(footer)
+    ws.append([None, "* Attention, le total des absences ne tient compte que des absences saisies"])
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def _appreciations_document(students: List[dict], rng: random.Random) -> bytes:
+    document = docx.Document()
+    table = document.add_table(rows=len(students), cols=2)
+    for row, student in zip(table.rows, students):
+        row.cells[0].text = f"{student['nomApprenant']} {student['prenomApprenant']}"
+        row.cells[1].text = rng.choice(_APPRECIATIONS)
+    output = BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def build_cohort(group_name: str, code_groupe: int, students: int, seed: int) -> Cohort:
+    if group_name not in TEMPLATE_MAPPING:
+        raise ValueError(f"Groupe absent de TEMPLATE_MAPPING : {group_name}")
+    template = TEMPLATE_MAPPING[group_name]
+    rng = random.Random(f"{seed}-{group_name}")
+    members = []
+    for index in range(students):
+        members.append({
+            "codeApprenant": code_groupe * 100000 + index,
+            # Suffixe numérique : noms uniques, l'appariement avec Yparéo se fait sur "NOM PRÉNOM"
+            "nomApprenant": f"{rng.choice(_NOMS)}{index}",
+            "prenomApprenant": rng.choice(_PRENOMS),
+            "dateNaissance": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1998, 2006)}",
+            "inscriptions": [{"site": {"nomSite": rng.choice(_SITES)}}],
+            "niveau": rng.uniform(7, 16),
+        })
+    excel_bytes = _source_workbook(group_name, template, members, rng)
+    word_bytes = _appreciations_document(members, rng)
+    for member in members:
+        del member["niveau"]
+    return Cohort(group_name, template, code_groupe, excel_bytes, word_bytes, members)
+
+
+def ypareo_payloads(cohorts: List[Cohort], seed: int) -> Dict[str, dict]:
+    """
+    Réponses de l'API Yparéo (chemin -> JSON) couvrant toutes les promotions, au format lu par
+    YpareoService (dictionnaires indexés dont seules les valeurs sont utilisées).
+    """
+    rng = random.Random(seed)
+    apprenants, frequentes, groupes, absences = {}, {}, {}, {}
+    for cohort in cohorts:
+        groupes[str(cohort.code_groupe)] = {
+            "codeGroupe": cohort.code_groupe, "nomGroupe": cohort.group_name, "etenduGroupe": cohort.group_name,
+        }
+        for student in cohort.students:
+            code = student["codeApprenant"]
+            apprenants[str(code)] = student
+            frequentes[str(code)] = {"codeApprenant": code, "codeGroupe": cohort.code_groupe}
+            for _ in range(rng.randint(0, 4)):
+                absences[str(len(absences))] = {
+                    "codeApprenant": code,
+                    "duree": rng.choice((30, 60, 90, 120, 210)),
+                    "isJustifie": rng.random() < 0.4,
+                    "isRetard": rng.random() < 0.2,
+                }
+    return {
+        "/r/v1/periodes": {"2": {"codePeriode": 2, "nomPeriode": "2023-2024"}},
+        "/r/v1/apprenants/frequentes": frequentes,
+        "/r/v1/formation-longue/apprenants": apprenants,
+        "/r/v1/formation-longue/groupes": groupes,
+        "/r/v1/absences/01-09-2023/15-09-2024": absences,
+    }
+
+
+def groups_by_template(templates: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Un groupe représentatif (le premier de TEMPLATE_MAPPING) par template.
+    """
+    groups = {}
+    for group_name, template in TEMPLATE_MAPPING.items():
+        if (templates is None or template in templates) and template not in groups:
+            groups[template] = group_name
+    return groups
+
+
+def generate(output_dir: str, students: int, seed: int, templates: Optional[List[str]] = None) -> List[Cohort]:
+    """
+    Écrit un dossier par template (source.xlsx, appreciations.docx) et les réponses Yparéo
+    communes dans ypareo/.
+    """
+    if not MIN_STUDENTS <= students <= MAX_STUDENTS:
+        raise ValueError(f"Nombre d'apprenants attendu entre {MIN_STUDENTS} et {MAX_STUDENTS}")
+    groups = groups_by_template(templates)
+    missing = set(templates or ()) - set(groups)
+    if missing:
+        raise ValueError(f"Templates absents de TEMPLATE_MAPPING : {', '.join(sorted(missing))}")
+    cohorts = []
+    for index, (template, group_name) in enumerate(sorted(groups.items())):
+        cohort = build_cohort(group_name, 9000 + index, students, seed)
+        directory = os.path.join(output_dir, os.path.splitext(template)[0])
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "source.xlsx"), "wb") as f:
+            f.write(cohort.excel_bytes)
+        with open(os.path.join(directory, "appreciations.docx"), "wb") as f:
+            f.write(cohort.word_bytes)
+        cohorts.append(cohort)
+    ypareo_dir = os.path.join(output_dir, "ypareo")
+    os.makedirs(ypareo_dir, exist_ok=True)
+    for path, payload in ypareo_payloads(cohorts, seed).items():
+        filename = path.removeprefix("/r/v1/").replace("/", "_") + ".json"
+        with open(os.path.join(ypareo_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+    return cohorts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=MIN_STUDENTS, help=f"Apprenants par promotion ({MIN_STUDENTS} à {MAX_STUDENTS})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--templates", nargs="*", help="Templates à générer (défaut : tous ceux de TEMPLATE_MAPPING)")
+    parser.add_argument("--output-dir", default="datasets")
+    args = parser.parse_args()
+    for cohort in generate(args.output_dir, args.students, args.seed, args.templates):
+        print(f"{cohort.template} : {cohort.group_name} ({len(cohort.students)} apprenants, "
+              f"{len(cohort.excel_bytes) // 1024} Kio)")
@@ -0,0 +1,389 @@
+"""
+Test de charge de bout en bout : /process-excel puis /get-word-template en parallèle, sur des
+promotions synthétiques (benchmarks.cohorts) servies localement.
+
+Environnement local :
+- un serveur de fichiers pour excel_url / word_url et un faux Yparéo (serveurs HTTP du processus) ;
+- une base PostgreSQL locale (DATABASE_URL) contenant les templates Excel / Word (GeneratedFile,
+  isTemplate) et les ECTSTemplate ; --templates-dir ajoute les templates manquants depuis un dossier ;
+- l'application lancée par le script (uvicorn, YPAERO_BASE_URL pointé vers le faux Yparéo), ou déjà
+  démarrée avec --app-url (elle doit alors utiliser le faux Yparéo : --ypareo-port fixe son port).
+
+Le rapport (débit, latences p50/p95/p99 par étape et de bout en bout, taux d'erreur, durées
+Server-Timing par étape, RSS et CPU du serveur) est enregistré en JSON dans benchmarks/results/ pour
+comparer les exécutions ; --compare affiche l'écart avec un rapport précédent.
+
+Usage (depuis la racine du projet, DATABASE_URL d'une base locale et client Prisma généré) :
+    python -m benchmarks.loadtest --concurrency 4 --jobs 20 --students 30 --groups "P-BG1 ALT 1 - ALT Semestre 1 - 1ère année"
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from app.core.prisma_client import connect_prisma, disconnect_prisma
+from app.core.template_mapping import TEMPLATE_MAPPING
+from app.services.file_metadata import find_template_metadata
+from app.services.file_storage import stored_file_fields
+from benchmarks.cohorts import build_cohort, ypareo_payloads
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BENCH_EMAIL_DOMAIN = "loadtest.example.invalid"
+DEFAULT_GROUP = "P-BG1 ALT 1 - ALT Semestre 1 - 1ère année"
+
+
+class LocalServer:
+    """
+    Serveur HTTP local (thread) qui répond aux GET à partir d'un dictionnaire chemin -> (type, octets) ;
+    la chaîne de requête est ignorée.
+    """
+
+    def __init__(self, routes: Dict[str, tuple], port: int = 0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                route = server.routes.get(urlsplit(self.path).path)
+                if route is None:
+                    self.send_error(404)
+                    return
+                content_type, body = route
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.routes = routes
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class ResourceSampler:
+    """
+    RSS et temps CPU du serveur et de ses processus enfants (workers uvicorn), lus dans /proc.
+    """
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.rss_samples: List[int] = []
+        self._cpu_start = self._cpu_seconds()
+        self._start = time.perf_counter()
+        self._stop = threading.Event()
+        if pid is not None:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _pids(self) -> List[int]:
+        pids, pending = [], [self.pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+        return pids
+
+    def _cpu_seconds(self) -> float:
+        if self.pid is None:
+            return 0.0
+        total = 0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                total += int(fields[11]) + int(fields[12])
+            except (OSError, IndexError, ValueError):
+                pass
+        return total / os.sysconf("SC_CLK_TCK")
+
+    def _rss(self) -> int:
+        total = 0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, IndexError, ValueError):
+                pass
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.rss_samples.append(self._rss())
+
+    def stop(self) -> dict:
+        self._stop.set()
+        if self.pid is None or not self.rss_samples:
+            return {"available": False}
+        elapsed = time.perf_counter() - self._start
+        return {
+            "available": True,
+            "peak_rss_mb": round(max(self.rss_samples) / 2**20, 1),
+            "mean_rss_mb": round(statistics.mean(self.rss_samples) / 2**20, 1),
+            "cpu_percent": round((self._cpu_seconds() - self._cpu_start) / elapsed * 100, 1),
+        }
+
+
+def _percentiles(durations: List[float]) -> dict:
+    if not durations:
+        return {"count": 0}
+    ordered = sorted(durations)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 1)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 1),
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": round(ordered[-1], 1),
+    }
+
+
+def _server_timing(header: str, totals: Dict[str, List[float]]) -> None:
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, *params = entry.split(";")
+        for param in params:
+            if param.startswith("dur="):
+                totals.setdefault(name, []).append(float(param[4:]))
+
+
+async def prepare_database(cohorts, users: int, urls: Dict[str, tuple], templates_dir: Optional[str]) -> List[str]:
+    """
+    Vérifie (ou ajoute depuis templates_dir) les templates Excel utilisés, crée les utilisateurs
+    de test (un par client simultané : le plafond d'admission est par utilisateur) et les
+    configurations excelUrl -> wordUrl.
+    """
+    db = await connect_prisma()
+    await cleanup_database()
+    for template in sorted({TEMPLATE_MAPPING[cohort.group_name] for cohort in cohorts}):
+        if await find_template_metadata(db, template):
+            continue
+        path = os.path.join(templates_dir or "", template)
+        if not templates_dir or not os.path.exists(path):
+            raise ValueError(f"Template {template} absent de la base (indiquer --templates-dir)")
+        await db.generatedfile.create({
+            "filename": template, "fileType": "xlsx", "isTemplate": True, "templateType": "Excel",
+            **await stored_file_fields("fileData", template, path=path),
+        })
+    user_ids = []
+    for index in range(users):
+        email = f"user{index}@{BENCH_EMAIL_DOMAIN}"
+        user = await db.user.upsert(
+            where={"email": email}, data={"create": {"email": email, "name": "loadtest"}, "update": {}},
+        )
+        user_ids.append(user.id)
+        await db.configuration.create_many(data=[
+            {
+                "fileName": f"loadtest-{cohort.code_groupe}", "excelUrl": urls[cohort.group_name][0],
+                "wordUrl": urls[cohort.group_name][1], "userId": user.id,
+            }
+            for cohort in cohorts
+        ])
+    return user_ids
+
+
+async def cleanup_database() -> None:
+    db = await connect_prisma()
+    users = await db.user.find_many(where={"email": {"endswith": f"@{BENCH_EMAIL_DOMAIN}"}})
+    user_ids = [user.id for user in users]
+    if user_ids:
+        await db.generatedexcel.delete_many(where={"userId": {"in": user_ids}})
+        # Les configurations sont supprimées en cascade avec les utilisateurs
+        await db.user.delete_many(where={"id": {"in": user_ids}})
+
+
+def start_app(port: int, workers: int, ypareo_url: str) -> subprocess.Popen:
+    env = {**os.environ, "YPAERO_BASE_URL": ypareo_url, "YPAERO_API_TOKEN": "loadtest"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("L'application s'est arrêtée au démarrage")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("L'application n'a pas démarré en 60 s")
+
+
+def run_job(session: requests.Session, app_url: str, user_id: str, excel_url: str, word_url: str,
+            server_timing: Dict[str, List[float]]) -> dict:
+    result = {"ok": False}
+    start = time.perf_counter()
+    response = session.post(f"{app_url}/process-excel", params={
+        "excel_url": excel_url, "word_url": word_url, "user_id": user_id,
+    })
+    result["process_excel_ms"] = (time.perf_counter() - start) * 1000
+    _server_timing(response.headers.get("Server-Timing", ""), server_timing)
+    if response.status_code != 200:
+        result["error"] = f"/process-excel {response.status_code} : {response.text[:200]}"
+        return result
+    second = time.perf_counter()
+    response = session.post(f"{app_url}/get-word-template", params={
+        "excel_id": response.json()["excel_id"], "user_id": user_id,
+    })
+    result["get_word_template_ms"] = (time.perf_counter() - second) * 1000
+    result["total_ms"] = (time.perf_counter() - start) * 1000
+    _server_timing(response.headers.get("Server-Timing", ""), server_timing)
+    if response.status_code != 200:
+        result["error"] = f"/get-word-template {response.status_code} : {response.text[:200]}"
+        return result
+    result["ok"] = True
+    return result
+
+
+def main(args) -> dict:
+    groups = args.groups or [DEFAULT_GROUP]
+    unknown = [group for group in groups if group not in TEMPLATE_MAPPING]
+    if unknown:
+        raise ValueError(f"Groupes absents de TEMPLATE_MAPPING : {', '.join(unknown)}")
+    cohorts = [build_cohort(group, 9000 + index, args.students, args.seed) for index, group in enumerate(groups)]
+
+    files = LocalServer({})
+    urls = {}
+    for cohort in cohorts:
+        excel_path, word_path = f"/files/{cohort.code_groupe}.xlsx", f"/files/{cohort.code_groupe}.docx"
+        files.routes[excel_path] = ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", cohort.excel_bytes)
+        files.routes[word_path] = ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", cohort.word_bytes)
+        urls[cohort.group_name] = (files.url + excel_path, files.url + word_path)
+    ypareo = LocalServer({
+        path: ("application/json", json.dumps(payload).encode())
+        for path, payload in ypareo_payloads(cohorts, args.seed).items()
+    }, port=args.ypareo_port)
+
+    loop = asyncio.new_event_loop()
+    process = None
+    try:
+        user_ids = loop.run_until_complete(prepare_database(cohorts, args.concurrency, urls, args.templates_dir))
+        if args.app_url:
+            app_url = args.app_url.rstrip("/")
+        else:
+            process = start_app(args.port, args.workers, ypareo.url)
+            app_url = f"http://127.0.0.1:{args.port}"
+
+        server_timing: Dict[str, List[float]] = {}
+        sessions = [requests.Session() for _ in range(args.concurrency)]
+        sampler = ResourceSampler(process.pid if process is not None and sys.platform == "linux" else None)
+
+        def job(index: int) -> dict:
+            worker = index % args.concurrency
+            excel_url, word_url = urls[cohorts[index % len(cohorts)].group_name]
+            try:
+                return run_job(sessions[worker], app_url, user_ids[worker], excel_url, word_url, server_timing)
+            except requests.RequestException as e:
+                return {"ok": False, "error": str(e)}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(job, range(args.jobs)))
+        elapsed = time.perf_counter() - start
+        resources = sampler.stop()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        loop.run_until_complete(cleanup_database())
+        loop.run_until_complete(disconnect_prisma())
+        loop.close()
+        files.close()
+        ypareo.close()
+
+    succeeded = [result for result in results if result["ok"]]
+    errors = [result["error"] for result in results if not result["ok"]]
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                   capture_output=True, text=True).stdout.strip(),
+        "config": {
+            "concurrency": args.concurrency, "jobs": args.jobs, "students": args.students,
+            "groups": groups, "seed": args.seed, "workers": None if args.app_url else args.workers,
+        },
+        "duration_s": round(elapsed, 2),
+        "throughput_jobs_per_s": round(len(succeeded) / elapsed, 3),
+        "throughput_bulletins_per_s": round(len(succeeded) * args.students / elapsed, 2),
+        "error_rate": round(len(errors) / len(results), 4),
+        "errors": errors[:10],
+        "latency": {
+            "total": _percentiles([result["total_ms"] for result in succeeded]),
+            "process_excel": _percentiles([result["process_excel_ms"] for result in results if "process_excel_ms" in result]),
+            "get_word_template": _percentiles([result["get_word_template_ms"] for result in results if "get_word_template_ms" in result]),
+        },
+        "server_timing_ms": {name: _percentiles(values) for name, values in sorted(server_timing.items())},
+        "resources": resources,
+    }
+
+
+def compare(report: dict, previous: dict) -> List[str]:
+    lines = []
+    for label, key_path in (("débit (traitements/s)", ("throughput_jobs_per_s",)),
+                            ("p95 total (ms)", ("latency", "total", "p95_ms")),
+                            ("p99 total (ms)", ("latency", "total", "p99_ms")),
+                            ("taux d'erreur", ("error_rate",))):
+        current, before = report, previous
+        for key in key_path:
+            current, before = (current or {}).get(key), (before or {}).get(key)
+        if current is not None and before:
+            lines.append(f"{label} : {before} -> {current} ({(current - before) / before * 100:+.1f} %)")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--students", type=int, default=30, help="Apprenants par promotion")
+    parser.add_argument("--groups", nargs="*", help="Noms de groupes (clés de TEMPLATE_MAPPING)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="Workers uvicorn de l'application lancée")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app-url", help="Application déjà démarrée (sinon lancée par le script)")
+    parser.add_argument("--ypareo-port", type=int, default=0)
+    parser.add_argument("--templates-dir", help="Dossier des templates Excel à ajouter s'ils manquent en base")
+    parser.add_argument("--output", help="Fichier JSON du rapport (défaut : benchmarks/results/loadtest-<date>.json)")
+    parser.add_argument("--compare", help="Rapport JSON précédent à comparer")
+    args = parser.parse_args()
+
+    report = main(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Rapport enregistré dans {output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print("\n".join(compare(report, json.load(f))))
@@ -0,0 +1,107 @@
+"""
+Requêtes de recherche du pipeline sur 10 000 lignes : lecture complète (find_first / find_many,
+contenu binaire compris) contre projection sur les métadonnées (app.services.file_metadata).
+
+Les lignes de test (préfixe "bench-metadata-") sont créées au début puis supprimées à la fin.
+Lancer avant et après `prisma db push` pour mesurer l'effet des index
+GeneratedFile(filename, isTemplate) et Configuration(excelUrl).
+
+Usage (depuis la racine du projet, DATABASE_URL renseignée et client Prisma généré) :
+    python -m benchmarks.metadata_queries --rows 10000 --payload-kb 16 --iterations 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from prisma import Prisma
+
+from app.core.prisma_client import connect_prisma, disconnect_prisma
+from app.services.file_metadata import find_template_metadata, find_word_url, list_file_metadata
+from app.services.file_storage import RAW, encode_file_data
+from benchmarks.prisma_overhead import _summary
+
+PREFIX = "bench-metadata-"
+BENCH_EMAIL = "bench-metadata@example.invalid"
+
+
+async def seed(db: Prisma, rows: int, payload_kb: int) -> str:
+    payload = encode_file_data(os.urandom(payload_kb * 1024))
+    user = await db.user.upsert(
+        where={"email": BENCH_EMAIL},
+        data={"create": {"email": BENCH_EMAIL, "name": "bench"}, "update": {}},
+    )
+    for offset in range(0, rows, 500):
+        batch = range(offset, min(rows, offset + 500))
+        await db.generatedfile.create_many(data=[
+            {
+                "filename": f"{PREFIX}{i}.xlsx", "fileType": "xlsx", "fileData": payload,
+                "storageFormat": RAW, "isTemplate": i % 10 == 0,
+            }
+            for i in batch
+        ])
+        await db.configuration.create_many(data=[
+            {
+                "fileName": f"{PREFIX}{i}", "excelUrl": f"{PREFIX}{i}.xlsx",
+                "wordUrl": f"{PREFIX}{i}.docx", "userId": user.id,
+            }
+            for i in batch
+        ])
+    return user.id
+
+
+async def cleanup(db: Prisma) -> None:
+    await db.configuration.delete_many(where={"fileName": {"startswith": PREFIX}})
+    await db.generatedfile.delete_many(where={"filename": {"startswith": PREFIX}})
+    await db.user.delete_many(where={"email": BENCH_EMAIL})
+
+
+async def _measure(iterations: int, query) -> dict:
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await query()
+        durations.append((time.perf_counter() - start) * 1000)
+    return _summary(durations)
+
+
+async def main(rows: int, payload_kb: int, iterations: int) -> dict:
+    db = await connect_prisma()
+    try:
+        await cleanup(db)
+        await seed(db, rows, payload_kb)
+        # Noms de templates existants (isTemplate = True pour une ligne sur dix)
+        names = [f"{PREFIX}{i}.xlsx" for i in range(0, rows, 10)]
+
+        def template_name():
+            return random.choice(names)
+
+        def excel_url():
+            return f"{PREFIX}{random.randrange(rows)}.xlsx"
+
+        results = {
+            "template_id_full_row": await _measure(iterations, lambda: db.generatedfile.find_first(
+                where={"filename": template_name(), "isTemplate": True})),
+            "template_id_metadata": await _measure(iterations, lambda: find_template_metadata(db, template_name())),
+            "list_templates_full_rows": await _measure(max(1, iterations // 10), lambda: db.generatedfile.find_many(
+                where={"isTemplate": True, "filename": {"startswith": PREFIX}})),
+            "list_templates_metadata": await _measure(max(1, iterations // 10), lambda: list_file_metadata(db)),
+            "word_url_full_row": await _measure(iterations, lambda: db.configuration.find_first(
+                where={"excelUrl": excel_url()})),
+            "word_url_metadata": await _measure(iterations, lambda: find_word_url(db, excel_url())),
+        }
+        return {"rows": rows, "payload_kb": payload_kb, **results}
+    finally:
+        await cleanup(db)
+        await disconnect_prisma()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--payload-kb", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.rows, args.payload_kb, args.iterations)), indent=2))
@@ -0,0 +1,333 @@
+"""
+Micro-benchmarks des chemins chauds du calcul des notes et du rendu des bulletins, avec référence
+enregistrée et détection des régressions.
+
+Les benchmarks grade.calculate_* et grade.get_etat_* mesurent la version scalaire conservée dans
+benchmarks/scalar_grades.py ; les autres grade.* mesurent le chemin de production (parse_grade_string,
+note_averages, compute_class_grades puis ClassGrades.placeholders), et le rendu Word reçoit les
+variables produites par ce même chemin, avec et sans statistiques de classe.
+
+Chaque benchmark est chronométré à la manière de timeit (nombre de boucles calibré, plusieurs
+répétitions, meilleur temps retenu). Les résultats sont comparés à la référence
+benchmarks/baselines/micro.json : avec --check, le script sort en erreur si un benchmark est plus lent
+que sa référence de plus de --threshold (25 % par défaut). La référence dépend de la machine : la
+régénérer (--save-baseline) sur la machine qui exécute la vérification.
+
+Usage (depuis la racine du projet, variables d'environnement renseignées et client Prisma généré) :
+    python -m benchmarks.micro --save-baseline
+    python -m benchmarks.micro --check --threshold 0.25
+    python -m benchmarks.micro --only grade
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from io import BytesIO
+from typing import Callable, Dict, List
+
+from app.api.endpoints.uploads import fill_bulletin_placeholders
+from app.core.bulletin_layouts import get_bulletin_layout
+from app.core.lazy import lazy_import
+from app.services.ects_service import get_ects_catalog
+from app.services.excel_service import (
+    COPY_CELL_CONFIGS, build_apprenant_mapping, copy_cells, summarize_absences,
+)
+from app.services.grade_engine import ClassGrades, compute_class_grades
+from app.services.grade_parser import note_averages, parse_grade_string
+from app.utils.utils import convert_minutes_to_hours_and_minutes
+from benchmarks.cohorts import _grade, build_cohort, ypareo_payloads
+from benchmarks.scalar_grades import (
+    calculate_ects_weighted_average, calculate_single_note_average, calculate_weighted_average, get_etat, get_etat_ue,
+)
+
+openpyxl = lazy_import("openpyxl")
+docx = lazy_import("docx")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "micro.json")
+SEED = 42
+# Promotion utilisée pour la copie des cellules et la jointure Yparéo
+COHORT_GROUP = "L-BG2 ALT - ALT Semestre 1"
+COHORT_STUDENTS = 200
+# Modèle de bulletin et ECTS du calcul de la classe (chemin de production de generate_bulletins)
+BULLETIN_TEMPLATE = "modeleBG-ALT-S3-2024-2025.docx"
+ECTS_TEMPLATE = "BG_ALT_3"
+
+
+def _grade_strings(count: int) -> List[str]:
+    rng = random.Random(SEED)
+    return [_grade(rng, rng.uniform(7, 16)) for _ in range(count)]
+
+
+def bench_weighted_average() -> Callable:
+    rows = [_grade_strings(500)[i:i + 5] for i in range(0, 500, 5)]
+    return lambda: [calculate_weighted_average(row) for row in rows]
+
+
+def bench_single_note_average() -> Callable:
+    grades = _grade_strings(500)
+    return lambda: [calculate_single_note_average(grade) for grade in grades]
+
+
+def bench_ects_weighted_average() -> Callable:
+    rng = random.Random(SEED)
+    rows = [([f"{rng.uniform(0, 20):.2f}" for _ in range(13)], [rng.choice((0, 1, 2, 3, 4, 6)) for _ in range(13)])
+            for _ in range(100)]
+    return lambda: [calculate_ects_weighted_average(notes, ects) for notes, ects in rows]
+
+
+def bench_etat() -> Callable:
+    rng = random.Random(SEED)
+    ues = [[f"{rng.uniform(0, 20):.2f}".replace(".", ",") for _ in range(4)] for _ in range(250)]
+
+    def run():
+        for notes in ues:
+            etats = [get_etat(note) for note in notes]
+            get_etat_ue(etats, notes[0])
+    return run
+
+
+def bench_minutes_conversion() -> Callable:
+    durations = list(range(0, 6000, 7))
+    return lambda: [convert_minutes_to_hours_and_minutes(minutes) for minutes in durations]
+
+
+def bench_copy_cells() -> Callable:
+    cohort = build_cohort(COHORT_GROUP, 9000, COHORT_STUDENTS, SEED)
+    source_ws = openpyxl.load_workbook(BytesIO(cohort.excel_bytes)).active
+    config = COPY_CELL_CONFIGS[cohort.template]
+
+    def run():
+        template_ws = openpyxl.Workbook().active
+        copy_cells(source_ws, template_ws, config["source_columns"], config["target_columns"])
+    return run
+
+
+def bench_ypareo_join() -> Callable:
+    cohort = build_cohort(COHORT_GROUP, 9000, COHORT_STUDENTS * 5, SEED)
+    payloads = ypareo_payloads([cohort], SEED)
+    frequentes = list(payloads["/r/v1/apprenants/frequentes"].values())
+    groupes = list(payloads["/r/v1/formation-longue/groupes"].values())
+    apprenants = list(payloads["/r/v1/formation-longue/apprenants"].values())
+    # Absences regroupées par apprenant, comme YpareoService.get_absences
+    absences: Dict[str, list] = {}
+    for absence in payloads["/r/v1/absences/01-09-2023/15-09-2024"].values():
+        absences.setdefault(str(absence["codeApprenant"]), []).append(absence)
+
+    def run():
+        build_apprenant_mapping(frequentes, groupes, apprenants)
+        summarize_absences(absences)
+    return run
+
+
+def _grade_cells() -> List[List[str]]:
+    """
+    Cellules de notes Yparéo de la classe, une colonne par matière du modèle BULLETIN_TEMPLATE.
+    """
+    rng = random.Random(SEED)
+    n_subjects = len(get_bulletin_layout(BULLETIN_TEMPLATE)["note_columns"])
+    levels = [rng.uniform(7, 16) for _ in range(COHORT_STUDENTS)]
+    return [[_grade(rng, level) for level in levels] for _ in range(n_subjects)]
+
+
+def _class_grades() -> ClassGrades:
+    """
+    Résultats de la classe calculés comme generate_bulletins : note_averages par colonne puis compute_class_grades.
+    """
+    layout = get_bulletin_layout(BULLETIN_TEMPLATE)
+    layout_ects = get_ects_catalog().get(ECTS_TEMPLATE).for_layout(BULLETIN_TEMPLATE)
+    note_strings = [list(notes) for notes in zip(*(note_averages(column) for column in _grade_cells()))]
+    return compute_class_grades(note_strings, layout["ues"], layout_ects.values, layout_ects.ue_totals)
+
+
+def bench_parse_grade_string() -> Callable:
+    cells = sorted({cell for column in _grade_cells() for cell in column})
+
+    def run():
+        # Cache vidé à chaque passe : on mesure l'analyse, pas la lecture du cache
+        parse_grade_string.cache_clear()
+        for cell in cells:
+            parse_grade_string(cell)
+    return run
+
+
+def bench_note_averages() -> Callable:
+    columns = _grade_cells()
+
+    def run():
+        parse_grade_string.cache_clear()
+        for column in columns:
+            note_averages(column)
+    return run
+
+
+def bench_compute_class_grades() -> Callable:
+    layout = get_bulletin_layout(BULLETIN_TEMPLATE)
+    layout_ects = get_ects_catalog().get(ECTS_TEMPLATE).for_layout(BULLETIN_TEMPLATE)
+    note_strings = [list(notes) for notes in zip(*(note_averages(column) for column in _grade_cells()))]
+    return lambda: compute_class_grades(note_strings, layout["ues"], layout_ects.values, layout_ects.ue_totals)
+
+
+def bench_class_placeholders() -> Callable:
+    class_grades = _class_grades()
+    return lambda: [class_grades.placeholders(index) for index in range(len(class_grades))]
+
+
+def bench_class_placeholders_statistics() -> Callable:
+    class_grades = _class_grades()
+    return lambda: [class_grades.placeholders(index, statistics=True) for index in range(len(class_grades))]
+
+
+def _student_data(statistics: bool) -> dict:
+    """
+    Variables d'un bulletin telles que generate_bulletins les passe au rendu : identité, informations,
+    titres des UE et matières, ECTS du template, puis résultats de compute_class_grades.
+    """
+    layout = get_bulletin_layout(BULLETIN_TEMPLATE)
+    student_data = {
+        "CodeApprenant": "900000", "nomApprenant": "MARTIN Camille",
+        "dateNaissance": "01/01/2004", "campus": "Paris", "groupe": "BG2 ALT", "etendugroupe": COHORT_GROUP,
+        "justifiee": "2h30m", "injustifiee": "0h0m", "retard": "0h15m", "APPRECIATIONS": "Travail sérieux et régulier.",
+        "datedujour": "01/07/2025",
+    }
+    for position, (ue, subjects) in enumerate(layout["ues"].items(), start=1):
+        student_data[f"UE{position}_Title"] = f"{ue} - Unité d'enseignement {position}"
+        student_data.update({f"matiere{subject}": f"Matière {subject}" for subject in subjects})
+    student_data.update(get_ects_catalog().get(ECTS_TEMPLATE).placeholders)
+    student_data.update(_class_grades().placeholders(0, statistics=statistics))
+    return student_data
+
+
+def _bulletin_template(statistics: bool = False) -> bytes:
+    """
+    Modèle Word réduit : variables de paragraphe (identité, dates, appréciations), tableau des notes
+    et tableau des UE, avec les statistiques de la classe si `statistics`.
+    """
+    layout = get_bulletin_layout(BULLETIN_TEMPLATE)
+    document = docx.Document()
+    for text in ("{{nomApprenant}}", "{{etendugroupe}}", "Identifiant : {{CodeApprenant}}",
+                 "Date : {{datedujour}}", "{{moyenne}}", "{{totaletat}}", "{{APPRECIATIONS}}"):
+        document.add_paragraph(text)
+    subject_keys = ("matiere", "note", "ECTS", "etat") + (("moyClasse", "rang") if statistics else ())
+    table = document.add_table(rows=len(layout["note_columns"]), cols=len(subject_keys))
+    for index, row in enumerate(table.rows, start=1):
+        for cell, key in zip(row.cells, subject_keys):
+            cell.text = f"{{{{{key}{index}}}}}"
+    ue_keys = ("moy", "etat", "ECTS") + (("moyClasse", "rang") if statistics else ())
+    table = document.add_table(rows=len(layout["ues"]), cols=len(ue_keys))
+    for ue, row in zip(layout["ues"], table.rows):
+        for cell, key in zip(row.cells, ue_keys):
+            cell.text = f"{{{{{key}{ue}}}}}"
+    output = BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def bench_placeholders() -> Callable:
+    template = _bulletin_template()
+    student_data = _student_data(statistics=False)
+    return lambda: fill_bulletin_placeholders(docx.Document(BytesIO(template)), student_data)
+
+
+def bench_placeholders_statistics() -> Callable:
+    template = _bulletin_template(statistics=True)
+    student_data = _student_data(statistics=True)
+    return lambda: fill_bulletin_placeholders(docx.Document(BytesIO(template)), student_data)
+
+
+BENCHMARKS = {
+    "grade.calculate_weighted_average": bench_weighted_average,
+    "grade.calculate_single_note_average": bench_single_note_average,
+    "grade.calculate_ects_weighted_average": bench_ects_weighted_average,
+    "grade.get_etat_and_get_etat_ue": bench_etat,
+    "grade.parse_grade_string": bench_parse_grade_string,
+    "grade.note_averages": bench_note_averages,
+    "grade.compute_class_grades": bench_compute_class_grades,
+    "grade.class_placeholders": bench_class_placeholders,
+    "grade.class_placeholders_statistics": bench_class_placeholders_statistics,
+    "utils.convert_minutes_to_hours_and_minutes": bench_minutes_conversion,
+    "excel.copy_cells": bench_copy_cells,
+    "ypareo.join": bench_ypareo_join,
+    "word.fill_bulletin_placeholders": bench_placeholders,
+    "word.fill_bulletin_placeholders_statistics": bench_placeholders_statistics,
+}
+
+
+def measure(func: Callable, repeat: int) -> float:
+    """
+    Meilleur temps par appel (secondes) sur `repeat` répétitions d'au moins 0,2 s chacune.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(only: str = "", repeat: int = 5) -> Dict[str, float]:
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if only and only not in name:
+            continue
+        results[name] = measure(factory(), repeat)
+        print(f"{name:<45} {results[name] * 1000:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    regressions = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * (1 + threshold):
+            regressions.append(f"{name} : {reference * 1000:.3f} ms -> {seconds * 1000:.3f} ms "
+                               f"({(seconds / reference - 1) * 100:+.1f} %)")
+    return regressions
+
+
+def _load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="", help="Ne lancer que les benchmarks dont le nom contient ce texte")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Ralentissement toléré (0.25 = 25 %%)")
+    parser.add_argument("--check", action="store_true", help="Code de sortie 1 en cas de régression")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les résultats comme référence")
+    args = parser.parse_args()
+
+    results = run(args.only, args.repeat)
+    stored = _load_baseline()
+    baseline = stored.get("results", {})
+    report = {
+        name: {
+            "ms": round(seconds * 1000, 4),
+            "baseline_ms": round(baseline[name] * 1000, 4) if name in baseline else None,
+            "change_percent": round((seconds / baseline[name] - 1) * 100, 1) if baseline.get(name) else None,
+        }
+        for name, seconds in results.items()
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                            "processor": platform.processor() or platform.machine()},
+                "results": {**baseline, **results},
+            }, f, indent=2)
+        print(f"Référence enregistrée dans {BASELINE_PATH}", file=sys.stderr)
+    if args.check:
+        if not baseline:
+            print("Aucune référence : lancer d'abord avec --save-baseline", file=sys.stderr)
+            sys.exit(1)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Régressions :\n" + "\n".join(regressions), file=sys.stderr)
+            sys.exit(1)
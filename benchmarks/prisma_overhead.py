@@ -0,0 +1,75 @@
+"""
+Surcoût base de données par requête : client Prisma créé et connecté à chaque appel
+(ancien fonctionnement des services) contre client partagé connecté une seule fois.
+
+Usage (depuis la racine du projet, DATABASE_URL renseignée et client Prisma généré) :
+    python -m benchmarks.prisma_overhead --iterations 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from prisma import Prisma
+
+from app.core.prisma_client import connect_prisma, disconnect_prisma, get_prisma
+
+
+async def _query(db: Prisma) -> None:
+    # Requête représentative d'un appel de service : recherche d'un template par nom
+    await db.generatedfile.find_first(where={"filename": "BG-ALT-S1.xlsx", "isTemplate": True})
+
+
+async def per_call_client(iterations: int) -> list:
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        db = Prisma()
+        await db.connect()
+        await _query(db)
+        await db.disconnect()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+async def shared_client(iterations: int) -> list:
+    await connect_prisma()
+    durations = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            db = await get_prisma()
+            await _query(db)
+            durations.append((time.perf_counter() - start) * 1000)
+    finally:
+        await disconnect_prisma()
+    return durations
+
+
+def _summary(durations: list) -> dict:
+    ordered = sorted(durations)
+    return {
+        "iterations": len(durations),
+        "mean_ms": round(statistics.mean(durations), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+async def main(iterations: int) -> dict:
+    before = _summary(await per_call_client(iterations))
+    after = _summary(await shared_client(iterations))
+    return {
+        "per_call_client": before,
+        "shared_client": after,
+        "overhead_saved_ms": round(before["mean_ms"] - after["mean_ms"], 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.iterations)), indent=2))
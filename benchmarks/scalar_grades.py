@@ -0,0 +1,161 @@
+"""
+Calcul des notes une note à la fois, tel que le faisait /get-word-template avant le moteur vectoriel
+(app.services.grade_engine).
+
+Ces fonctions ne servent plus à la génération des bulletins : elles restent la référence des tests
+d'équivalence du moteur (tests/) et sont mesurées par benchmarks/micro.py.
+"""
+import logging
+
+from app.services.grade_parser import note_average, parse_grade_string, tokens_average
+
+
+def calculate_weighted_average(notes):
+    """
+    Calcule la moyenne pondérée des notes avec leurs coefficients.
+    Format des notes : "10 (0,25)" ou "10(0.25)" ou "10"
+    """
+    tokens = []
+    for note_str in notes or []:
+        parsed = parse_grade_string(str(note_str)) if note_str is not None else ()
+        if parsed:
+            tokens.extend(parsed)
+
+    average = tokens_average(tokens)
+    # Arrondir au centième
+    return round(average, 2) if average is not None else 0
+
+
+def calculate_single_note_average(note_str):
+    """
+    Calcule la moyenne pour une note avec plusieurs coefficients.
+    Format: "10 (0,25) - 15 (0,25) - 10,5 (0,5)" ou "17 - 16 - 17"
+    """
+    return note_average(note_str)
+
+
+def calculate_ects_weighted_average(notes, ects_values):
+    """
+    Calcule la moyenne pondérée par les ECTS.
+    Ne prend en compte que les matières avec des ECTS > 0.
+    """
+    try:
+        total_weighted_sum = 0
+        total_ects = 0
+
+        # Parcourir les notes et leurs ECTS correspondants
+        for note_str, ects_str in zip(notes, ects_values):
+            if not note_str:
+                continue
+
+            try:
+                # Convertir la note en float (remplacer la virgule par un point)
+                note = float(str(note_str).replace(",", "."))
+                # Convertir l'ECTS en entier
+                ects = int(ects_str)
+                
+                # Toujours prendre en compte la note si elle existe, même avec ECTS = 0
+                if note > 0:
+                    # Si ECTS = 0, utiliser un coefficient de 1 pour la moyenne
+                    coeff = max(ects, 1)
+                    total_weighted_sum += note * coeff
+                    total_ects += coeff
+
+            except (ValueError, TypeError):
+                continue
+
+        if total_ects == 0:
+            return ""
+
+        # Arrondir à 2 décimales
+        return f"{(total_weighted_sum / total_ects):.2f}"
+
+    except Exception as e:
+        logging.error(f"Erreur lors du calcul de la moyenne pondérée ECTS: {str(e)}")
+        return ""
+
+
+def get_etat(note_str: str, has_r_in_ue: bool = False) -> str:
+    """
+    Détermine l'état en fonction de la note.
+    
+    Args:
+        note_str: La note sous forme de chaîne
+        has_r_in_ue: Indique s'il y a déjà un R dans l'UE
+    
+    Returns:
+        - Si note >= 10 : "VA"
+        - Si note < 8 : "R"
+        - Si 8 <= note < 10 : "C"
+        - Si note est vide ou invalide : ""
+    """
+    if not note_str or str(note_str).strip() == "":
+        return ""
+        
+    try:
+        note = float(str(note_str).replace(",", "."))
+        
+        # Si la note est >= 10, c'est toujours "VA"
+        if note >= 10:
+            return "VA"
+        # Si la note est < 8, c'est toujours "R"
+        elif note < 8:
+            return "R"
+        # Si 8 <= note < 10, c'est "C"
+        else:
+            return "C"
+    except (ValueError, TypeError):
+        return ""
+
+
+
+def get_etat_ue(etats: list, moyenne_ue: str = "") -> str:
+    """
+    Détermine l'état d'une UE en fonction des états des notes et de la moyenne de l'UE.
+    
+    Règles:
+    - "VA" si moyenne_ue >= 10 ET pas de "R" dans les états
+    - "NV" si:
+        * au moins un état "R"
+        * OU moyenne_ue < 10
+    """
+    try:
+        moyenne = float(str(moyenne_ue).replace(",", ".")) if moyenne_ue else 0
+    except (ValueError, TypeError):
+        moyenne = 0
+
+    # Vérifier s'il y a au moins un R
+    has_r = "R" in etats
+    
+    # Si pas de R et moyenne >= 10 => VA
+    if not has_r and moyenne >= 10:
+        return "VA"
+    
+    # Sinon => NV
+    return "NV"
+
+
+
+
+def get_total_etat(*etats_ue: str) -> str:
+    """
+    Détermine l'état total en fonction des états des UE.
+    
+    Règles:
+    - "VA" si tous les états des UE sont "VA"
+    - "NV" si au moins un état d'UE est "NV"
+    """
+    if all(etat == "VA" for etat in etats_ue):
+        return "VA"
+    return "NV"
+
+
+def adjust_ects(note_str, original_ects) -> str:
+    """
+    ECTS d'une matière : 0 si la note est absente ou < 8, ECTS d'origine sinon.
+    """
+    try:
+        note = float(note_str) if note_str else 0
+        return "0" if note < 8 else str(original_ects)
+    except (ValueError, TypeError):
+        return str(original_ects)
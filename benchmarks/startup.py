@@ -0,0 +1,96 @@
+"""
+Temps d'import de l'application (`import main`) mesuré avec `python -X importtime`, dans un
+processus neuf à chaque essai.
+
+Le rapport donne la durée totale, les modules les plus coûteux et les dépendances lourdes chargées
+dès l'import alors qu'elles devraient l'être à la demande (app.core.lazy). Avec --check, le script
+sort en erreur si le budget STARTUP_IMPORT_BUDGET_MS est dépassé ou si une dépendance lourde est
+importée au démarrage. Les mêmes vérifications sont faites par tests/test_startup.py.
+
+Usage (depuis la racine du projet, variables d'environnement renseignées et client Prisma généré) :
+    python -m benchmarks.startup --runs 5 --top 15 --check
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from app.core.config import Settings
+from app.core.lazy import HEAVY_MODULES
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _budget_ms() -> int:
+    default = Settings.model_fields["STARTUP_IMPORT_BUDGET_MS"].default
+    return int(os.environ.get("STARTUP_IMPORT_BUDGET_MS", default))
+
+
+def import_profile() -> dict:
+    """
+    Un import de `main` dans un nouvel interpréteur : durées (µs) par module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de main impossible :\n{result.stderr[-2000:]}")
+    modules = {}
+    # La sortie liste les sous-modules avant leur parent : on garde les imports directs de main
+    children, main_imports = [], []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        modules[name] = {"self_us": self_us, "cumulative_us": cumulative_us}
+        if len(indent) == 3:
+            children.append((name, cumulative_us))
+        elif len(indent) <= 1:
+            if name == "main":
+                main_imports = children
+            children = []
+    return {"modules": modules, "main_imports": main_imports}
+
+
+def main(runs: int, top: int) -> dict:
+    profiles = [import_profile() for _ in range(runs)]
+    totals = [p["modules"]["main"]["cumulative_us"] / 1000 for p in profiles]
+    best = profiles[totals.index(min(totals))]
+    heaviest = sorted(best["modules"].items(), key=lambda item: item[1]["cumulative_us"], reverse=True)
+    eager_heavy = sorted(name for name in best["modules"] if name in HEAVY_MODULES)
+    return {
+        "runs": runs,
+        "import_main_ms": {"best": round(min(totals), 1), "worst": round(max(totals), 1)},
+        "budget_ms": _budget_ms(),
+        "main_imports_ms": {
+            name: round(us / 1000, 1) for name, us in sorted(best["main_imports"], key=lambda item: -item[1])
+        },
+        "heaviest_modules_ms": {
+            name: round(values["cumulative_us"] / 1000, 1) for name, values in heaviest[1:top + 1]
+        },
+        "eager_heavy_modules": eager_heavy,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--check", action="store_true", help="Code de sortie 1 si le budget n'est pas tenu")
+    args = parser.parse_args()
+    report = main(args.runs, args.top)
+    print(json.dumps(report, indent=2))
+    if args.check:
+        failures = []
+        if report["import_main_ms"]["best"] > report["budget_ms"]:
+            failures.append(f"import de main : {report['import_main_ms']['best']} ms > {report['budget_ms']} ms")
+        if report["eager_heavy_modules"]:
+            failures.append(f"dépendances lourdes importées au démarrage : {', '.join(report['eager_heavy_modules'])}")
+        if failures:
+            print("\n".join(failures), file=sys.stderr)
+            sys.exit(1)
@@ -1,7 +1,36 @@
+import time
+
+# Début du démarrage : sert à mesurer le temps d'import et de démarrage de l'application
+_startup_start = time.perf_counter()
+
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api.endpoints import uploads
 from app.api.endpoints.ypareo_endpoints import router as ypareo_router
+from app.api.endpoints.jobs_endpoints import router as jobs_router
+from app.api.endpoints.artifacts_endpoints import router as artifacts_router
+from app.api.endpoints.profiles_endpoints import router as profiles_router
+from app.api.endpoints.database_endpoints import router as database_router
+from app.core.executor import event_loop_monitor, get_executor, run_blocking, shutdown_executor
+from app.core.lazy import preload
+from app.core.memory import current_rss, memory_tracker, start_tracemalloc
+from app.core.metrics import gauge_lines, registry
+from app.core.profiling import PROFILES_PATH, ProfilingMiddleware, check_profiling_settings
+from app.core.server_timing import ServerTimingMiddleware
+from app.core.admission import get_admission_controller
+from app.core.cancellation import list_jobs
+from app.services.grade_parser import parse_grade_string
+from app.core.database import dispose_async_engine, pool_wait_stats
+from app.core.workspace import get_workspace_manager
+from app.core.prisma_client import check_prisma_health, connect_prisma, disconnect_prisma
+from app.core.config import settings
+from app.services.blob_store import check_shared_storage
+from app.services.file_storage import migrate_legacy_files
+from app.services.template_cache import get_template_cache
+from app.services.ects_service import get_ects_catalog, start_ects_catalog, stop_ects_catalog
 
 # Configuration du logging
 logging.basicConfig(
@@ -12,16 +41,139 @@ logging.basicConfig(
     ]
 )
 
-app = FastAPI()
+_import_duration = time.perf_counter() - _startup_start
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Avant tout le reste : plusieurs instances sur un disque local perdraient des fichiers
+    check_shared_storage()
+    check_profiling_settings()
+    get_executor()
+    event_loop_monitor.start()
+    start_tracemalloc()
+    try:
+        await connect_prisma()
+    except Exception as e:
+        # L'application démarre quand même : le client sera reconnecté à la première requête
+        logging.error(f"Connexion Prisma impossible au démarrage : {str(e)}")
+    await start_ects_catalog()
+    get_workspace_manager().start_janitor(settings.WORKSPACE_JANITOR_INTERVAL_SECONDS)
+    if settings.TEMPLATE_CACHE_PREWARM:
+        try:
+            await get_template_cache().prewarm()
+        except Exception as e:
+            logging.error(f"Préchargement des templates impossible : {str(e)}")
+    migration_task = None
+    if settings.STORAGE_MIGRATION_ENABLED:
+        migration_task = asyncio.create_task(migrate_legacy_files(settings.STORAGE_MIGRATION_BATCH_SIZE))
+    if settings.LAZY_IMPORT_PRELOAD:
+        # Après le démarrage, sans le retarder : le premier traitement trouvera openpyxl/docx déjà chargés
+        asyncio.create_task(run_blocking(preload))
+    startup_ms = (time.perf_counter() - _startup_start) * 1000
+    logging.info(f"Application prête en {startup_ms:.0f} ms (imports : {_import_duration * 1000:.0f} ms)")
+    if startup_ms > settings.STARTUP_BUDGET_MS:
+        logging.warning(f"Démarrage au-delà du budget de {settings.STARTUP_BUDGET_MS} ms")
+    yield
+    if migration_task is not None and not migration_task.done():
+        migration_task.cancel()
+        try:
+            await migration_task
+        except asyncio.CancelledError:
+            pass
+    await stop_ects_catalog()
+    await get_workspace_manager().stop_janitor()
+    await disconnect_prisma()
+    await dispose_async_engine()
+    await event_loop_monitor.stop()
+    shutdown_executor()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ServerTimingMiddleware, path_prefixes=("/process-excel", "/get-word-template", "/ypareo/"))
+app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(uploads.router, prefix="", tags=["uploads"])
 app.include_router(ypareo_router, prefix="/ypareo", tags=["ypareo"])
+app.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+app.include_router(artifacts_router, prefix="/artifacts", tags=["artifacts"])
+app.include_router(profiles_router, prefix=PROFILES_PATH, tags=["profiles"])
+app.include_router(database_router, prefix="/db", tags=["database"])
+
+def _runtime_metrics() -> list:
+    """
+    Valeurs lues au moment de la collecte Prometheus : caches, traitements en cours, files d'attente.
+    """
+    template_cache = get_template_cache().snapshot()
+    grade_cache = parse_grade_string.cache_info()
+    grade_lookups = grade_cache.hits + grade_cache.misses
+    admission_state = get_admission_controller().snapshot()
+    workspaces = get_workspace_manager().snapshot()
+    memory = memory_tracker.snapshot()
+    return [
+        *gauge_lines("bulletins_cache_hit_ratio", "Taux de succès des caches", {
+            (("cache", "template"),): template_cache["hit_ratio"],
+            (("cache", "grade_parser"),): round(grade_cache.hits / grade_lookups, 4) if grade_lookups else 0.0,
+        }),
+        *gauge_lines("bulletins_cache_bytes", "Taille en mémoire des caches", {
+            (("cache", "template"),): template_cache["memory_bytes"],
+        }),
+        *gauge_lines("bulletins_jobs_in_flight", "Traitements en cours", {(): len(list_jobs())}),
+        *gauge_lines("bulletins_admission_running", "Traitements lourds admis en cours", {(): admission_state["running"]}),
+        *gauge_lines("bulletins_admission_queued", "Traitements en attente d'admission", {
+            (("lane", lane),): queued for lane, queued in admission_state["queued"].items()
+        }),
+        *gauge_lines("bulletins_workspaces_active", "Espaces de travail des traitements en cours", {(): workspaces["active"]}),
+        *gauge_lines("bulletins_process_rss_bytes", "Mémoire résidente du processus", {(): current_rss()}),
+        *gauge_lines("bulletins_stage_max_rss_bytes", "Mémoire résidente maximale relevée en fin d'étape", {
+            (("stage", name),): values["max_rss_bytes"] for name, values in memory["stages"].items()
+        }),
+        *gauge_lines("bulletins_event_loop_lag_seconds", "Dernier retard mesuré de la boucle asyncio", {
+            (): event_loop_monitor.snapshot()["last_lag_seconds"],
+        }),
+    ]
+
+
+registry.add_collector(_runtime_metrics)
 
 @app.get("/")
 def read_root():
     return {"message": "Bienvenue dans l'application génération des bulletins"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/event-loop")
+def event_loop_metrics():
+    return event_loop_monitor.snapshot()
+
+@app.get("/metrics/db-pool")
+def db_pool_metrics():
+    return pool_wait_stats.snapshot()
+
+@app.get("/metrics/memory")
+def memory_metrics():
+    return memory_tracker.snapshot()
+
+@app.get("/metrics/workspaces")
+def workspace_metrics():
+    return get_workspace_manager().snapshot()
+
+@app.get("/metrics/template-cache")
+def template_cache_metrics():
+    return get_template_cache().snapshot()
+
+@app.get("/health/db")
+async def database_health():
+    health = await check_prisma_health()
+    if health["status"] == "down":
+        return JSONResponse(status_code=503, content=health)
+    return health
+
+@app.get("/ects/catalog")
+def ects_catalog_status():
+    return get_ects_catalog().snapshot()
+
 @app.post("/process-template")
 def process_template(output_path: str):
     try:
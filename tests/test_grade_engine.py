@@ -0,0 +1,159 @@
+import random
+
+import pytest
+
+from app.core.bulletin_layouts import BULLETIN_LAYOUTS
+from app.services.grade_engine import compute_class_grades, uses_statistics
+from benchmarks.scalar_grades import (
+    adjust_ects, calculate_ects_weighted_average, get_etat, get_etat_ue, get_total_etat,
+)
+
+STUDENTS = 60
+
+
+def _random_class(rng: random.Random, n_subjects: int) -> list:
+    """
+    Notes telles qu'affichées sur le bulletin : "" sans note, 0, valeurs proches des seuils 8 et 10.
+    """
+    choices = lambda: rng.choice(["", "0.00", "8.00", "10.00", f"{rng.uniform(0, 20):.2f}", f"{rng.uniform(7, 11):.2f}"])
+    return [[choices() for _ in range(n_subjects)] for _ in range(STUDENTS)]
+
+
+def _scalar_bulletin(notes: list, ues: dict, ects: list) -> dict:
+    """
+    Résultats d'un étudiant calculés note par note avec la version scalaire.
+    """
+    data = {}
+    for subject, note in enumerate(notes, start=1):
+        data[f"note{subject}"] = note
+        data[f"etat{subject}"] = get_etat(note)
+        data[f"ECTS{subject}"] = adjust_ects(note, ects[subject - 1])
+
+    weighted_sum = 0
+    original_total = 0
+    for ue, subjects in ues.items():
+        moyenne_ue = calculate_ects_weighted_average([notes[i - 1] for i in subjects], [ects[i - 1] for i in subjects])
+        data[f"moy{ue}"] = moyenne_ue
+        data[f"etat{ue}"] = get_etat_ue([data[f"etat{i}"] for i in subjects], moyenne_ue)
+        data[f"ECTS{ue}"] = str(sum(int(data[f"ECTS{i}"]) for i in subjects))
+        original_ects = sum(ects[i - 1] for i in subjects)
+        weighted_sum = weighted_sum + float(moyenne_ue or 0) * original_ects
+        original_total += original_ects
+
+    data["moyenne"] = f"{weighted_sum / original_total:.2f}" if original_total > 0 else ""
+    data["moyenneECTS"] = str(sum(int(data[f"ECTS{ue}"]) for ue in ues))
+    data["totaletat"] = get_total_etat(*(data[f"etat{ue}"] for ue in ues))
+    return data
+
+
+def _legacy_alt_s1_bulletin(notes: list, ects: list) -> dict:
+    """
+    Branche modeleBG-ALT-S1 de l'ancien /get-word-template, seul modèle que l'ancien code menait
+    à terme (les autres branches échouaient : moyUE non calculées, notes ou arguments manquants).
+    """
+    note = {f"note{i}": value for i, value in enumerate(notes, start=1)}
+    ects_data = {f"ECTS{i}": value for i, value in enumerate(ects, start=1)}
+    moy_ues = [
+        calculate_ects_weighted_average([note[f"note{i}"] for i in range(1, 4)], [ects_data[f"ECTS{i}"] for i in range(1, 4)]),
+        calculate_ects_weighted_average([note[f"note{i}"] for i in range(4, 7)], [ects_data[f"ECTS{i}"] for i in range(4, 7)]),
+        calculate_ects_weighted_average([note["note7"]], [ects_data["ECTS7"]]),
+        calculate_ects_weighted_average([note[f"note{i}"] for i in range(8, 14)], [ects_data[f"ECTS{i}"] for i in range(8, 14)]),
+    ]
+    ects_ues = [
+        sum(int(ects_data[f"ECTS{i}"]) for i in range(1, 4)),
+        sum(int(ects_data[f"ECTS{i}"]) for i in range(4, 7)),
+        int(ects_data["ECTS7"]),
+        sum(int(ects_data[f"ECTS{i}"]) for i in range(8, 14)),
+    ]
+    moyenne_ects = sum(ects_ues)
+    try:
+        if moyenne_ects > 0:
+            moyenne_ponderee = (
+                float(moy_ues[0] or 0) * ects_ues[0] +
+                float(moy_ues[1] or 0) * ects_ues[1] +
+                float(moy_ues[2] or 0) * ects_ues[2] +
+                float(moy_ues[3] or 0) * ects_ues[3]
+            ) / moyenne_ects
+            moyenne = f"{moyenne_ponderee:.2f}"
+        else:
+            moyenne = ""
+    except (ValueError, TypeError, ZeroDivisionError):
+        moyenne = ""
+
+    data = {**note, "moyenne": moyenne}
+    data.update({f"moyUE{i}": moy_ues[i - 1] for i in range(1, 5)})
+    etats = {f"etat{i}": get_etat(note[f"note{i}"]) for i in range(1, 14)}
+    data.update(etats)
+    etats_ue = {
+        "etatUE1": get_etat_ue([etats[f"etat{i}"] for i in range(1, 4)], data["moyUE1"]),
+        "etatUE2": get_etat_ue([etats[f"etat{i}"] for i in range(4, 7)], data["moyUE2"]),
+        "etatUE3": get_etat_ue([etats["etat7"]], data["moyUE3"]),
+        "etatUE4": get_etat_ue([etats[f"etat{i}"] for i in range(8, 14)], data["moyUE4"]),
+    }
+    data.update(etats_ue)
+    data["totaletat"] = get_total_etat(*etats_ue.values())
+    for i in range(1, 14):
+        data[f"ECTS{i}"] = adjust_ects(note[f"note{i}"], ects_data[f"ECTS{i}"])
+    data["ECTSUE1"] = str(sum(int(data[f"ECTS{i}"]) for i in range(1, 4)))
+    data["ECTSUE2"] = str(sum(int(data[f"ECTS{i}"]) for i in range(4, 7)))
+    data["ECTSUE3"] = data["ECTS7"]
+    data["ECTSUE4"] = str(sum(int(data[f"ECTS{i}"]) for i in range(8, 14)))
+    data["moyenneECTS"] = str(sum(int(data[f"ECTSUE{i}"]) for i in range(1, 5)))
+    return data
+
+
+def _engine_bulletins(note_strings: list, ues: dict, ects: list, keys) -> list:
+    class_grades = compute_class_grades(note_strings, ues, ects)
+    bulletins = []
+    for index in range(len(note_strings)):
+        placeholders = class_grades.placeholders(index)
+        bulletins.append({key: placeholders[key] for key in keys})
+    return bulletins
+
+
+@pytest.mark.parametrize("template_name", sorted(BULLETIN_LAYOUTS))
+def test_engine_matches_scalar_computation(template_name):
+    layout = BULLETIN_LAYOUTS[template_name]
+    rng = random.Random(template_name)
+    n_subjects = len(layout["note_columns"])
+    for _ in range(5):
+        ects = [rng.choice([0, 1, 2, 3, 4, 6]) for _ in range(n_subjects)]
+        note_strings = _random_class(rng, n_subjects)
+        expected = [_scalar_bulletin(notes, layout["ues"], ects) for notes in note_strings]
+        assert _engine_bulletins(note_strings, layout["ues"], ects, expected[0].keys()) == expected
+
+
+def test_engine_matches_legacy_alt_s1_bulletins():
+    layout = BULLETIN_LAYOUTS["modeleBG-ALT-S1-2024-2025.docx"]
+    rng = random.Random(2025)
+    for _ in range(20):
+        ects = [rng.choice([0, 1, 2, 3, 4, 6]) for _ in range(13)]
+        note_strings = _random_class(rng, 13)
+        expected = [_legacy_alt_s1_bulletin(notes, ects) for notes in note_strings]
+        assert _engine_bulletins(note_strings, layout["ues"], ects, expected[0].keys()) == expected
+
+
+def test_every_subject_belongs_to_exactly_one_ue():
+    for template_name, layout in BULLETIN_LAYOUTS.items():
+        subjects = sorted(subject for members in layout["ues"].values() for subject in members)
+        assert subjects == list(range(1, len(layout["note_columns"]) + 1)), template_name
+
+
+def test_statistics_placeholders_only_on_request():
+    layout = BULLETIN_LAYOUTS["modeleBG-ALT-S1-2024-2025.docx"]
+    class_grades = compute_class_grades(_random_class(random.Random(7), 13), layout["ues"], [2] * 13)
+    plain = class_grades.placeholders(0)
+    full = class_grades.placeholders(0, statistics=True)
+    assert not any(key.startswith(("moyClasse", "rang", "effectif")) for key in plain)
+    assert full == {**plain, **class_grades.statistics_placeholders(0)}
+    assert full["effectif"] == str(STUDENTS)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("{{nomApprenant}} {{moyUE1}} {{note1}} {{moyenne}}", False),
+    ("Moyenne de la classe : {{moyClasseUE2}}", True),
+    ("Rang : {{rang}} / {{effectif}}", True),
+    ("{{ecartTypeClasse3}}", True),
+])
+def test_uses_statistics(text, expected):
+    assert uses_statistics(text) is expected
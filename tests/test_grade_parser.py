@@ -0,0 +1,128 @@
+import random
+
+import pytest
+
+from app.services.grade_parser import (
+    ABSENT_MARKER, GradeToken, note_average, note_averages, parse_grade_string, tokens_average,
+)
+
+
+def _legacy_single_note_average(note_str):
+    """
+    calculate_single_note_average avant l'analyseur précompilé (référence des comparaisons).
+    """
+    try:
+        if not note_str or str(note_str).strip() == "":
+            return ""
+        note_str = str(note_str).strip()
+        if "(" in note_str:
+            try:
+                total_weighted_sum = 0
+                total_coefficients = 0
+                for part in note_str.split("-"):
+                    part = part.strip()
+                    if ABSENT_MARKER in part:
+                        continue
+                    if "(" in part and ")" in part:
+                        note_part = part.split("(")
+                        note = float(note_part[0].strip().replace(",", "."))
+                        coeff = float(note_part[1].replace(",", ".").replace(")", "").strip())
+                        total_weighted_sum += note * coeff
+                        total_coefficients += coeff
+                if total_coefficients > 0:
+                    return f"{(total_weighted_sum / total_coefficients):.2f}"
+                return ""
+            except (ValueError, IndexError):
+                return ""
+        try:
+            notes = [float(n.strip().replace(",", ".")) for n in note_str.split("-") if n.strip() and ABSENT_MARKER not in n]
+            if notes:
+                return f"{(sum(notes) / len(notes)):.2f}"
+            return ""
+        except ValueError:
+            return ""
+    except Exception:
+        return ""
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("", ()),
+    ("   ", ()),
+    ("17", (GradeToken(17.0, 1.0, False),)),
+    ("17 - 16,5", (GradeToken(17.0, 1.0, False), GradeToken(16.5, 1.0, False))),
+    ("10 (0,25) - 15(0.75)", (GradeToken(10.0, 0.25, False), GradeToken(15.0, 0.75, False))),
+    (f"12 (0,5) - {ABSENT_MARKER}", (GradeToken(12.0, 0.5, False), GradeToken(None, None, True))),
+    # Une fois un coefficient présent, les notes sans coefficient sont ignorées
+    ("12 (0,5) - 8", (GradeToken(12.0, 0.5, False),)),
+    ("1e3", (GradeToken(1000.0, 1.0, False),)),
+    ("+5", (GradeToken(5.0, 1.0, False),)),
+    (",5", (GradeToken(0.5, 1.0, False),)),
+])
+def test_parse_grade_string(raw, expected):
+    assert parse_grade_string(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["abc", "12 (abc)", "12 (0,5))", "inf", "nan", "1_000", "12 13"])
+def test_parse_grade_string_rejects_malformed_cells(raw):
+    assert parse_grade_string(raw) is None
+
+
+def test_tokens_average():
+    assert tokens_average([GradeToken(10.0, 0.25, False), GradeToken(14.0, 0.75, False)]) == pytest.approx(13.0)
+    assert tokens_average([GradeToken(None, None, True)]) is None
+    assert tokens_average([]) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, ""),
+    ("", ""),
+    (15, "15.00"),
+    (12.5, "12.50"),
+    ("17 - 16 - 17", "16.67"),
+    ("10 (0,25) - 15 (0,25) - 10,5 (0,5)", "11.50"),
+    (ABSENT_MARKER, ""),
+    (f"{ABSENT_MARKER} - 14", "14.00"),
+    ("1e3", "1000.00"),
+    ("abc", ""),
+])
+def test_note_average(value, expected):
+    assert note_average(value) == expected
+
+
+def test_note_averages_matches_note_average():
+    values = ["12", None, "12", "10 (0,5) - 14 (0,5)", "abc", "", 15, "12"]
+    assert note_averages(values) == [note_average(value) for value in values]
+
+
+def _random_number(rng: random.Random) -> str:
+    integer = str(rng.randint(0, 20))
+    number = rng.choice([
+        integer,
+        f"{integer}{rng.choice('.,')}{rng.randint(0, 99)}",
+        f"{integer}{rng.choice('.,')}",
+        f"{rng.choice('.,')}{rng.randint(0, 9)}",
+        f"+{integer}",
+        f"{integer}{rng.choice('eE')}{rng.choice(['', '+'])}{rng.randint(0, 2)}",
+    ])
+    return number
+
+
+def _random_cell(rng: random.Random) -> str:
+    weighted = rng.random() < 0.6
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        space = " " * rng.randint(0, 2)
+        if rng.random() < 0.1:
+            parts.append(ABSENT_MARKER)
+        elif weighted and rng.random() < 0.9:
+            parts.append(f"{_random_number(rng)}{space}({space}{_random_number(rng)}{space})")
+        else:
+            parts.append(_random_number(rng))
+    return rng.choice([" - ", "-", " -"]).join(parts)
+
+
+def test_note_average_matches_legacy_implementation():
+    rng = random.Random(2024)
+    for _ in range(5000):
+        cell = _random_cell(rng)
+        assert note_average(cell) == _legacy_single_note_average(cell), cell
@@ -0,0 +1,15 @@
+from app.core.lazy import HEAVY_MODULES
+from benchmarks.startup import _budget_ms, import_profile
+
+RUNS = 3
+
+
+def test_import_main_within_budget_without_heavy_modules():
+    profiles = [import_profile() for _ in range(RUNS)]
+    best_ms = min(profile["modules"]["main"]["cumulative_us"] for profile in profiles) / 1000
+    assert best_ms <= _budget_ms(), f"import de main : {best_ms:.1f} ms > {_budget_ms()} ms"
+
+    # Les dépendances lourdes sont chargées à la demande (app.core.lazy), jamais par l'import de main
+    for profile in profiles:
+        eager = sorted(name for name in profile["modules"] if name.split(".")[0] in HEAVY_MODULES)
+        assert eager == [], f"dépendances lourdes importées au démarrage : {', '.join(eager)}"